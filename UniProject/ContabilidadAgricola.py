@@ -1,236 +1,252 @@
+import arranque  # primero: marca el inicio de la línea de tiempo de arranque
+import aptitud
+import calendar
+import logging
+import os
 import sys
+import time
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import date
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QStackedWidget, QLabel, QPushButton,
     QVBoxLayout, QHBoxLayout, QMessageBox, QLineEdit, QComboBox, QTextEdit,
-    QListWidget, QFormLayout, QInputDialog, QDialog, QDialogButtonBox, QMenuBar, QSpinBox
+    QListWidget, QFormLayout, QInputDialog, QDialog, QDialogButtonBox, QMenuBar, QSpinBox, QTableView,
+    QProgressBar, QPlainTextEdit, QFileDialog, QAbstractButton, QTableWidget, QTableWidgetItem, QListWidgetItem,
+    QAbstractItemView, QCalendarWidget, QCheckBox
 )
-from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont, QColor, QTextCharFormat
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal, QEvent, QTimer, QDate
+
+import buscador
+import calendario_cosechas
+import cambios
+import catalogos
+import datos
+import fincas
+import informes
+import pronostico
+import respaldo
+import sensores
+import tareas
+import trazas
+from nucleo import (
+    Hectarea, inicializar_db, obtener_personas, obtener_tipo_hortaliza, obtener_tipo_suelo, obtener_climas,
+    COLUMNAS_GESTION_EN_BLOQUE, eliminar_gestiones, cambiar_gestiones, leer_gestion, guardar_gestion,
+    nombres_de_usuario, credenciales, leer_usuario, buscar_usuario_por_email, crear_usuario, actualizar_usuario,
+    eliminar_usuario
+)
+
+arranque.marcar("módulos cargados")
 
 # -----------------------------
-# Funciones Auxiliares y Inicialización de la DB
+# Modelo de tabla de hectáreas (carga por páginas)
 # -----------------------------
-def inicializar_db():
-    conn = sqlite3.connect("cultivos.db")
-    cursor = conn.cursor()
-    # Tabla: usuarios
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT,
-            role TEXT CHECK(role IN ('admin', 'usuario')),
-            email TEXT
-        )
-    """)
-    # Tabla: hectareas
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS hectareas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            numero INTEGER,
-            tipo_de_cultivo TEXT,
-            siembra TEXT,
-            primera_cosecha TEXT,
-            cosecha_rutinaria TEXT,
-            tipo_suelo TEXT,
-            temperatura REAL
-        )
-    """)
-    # Tabla: tipo_suelo
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tipo_suelo (
-            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT UNIQUE,
-            descripcion TEXT,
-            imagen TEXT
-        )
-    """)
-    cursor.execute("SELECT COUNT(*) FROM tipo_suelo")
-    if cursor.fetchone()[0] == 0:
-        default_suelos = [
-            ("Arenoso", "Suelos con alta cantidad de arena.", "arenoso.jpg"),
-            ("Limoso", "Suelos con alta proporción de limo.", "limoso.jpg"),
-            ("Franco", "Suelos equilibrados.", "franco.jpg"),
-            ("Arcilloso", "Suelos con alta cantidad de arcilla.", "arcilloso.jpg")
-        ]
-        cursor.executemany("INSERT INTO tipo_suelo (nombre, descripcion, imagen) VALUES (?, ?, ?)", default_suelos)
-    # Tabla: tipo_hortaliza
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tipo_hortaliza (
-            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT UNIQUE,
-            descripcion TEXT,
-            imagen TEXT
-        )
-    """)
-    cursor.execute("SELECT COUNT(*) FROM tipo_hortaliza")
-    if cursor.fetchone()[0] == 0:
-        default_hortalizas = [
-            ("Bulbos", "Vegetales de forma redonda que crecen bajo tierra.", "bulbos.jpg"),
-            ("Tallos comestibles", "Vegetales con tallos comestibles.", "tallos.jpg"),
-            ("Raíces comestibles", "Vegetales con raíces comestibles.", "raices.jpg"),
-            ("Frutos", "Vegetales de tipo fruto.", "frutos.jpg"),
-            ("Hojas", "Vegetales donde se consumen las hojas.", "hojas.jpg"),
-            ("Flores", "Vegetales en los que se consumen las flores.", "flores.jpg"),
-            ("Tubérculos", "Vegetales con tubérculos comestibles.", "tuberculos.jpg")
-        ]
-        cursor.executemany("INSERT INTO tipo_hortaliza (nombre, descripcion, imagen) VALUES (?, ?, ?)", default_hortalizas)
-    # Tabla: clima
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clima (
-            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT UNIQUE,
-            grados_temperatura REAL,
-            descripcion TEXT,
-            imagen TEXT
-        )
-    """)
-    cursor.execute("SELECT COUNT(*) FROM clima")
-    if cursor.fetchone()[0] == 0:
-        default_climas = [
-            ("Tropical", 30, "Clima cálido y húmedo.", "tropical.jpg"),
-            ("Seco", 25, "Clima árido con poca humedad.", "seco.jpg"),
-            ("Templado", 20, "Clima moderado.", "templado.jpg"),
-            ("Continental", 15, "Clima con estaciones bien marcadas.", "continental.jpg"),
-            ("Polar", 0, "Clima muy frío.", "polar.jpg")
-        ]
-        cursor.executemany("INSERT INTO clima (nombre, grados_temperatura, descripcion, imagen) VALUES (?, ?, ?, ?)", default_climas)
-    # Tabla: gestion_cultivo
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS gestion_cultivo (
-            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
-            id_persona INTEGER,
-            id_tipo_hortaliza INTEGER,
-            id_tipo_suelo INTEGER,
-            id_clima INTEGER,
-            video TEXT,
-            observaciones TEXT,
-            FOREIGN KEY(id_persona) REFERENCES usuarios(id),
-            FOREIGN KEY(id_tipo_hortaliza) REFERENCES tipo_hortaliza(codigo),
-            FOREIGN KEY(id_tipo_suelo) REFERENCES tipo_suelo(codigo),
-            FOREIGN KEY(id_clima) REFERENCES clima(codigo)
-        )
-    """)
-    # NUEVA TABLA: tipo_cultivo
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tipo_cultivo (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre TEXT UNIQUE,
-            meses_primera INTEGER,
-            meses_rutinaria INTEGER
-        )
-    """)
-    # Insertar usuario admin por defecto
-    cursor.execute("INSERT OR IGNORE INTO usuarios (username, password, role, email) VALUES ('admin', 'admin123', 'admin', NULL)")
-    conn.commit()
-    conn.close()
-
-def obtener_personas():
-    conn = sqlite3.connect("cultivos.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM usuarios")
-    personas = cursor.fetchall()
-    conn.close()
-    return personas
-
-def obtener_tipo_hortaliza():
-    conn = sqlite3.connect("cultivos.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT codigo, nombre FROM tipo_hortaliza")
-    datos = cursor.fetchall()
-    conn.close()
-    return datos
-
-def obtener_tipo_suelo():
-    conn = sqlite3.connect("cultivos.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT codigo, nombre FROM tipo_suelo")
-    datos = cursor.fetchall()
-    conn.close()
-    return datos
-
-def obtener_climas():
-    conn = sqlite3.connect("cultivos.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT codigo, nombre FROM clima")
-    datos = cursor.fetchall()
-    conn.close()
-    return datos
+class HectareasTableModel(QAbstractTableModel):
+    """
+    Modelo de solo lectura para QTableView. Las filas se traen en páginas ordenadas por
+    numero (paginación por clave: WHERE numero > último visto), y solo cuando la vista
+    las necesita a través de canFetchMore/fetchMore.
+    """
+    ENCABEZADOS = ["Hectárea", "Tipo", "Siembra", "1ra Cosecha", "Cosecha Rutinaria", "Tipo de Suelo", "Temperatura"]
+    TAMANO_PAGINA = 200
+    pagina_cargada = pyqtSignal()
+
+    def __init__(self, consultas, grupo, parent=None):
+        super().__init__(parent)
+        self.consultas = consultas
+        self.grupo = grupo
+        self.filas = []
+        self.hay_mas = True
+        self.tarea = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ENCABEZADOS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        valor = self.filas[index.row()][index.column()]
+        return "" if valor is None else str(valor)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.ENCABEZADOS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        # Mientras una página está en camino no se pide otra
+        return not parent.isValid() and self.hay_mas and not self.consultas.pendiente(self.tarea)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        ultimo = self.filas[-1][0] if self.filas else None
+        self.tarea = self.consultas.ejecutar(self.grupo, Hectarea.pagina, ultimo, self.TAMANO_PAGINA,
+                                             al_terminar=self.agregar_pagina)
+
+    def agregar_pagina(self, pagina):
+        self.hay_mas = len(pagina) == self.TAMANO_PAGINA
+        if pagina:
+            self.beginInsertRows(QModelIndex(), len(self.filas), len(self.filas) + len(pagina) - 1)
+            self.filas.extend(pagina)
+            self.endInsertRows()
+        self.pagina_cargada.emit()
+
+    def recargar(self):
+        """Descarta las filas cargadas y pide la primera página."""
+        self.consultas.cancelar(self.grupo)
+        self.beginResetModel()
+        self.filas = []
+        self.hay_mas = True
+        self.endResetModel()
+        self.fetchMore()
 
 # -----------------------------
-# Clase Hectarea
+# Listas que se actualizan por diferencias
 # -----------------------------
-class Hectarea:
-    def __init__(self, numero, tipo_de_cultivo, siembra, primera_cosecha=None, cosecha_rutinaria=None, tipo_suelo=None, temperatura=None):
-        self.numero = numero
-        self.tipo_de_cultivo = tipo_de_cultivo.lower()
-        self.siembra = datetime.strptime(siembra, "%Y-%m-%d")
-        if self.tipo_de_cultivo == "limones":
-            self.primeracosecha = self.siembra.replace(year=self.siembra.year + 5)
-            self.cosecha_rutinaria = (self.primeracosecha + timedelta(days=180)).strftime("%Y-%m-%d")
+class ListaSincronizada:
+    """
+    Mantiene un QListWidget igual a una tabla con el registro de cambios (cambios.py): la
+    primera vez lee la tabla completa y después solo agrega, reescribe o quita los ítems
+    de las claves que cambiaron desde la última versión vista, sin importar cuántas sean.
+    La tabla se vuelve a leer entera solo si el registro ya se podó más allá de esa
+    versión o hubo una carga masiva. La clave primaria de cada ítem queda en sus datos
+    (Qt.UserRole). Las lecturas van en segundo plano y los ítems se crean o cambian de a
+    POR_PASO por vuelta del ciclo de eventos, así la pantalla no se congela con tablas
+    grandes.
+    """
+    POR_PASO = 2000
+
+    def __init__(self, controller, grupo, lista, tabla, formatear):
+        self.controller = controller
+        self.grupo = grupo
+        self.lista = lista
+        self.tabla = tabla
+        self.formatear = formatear
+        self.version = None
+        self.items = {}          # clave -> QListWidgetItem
+        self.tarea = None
+        self._repetir = False
+        self._recargar = False
+        self._pasos = None       # generador con lo que falta aplicar a la lista, o None
+        # Todos los ítems son de una línea: con tamaños uniformes Qt no mide cada uno
+        lista.setUniformItemSizes(True)
+        self._temporizador = QTimer(lista)
+        self._temporizador.setSingleShot(True)
+        self._temporizador.timeout.connect(self._seguir)
+
+    def ocupada(self):
+        """Si hay una lectura en curso o ítems que todavía no se aplicaron a la lista."""
+        return self.controller.consultas.pendiente(self.tarea) or self._pasos is not None
+
+    def actualizar(self):
+        """Pide los cambios pendientes (o la tabla completa, si todavía no se cargó)."""
+        if self.ocupada():
+            # Se vuelve a pedir al terminar, así no se pierde un cambio posterior al pedido en curso
+            self._repetir = True
+            return
+        self._repetir = False
+        if self.version is None or self._recargar:
+            self.tarea = self.controller.consultas.ejecutar(self.grupo, cambios.leer_todo, self.tabla,
+                                                            al_terminar=self._cargar_todo)
         else:
-            # Se calcularán automáticamente según los tiempos del cultivo registrado
-            if not primera_cosecha:
-                if self.tipo_de_cultivo == "maíz":
-                    self.primeracosecha = self.siembra + timedelta(days=90)
-                elif self.tipo_de_cultivo == "trigo":
-                    self.primeracosecha = self.siembra + timedelta(days=120)
-                elif self.tipo_de_cultivo == "tomate":
-                    self.primeracosecha = self.siembra + timedelta(days=70)
-                else:
-                    self.primeracosecha = self.siembra + timedelta(days=80)
-            else:
-                self.primeracosecha = datetime.strptime(primera_cosecha, "%Y-%m-%d")
-            if not cosecha_rutinaria:
-                if self.tipo_de_cultivo == "maíz":
-                    self.cosecha_rutinaria = (self.primeracosecha + timedelta(days=30)).strftime("%Y-%m-%d")
-                elif self.tipo_de_cultivo == "trigo":
-                    self.cosecha_rutinaria = (self.primeracosecha + timedelta(days=30)).strftime("%Y-%m-%d")
-                elif self.tipo_de_cultivo == "tomate":
-                    self.cosecha_rutinaria = (self.primeracosecha + timedelta(days=15)).strftime("%Y-%m-%d")
+            self.tarea = self.controller.consultas.ejecutar(self.grupo, cambios.leer_cambios, self.tabla, self.version,
+                                                            None, al_terminar=self._aplicar)
+
+    def recargar(self):
+        """Vuelve a leer la tabla completa."""
+        self._recargar = True
+        self.actualizar()
+
+    def claves_seleccionadas(self):
+        return sorted(item.data(Qt.UserRole) for item in self.lista.selectedItems())
+
+    def escribir(self, padre, funcion, *args, mensaje="{} filas actualizadas.", errores=None, despues=None):
+        """
+        Ejecuta una escritura de nucleo o catalogos (una sentencia, una transacción) en
+        segundo plano; al terminar informa cuántas filas tocó, aplica los cambios y llama
+        a despues(). 'errores' traduce tipos de excepción a mensajes para el usuario.
+        """
+        def al_terminar(cantidad):
+            QMessageBox.information(padre, "Éxito", mensaje.format(cantidad))
+            self.actualizar()
+            if despues is not None:
+                despues()
+
+        def al_fallar(error):
+            texto = next((texto for tipo, texto in (errores or {}).items() if isinstance(error, tipo)), str(error))
+            QMessageBox.critical(padre, "Error", texto)
+
+        # La escritura no pertenece a la pantalla: no se cancela si el usuario navega
+        self.controller.consultas.ejecutar("escrituras", funcion, *args, al_terminar=al_terminar, al_fallar=al_fallar)
+
+    def _nuevo_item(self, fila):
+        item = QListWidgetItem(self.formatear(fila))
+        item.setData(Qt.UserRole, fila[0])
+        self.items[fila[0]] = item
+        return item
+
+    def _cargar_todo(self, resultado):
+        self.version, filas = resultado
+        self._recargar = False
+        self._por_partes(self._llenar(filas))
+
+    def _aplicar(self, resultado):
+        if resultado is None:
+            # El registro no alcanza (podado o carga masiva)
+            self._recargar = self._repetir = True
+            self._terminar()
+            return
+        self.version, cambiadas = resultado
+        self._por_partes(self._cambiar(list(cambiadas.items())))
+
+    def _llenar(self, filas):
+        self.lista.clear()
+        self.items = {}
+        for inicio in range(0, len(filas), self.POR_PASO):
+            for fila in filas[inicio:inicio + self.POR_PASO]:
+                self.lista.addItem(self._nuevo_item(fila))
+            yield
+
+    def _cambiar(self, cambiadas):
+        for inicio in range(0, len(cambiadas), self.POR_PASO):
+            for clave, fila in cambiadas[inicio:inicio + self.POR_PASO]:
+                item = self.items.get(clave)
+                if fila is None:
+                    if item is not None:
+                        self.lista.takeItem(self.lista.row(item))
+                        del self.items[clave]
+                elif item is not None:
+                    item.setText(self.formatear(fila))
                 else:
-                    self.cosecha_rutinaria = (self.primeracosecha + timedelta(days=20)).strftime("%Y-%m-%d")
-            else:
-                self.cosecha_rutinaria = cosecha_rutinaria
-        self.tipo_suelo = tipo_suelo
-        try:
-            self.temperatura = float(temperatura) if temperatura not in (None, "") else None
-        except ValueError:
-            self.temperatura = None
-
-    def guardar_en_bd(self):
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (self.numero, self.tipo_de_cultivo, self.siembra.strftime("%Y-%m-%d"),
-              self.primeracosecha.strftime("%Y-%m-%d"), self.cosecha_rutinaria, self.tipo_suelo, self.temperatura))
-        conn.commit()
-        conn.close()
-
-    @staticmethod
-    def eliminar(numero):
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM hectareas WHERE numero = ?", (numero,))
-        conn.commit()
-        conn.close()
-
-    @staticmethod
-    def actualizar(numero, tipo, siembra, primera, rutinaria, tipo_suelo, temperatura):
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE hectareas 
-            SET tipo_de_cultivo = ?, siembra = ?, primera_cosecha = ?, cosecha_rutinaria = ?, tipo_suelo = ?, temperatura = ?
-            WHERE numero = ?
-        """, (tipo.lower(), siembra, primera, rutinaria, tipo_suelo, temperatura, numero))
-        conn.commit()
-        conn.close()
+                    # Las claves nuevas suelen ser las mayores: se busca la posición desde el final
+                    posicion = self.lista.count()
+                    while posicion > 0 and self.lista.item(posicion - 1).data(Qt.UserRole) > clave:
+                        posicion -= 1
+                    self.lista.insertItem(posicion, self._nuevo_item(fila))
+            yield
+
+    def _por_partes(self, pasos):
+        """Aplica 'pasos' de a uno por vuelta del ciclo de eventos; al final sigue con _terminar()."""
+        self._pasos = pasos
+        self._seguir()
+
+    def _seguir(self):
+        if self._pasos is None:
+            return
+        if next(self._pasos, StopIteration) is StopIteration:
+            self._pasos = None
+            self._terminar()
+        else:
+            self._temporizador.start(0)
+
+    def _terminar(self):
+        if self._repetir:
+            self.actualizar()
 
 # -----------------------------
 # Pantallas de la Aplicación
@@ -245,25 +261,49 @@ class LoginScreen(QWidget):
         title = QLabel("Acceso al Sistema de Cultivos")
         title.setFont(QFont("Helvetica", 18, QFont.Bold))
         layout.addWidget(title, alignment=Qt.AlignCenter)
+        # Con fincas.db se elige primero la finca: cada una tiene sus propios usuarios
+        self.combo_finca = QComboBox()
+        self.combo_finca.activated.connect(self.elegir_finca)
+        self.combo_finca.hide()
+        layout.addWidget(self.combo_finca, alignment=Qt.AlignCenter)
         subtitle = QLabel("Seleccione un usuario:")
         subtitle.setFont(QFont("Helvetica", 14))
         layout.addWidget(subtitle, alignment=Qt.AlignCenter)
         self.users_list = QListWidget()
         layout.addWidget(self.users_list)
-        self.refresh_users()
         btn_recuperar = QPushButton("Recuperar Contraseña")
         btn_recuperar.clicked.connect(self.recuperar_contrasena)
         layout.addWidget(btn_recuperar, alignment=Qt.AlignCenter)
         self.users_list.itemDoubleClicked.connect(self.do_login)
         self.setLayout(layout)
     
+    def cargar_fincas(self):
+        self.controller.consultas.ejecutar("login", lambda: (fincas.listar(), fincas.activa()),
+                                           al_terminar=self.mostrar_fincas)
+    
+    def mostrar_fincas(self, resultado):
+        lista, activa = resultado
+        self.combo_finca.clear()
+        for codigo, nombre, _ in lista:
+            self.combo_finca.addItem(nombre, codigo)
+        if activa is not None:
+            self.combo_finca.setCurrentIndex(self.combo_finca.findData(activa[0]))
+        self.combo_finca.setVisible(bool(lista))
+    
+    def elegir_finca(self, indice):
+        self.combo_finca.setEnabled(False)
+        self.users_list.clear()
+        self.controller.cambiar_finca(self.combo_finca.itemData(indice), al_terminar=self.finca_elegida)
+    
+    def finca_elegida(self):
+        self.combo_finca.setEnabled(True)
+        self.refresh_users()
+    
     def refresh_users(self):
+        self.controller.consultas.ejecutar("login", nombres_de_usuario, al_terminar=self.mostrar_usuarios)
+    
+    def mostrar_usuarios(self, users):
         self.users_list.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT username FROM usuarios")
-        users = cursor.fetchall()
-        conn.close()
         for u in users:
             self.users_list.addItem(u[0])
     
@@ -274,11 +314,11 @@ class LoginScreen(QWidget):
                                               QLineEdit.Password)
         if not ok:
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT password, role, email FROM usuarios WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar(
+            "login", credenciales, username,
+            al_terminar=lambda result: self.completar_login(username, password, result))
+    
+    def completar_login(self, username, password, result):
         if result and password == result[0]:
             self.controller.current_user = username
             self.controller.user_role = result[1]
@@ -291,11 +331,10 @@ class LoginScreen(QWidget):
         email, ok = QInputDialog.getText(self, "Recuperar Contraseña", "Ingrese su correo electrónico:")
         if not ok or not email:
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT username, password FROM usuarios WHERE email = ?", (email,))
-        result = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar("login", buscar_usuario_por_email, email,
+                                           al_terminar=self.mostrar_recuperacion)
+
+    def mostrar_recuperacion(self, result):
         if result:
             QMessageBox.information(self, "Recuperación", 
                                     f"Usuario: {result[0]}\nContraseña: {result[1]}\n(Se simula envío de correo)")
@@ -332,6 +371,12 @@ class MainScreen(QWidget):
         btn_consulta = QPushButton("Consulta Cultivo")
         btn_consulta.clicked.connect(lambda: controller.show_screen("consulta"))
         menu_layout.addWidget(btn_consulta)
+        btn_pronostico = QPushButton("Pronóstico")
+        btn_pronostico.clicked.connect(lambda: controller.show_screen("pronostico"))
+        menu_layout.addWidget(btn_pronostico)
+        btn_calendario = QPushButton("Calendario")
+        btn_calendario.clicked.connect(lambda: controller.show_screen("calendario"))
+        menu_layout.addWidget(btn_calendario)
         btn_gestion_hectareas = QPushButton("Gestionar Hectáreas")
         btn_gestion_hectareas.clicked.connect(lambda: controller.show_screen("gestionar_hectareas"))
         menu_layout.addWidget(btn_gestion_hectareas)
@@ -345,9 +390,18 @@ class MainScreen(QWidget):
         btn_logout.clicked.connect(lambda: controller.show_screen("login"))
         menu_layout.addWidget(btn_logout)
         main_layout.addLayout(menu_layout)
-        self.content_area = QTextEdit()
-        self.content_area.setReadOnly(True)
-        main_layout.addWidget(self.content_area)
+        # Tabla de hectáreas: el modelo trae las filas por páginas a medida que se desplaza
+        self.modelo_hectareas = HectareasTableModel(controller.consultas, "main", self)
+        self.modelo_hectareas.pagina_cargada.connect(self.actualizar_mensaje)
+        self.tabla_hectareas = QTableView()
+        self.tabla_hectareas.setModel(self.modelo_hectareas)
+        self.tabla_hectareas.setEditTriggers(QTableView.NoEditTriggers)
+        self.tabla_hectareas.horizontalHeader().setStretchLastSection(True)
+        self.tabla_hectareas.hide()
+        main_layout.addWidget(self.tabla_hectareas)
+        self.mensaje_label = QLabel("")
+        main_layout.addWidget(self.mensaje_label, alignment=Qt.AlignCenter)
+        main_layout.addStretch()
         self.setLayout(main_layout)
     
     def update_header(self):
@@ -359,20 +413,16 @@ class MainScreen(QWidget):
             self.email_label.setText("")
     
     def show_hectareas(self):
-        self.content_area.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM hectareas")
-        hectareas = cursor.fetchall()
-        conn.close()
-        if hectareas:
-            texto = ""
-            for h in hectareas:
-                texto += (f"Hectárea {h[1]}:\n  Tipo: {h[2]}\n  Siembra: {h[3]}\n  1ra Cosecha: {h[4]}\n"
-                          f"  Cosecha Rutinaria: {h[5]}\n  Tipo de Suelo: {h[6]}\n  Temperatura: {h[7]}\n\n")
-            self.content_area.setPlainText(texto)
+        self.mensaje_label.setText("Cargando hectáreas...")
+        self.modelo_hectareas.recargar()
+    
+    def actualizar_mensaje(self):
+        if self.modelo_hectareas.rowCount():
+            self.mensaje_label.setText("")
+            self.tabla_hectareas.show()
         else:
-            self.content_area.setPlainText("No hay hectáreas registradas.")
+            self.tabla_hectareas.hide()
+            self.mensaje_label.setText("No hay hectáreas registradas.")
 
 # RegistrarScreen: Registro de Hectáreas (sin campos para fechas de cosecha)
 class RegistrarScreen(QWidget):
@@ -392,6 +442,7 @@ class RegistrarScreen(QWidget):
         self.combo_suelo = QComboBox()
         form_layout.addRow("Tipo de Suelo:", self.combo_suelo)
         self.entry_temp = QLineEdit()
+        self.entry_temp.setPlaceholderText("Opcional: con sensor se toma de sus lecturas")
         form_layout.addRow("Temperatura (°C):", self.entry_temp)
         layout.addLayout(form_layout)
         btn_registrar = QPushButton("Registrar")
@@ -407,23 +458,19 @@ class RegistrarScreen(QWidget):
         self.cargar_opciones()
     
     def cargar_opciones(self):
-        # Consultar la tabla tipo_cultivo para los cultivos
+        # Tipos de cultivo y de suelo desde la caché (solo se lee la base si fue invalidada)
+        self.controller.consultas.ejecutar(
+            "registrar",
+            lambda: (catalogos.nombres("tipo_cultivo"), catalogos.nombres("tipo_suelo")),
+            al_terminar=self.mostrar_opciones)
+    
+    def mostrar_opciones(self, resultado):
+        rows, suelos = resultado
         self.combo_crop.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM tipo_cultivo")
-        rows = cursor.fetchall()
-        conn.close()
-        crop_types = [r[0] for r in rows] if rows else ["limones", "maíz", "trigo", "tomate"]
+        crop_types = rows if rows else ["limones", "maíz", "trigo", "tomate"]
         self.combo_crop.addItems(crop_types)
-        # Consultar la tabla tipo_suelo para los suelos
         self.combo_suelo.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM tipo_suelo")
-        suelos = cursor.fetchall()
-        conn.close()
-        suelo_types = [s[0] for s in suelos] if suelos else ["Sin suelo registrado"]
+        suelo_types = suelos if suelos else ["Sin suelo registrado"]
         self.combo_suelo.addItems(suelo_types)
     
     def registrar_hectarea(self):
@@ -435,19 +482,21 @@ class RegistrarScreen(QWidget):
         # Se pasan None para primera cosecha y cosecha rutinaria, para que se calculen automáticamente
         suelo = self.combo_suelo.currentText()
         temperatura = self.entry_temp.text().strip()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT MAX(numero) FROM hectareas")
-        max_num = cursor.fetchone()[0]
-        conn.close()
-        numero = 1 if max_num is None else max_num + 1
         try:
-            hectarea = Hectarea(numero, crop, siembra, None, None, suelo, temperatura)
-            hectarea.guardar_en_bd()
-            QMessageBox.information(self, "Registro", "Hectárea registrada con éxito.")
-            self.controller.show_screen("main")
+            # El número se asigna al guardar, dentro de la transacción de la inserción
+            hectarea = Hectarea(None, crop, siembra, None, None, suelo, temperatura)
         except Exception as e:
             QMessageBox.critical(self, "Error", str(e))
+            return
+        # La escritura no pertenece a la pantalla: no se cancela si el usuario navega
+        self.controller.consultas.ejecutar(
+            "escrituras", hectarea.guardar_en_bd,
+            al_terminar=lambda _: self.hectarea_registrada(),
+            al_fallar=lambda e: QMessageBox.critical(self, "Error", str(e)))
+    
+    def hectarea_registrada(self):
+        QMessageBox.information(self, "Registro", "Hectárea registrada con éxito.")
+        self.controller.show_screen("main")
 
 # BuscarScreen: Búsqueda de Hectáreas
 class BuscarScreen(QWidget):
@@ -478,16 +527,20 @@ class BuscarScreen(QWidget):
             self.result_area.setPlainText("Ingrese un número válido.")
             return
         num = int(num_text)
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM hectareas WHERE numero = ?", (num,))
-        hectarea = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar(
+            "buscar", lambda n: (Hectarea.buscar(n), sensores.ultima(n)), num,
+            al_terminar=lambda resultado: self.mostrar_hectarea(num, *resultado))
+    
+    def mostrar_hectarea(self, num, hectarea, lectura=None):
         self.result_area.clear()
         if hectarea:
             texto = (f"Hectárea {hectarea[1]}:\n  Tipo: {hectarea[2]}\n  Siembra: {hectarea[3]}\n"
                      f"  1ra Cosecha: {hectarea[4]}\n  Cosecha Rutinaria: {hectarea[5]}\n"
                      f"  Tipo de Suelo: {hectarea[6]}\n  Temperatura: {hectarea[7]}")
+            if lectura:
+                inicio, minimo, maximo, _ = lectura
+                texto += (f" (sensor, promedio de la hora {sensores.hora_utc(inicio)} UTC; "
+                          f"mín. {minimo:.1f}, máx. {maximo:.1f})")
             self.result_area.setPlainText(texto)
         else:
             self.result_area.setPlainText(f"No se encontró la Hectárea {num}.")
@@ -520,41 +573,137 @@ class InformeScreen(QWidget):
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
+        self.filtros = {}
+        self.todas_las_fincas = False
+        self.ultimo_codigo = None
+        self.cursores = None
+        self.registros = 0
         layout = QVBoxLayout(self)
         title = QLabel("Informe de Gestión Cultivo")
         title.setFont(QFont("Helvetica", 18, QFont.Bold))
         layout.addWidget(title, alignment=Qt.AlignCenter)
-        self.informe_area = QTextEdit()
+        # Filtros: cada combo guarda el código del catálogo como dato del ítem (None = todos)
+        filtros_layout = QHBoxLayout()
+        self.combos_filtro = {}
+        for clave, etiqueta in [("usuario", "Usuario"), ("hortaliza", "Hortaliza"), ("suelo", "Suelo"), ("clima", "Clima")]:
+            combo = QComboBox()
+            combo.addItem("Todos", None)
+            filtros_layout.addWidget(QLabel(f"{etiqueta}:"))
+            filtros_layout.addWidget(combo)
+            self.combos_filtro[clave] = combo
+        layout.addLayout(filtros_layout)
+        botones_layout = QHBoxLayout()
+        btn_filtrar = QPushButton("Aplicar Filtros")
+        btn_filtrar.clicked.connect(self.cargar_informe)
+        botones_layout.addWidget(btn_filtrar)
+        btn_exportar = QPushButton("Exportar...")
+        btn_exportar.clicked.connect(self.exportar_informe)
+        botones_layout.addWidget(btn_exportar)
+        # Con varias fincas, el informe puede juntar todas (cada finca se consulta en otro proceso)
+        self.check_fincas = QCheckBox("Todas las fincas")
+        self.check_fincas.hide()
+        botones_layout.addWidget(self.check_fincas)
+        layout.addLayout(botones_layout)
+        self.informe_area = QPlainTextEdit()
         self.informe_area.setReadOnly(True)
         layout.addWidget(self.informe_area)
+        self.resumen_label = QLabel("")
+        layout.addWidget(self.resumen_label, alignment=Qt.AlignCenter)
         btn_volver = QPushButton("Volver")
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
     
+    def cargar_filtros(self):
+        self.controller.consultas.ejecutar(
+            "informe",
+            lambda: [obtener_personas(), obtener_tipo_hortaliza(), obtener_tipo_suelo(), obtener_climas()],
+            al_terminar=self.mostrar_filtros)
+    
+    def mostrar_filtros(self, catalogos_filtro):
+        for combo, pares in zip(self.combos_filtro.values(), catalogos_filtro):
+            # Se conserva la selección actual si el valor sigue existiendo
+            actual = combo.currentData()
+            combo.clear()
+            combo.addItem("Todos", None)
+            for codigo, nombre in pares:
+                combo.addItem(nombre, codigo)
+            combo.setCurrentIndex(max(combo.findData(actual), 0))
+    
+    def filtros_seleccionados(self):
+        return {clave: combo.currentData() for clave, combo in self.combos_filtro.items()}
+    
+    def filtros_por_nombre(self):
+        """Filtros para todas las fincas: los códigos cambian de una finca a otra, los nombres no."""
+        return {clave: None if combo.currentData() is None else combo.currentText()
+                for clave, combo in self.combos_filtro.items()}
+    
     def cargar_informe(self):
-        self.informe_area.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT gc.codigo, u.username, th.nombre, ts.nombre, c.nombre, gc.video, gc.observaciones
-            FROM gestion_cultivo gc
-            JOIN usuarios u ON gc.id_persona = u.id
-            JOIN tipo_hortaliza th ON gc.id_tipo_hortaliza = th.codigo
-            JOIN tipo_suelo ts ON gc.id_tipo_suelo = ts.codigo
-            JOIN clima c ON gc.id_clima = c.codigo
-        """)
-        registros = cursor.fetchall()
-        conn.close()
+        # Se descarta la carga anterior y se piden páginas por código hasta agotar el resultado
+        self.controller.consultas.cancelar("informe")
+        self.cargar_filtros()
+        self.informe_area.setPlainText("Cargando informe...")
+        self.resumen_label.setText("")
+        self.controller.consultas.ejecutar("informe", fincas.listar, al_terminar=self.empezar_informe)
+    
+    def empezar_informe(self, lista_fincas):
+        self.check_fincas.setVisible(len(lista_fincas) > 1)
+        self.todas_las_fincas = self.check_fincas.isVisible() and self.check_fincas.isChecked()
+        self.filtros = self.filtros_por_nombre() if self.todas_las_fincas else self.filtros_seleccionados()
+        self.ultimo_codigo = None
+        self.cursores = None
+        self.registros = 0
+        self.pedir_pagina()
+    
+    def pedir_pagina(self):
+        if self.todas_las_fincas:
+            self.controller.consultas.ejecutar("informe", fincas.pagina_informe, self.filtros, self.cursores,
+                                               al_terminar=self.mostrar_informe_fincas)
+        else:
+            self.controller.consultas.ejecutar("informe", informes.pagina, self.filtros, self.ultimo_codigo,
+                                               al_terminar=self.mostrar_informe)
+    
+    def mostrar_informe(self, registros):
+        primera = self.ultimo_codigo is None
         if registros:
-            texto = ""
-            for r in registros:
-                texto += (f"Código: {r[0]}\nUsuario: {r[1]}\nTipo Hortaliza: {r[2]}\n"
-                          f"Tipo Suelo: {r[3]}\nClima: {r[4]}\nVideo: {r[5]}\nObservaciones: {r[6]}\n"
-                          + "-" * 40 + "\n")
-            self.informe_area.setPlainText(texto)
+            self.ultimo_codigo = registros[-1][0]
+        self.agregar_registros(registros, primera, len(registros) < informes.TAMANO_BLOQUE, informes.COLUMNAS)
+    
+    def mostrar_informe_fincas(self, resultado):
+        primera = self.cursores is None
+        registros, self.cursores, completo = resultado
+        self.agregar_registros(registros, primera, completo, fincas.COLUMNAS)
+    
+    def agregar_registros(self, registros, primera, completo, columnas):
+        if primera:
+            self.informe_area.clear()
+            if not registros:
+                self.informe_area.setPlainText("No hay registros de gestión cultivo.")
+                self.resumen_label.setText("0 registros")
+                return
+        if registros:
+            self.informe_area.appendPlainText(
+                "".join(informes.formatear_texto(r, columnas) for r in registros).rstrip("\n"))
+            self.registros += len(registros)
+        self.resumen_label.setText(f"{self.registros} registros" + ("" if completo else " (cargando...)"))
+        if not completo:
+            self.pedir_pagina()
+    
+    def exportar_informe(self):
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar Informe", "informe.csv",
+                                              "CSV (*.csv);;HTML (*.html);;Texto (*.txt)")
+        if not ruta:
+            return
+        # La exportación lee del cursor y escribe directo al archivo, en segundo plano
+        if self.check_fincas.isVisible() and self.check_fincas.isChecked():
+            funcion, filtros = fincas.exportar_informe, self.filtros_por_nombre()
         else:
-            self.informe_area.setPlainText("No hay registros de gestión cultivo.")
+            funcion, filtros = informes.exportar, self.filtros_seleccionados()
+        self.controller.consultas.ejecutar(
+            "exportar", funcion, ruta, filtros,
+            al_terminar=lambda cantidad: QMessageBox.information(
+                self, "Éxito", f"{cantidad} registros exportados a {ruta}."),
+            al_fallar=lambda error: QMessageBox.critical(self, "Error", f"No se pudo exportar el informe: {error}"))
 
 # ConsultaScreen: Consulta de Tipos de Cultivo (Hortalizas)
 class ConsultaScreen(QWidget):
@@ -565,15 +714,32 @@ class ConsultaScreen(QWidget):
         title = QLabel("Consulta Tipo de Cultivo (Hortaliza)")
         title.setFont(QFont("Helvetica", 18, QFont.Bold))
         layout.addWidget(title, alignment=Qt.AlignCenter)
+        self.texto_buscado = ""
+        self.tablas_buscadas = None
+        self.resultados = 0
+        busqueda_layout = QHBoxLayout()
         self.entry_consulta = QLineEdit()
-        self.entry_consulta.setPlaceholderText("Ingrese el nombre del tipo de hortaliza")
-        layout.addWidget(self.entry_consulta)
+        self.entry_consulta.setPlaceholderText("Buscar en hortalizas, suelos, climas y observaciones (ej.: raices)")
+        self.entry_consulta.returnPressed.connect(self.buscar_tipo)
+        busqueda_layout.addWidget(self.entry_consulta)
+        self.combo_fuente = QComboBox()
+        self.combo_fuente.addItem("Todo", None)
+        self.combo_fuente.addItem("Hortalizas", ["tipo_hortaliza"])
+        self.combo_fuente.addItem("Suelos", ["tipo_suelo"])
+        self.combo_fuente.addItem("Climas", ["clima"])
+        self.combo_fuente.addItem("Observaciones", ["gestion_cultivo"])
+        busqueda_layout.addWidget(self.combo_fuente)
+        layout.addLayout(busqueda_layout)
         btn_buscar = QPushButton("Buscar")
         btn_buscar.clicked.connect(self.buscar_tipo)
         layout.addWidget(btn_buscar, alignment=Qt.AlignCenter)
-        self.result_area = QTextEdit()
+        self.result_area = QPlainTextEdit()
         self.result_area.setReadOnly(True)
         layout.addWidget(self.result_area)
+        self.btn_mas = QPushButton("Más resultados")
+        self.btn_mas.clicked.connect(self.buscar_mas)
+        self.btn_mas.setVisible(False)
+        layout.addWidget(self.btn_mas, alignment=Qt.AlignCenter)
         btn_volver = QPushButton("Volver")
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
@@ -582,22 +748,174 @@ class ConsultaScreen(QWidget):
     def buscar_tipo(self):
         nombre = self.entry_consulta.text().strip()
         if not nombre:
-            QMessageBox.critical(self, "Error", "Ingrese un nombre para consultar.")
+            QMessageBox.critical(self, "Error", "Ingrese un texto para consultar.")
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT codigo, nombre, descripcion, imagen FROM tipo_hortaliza WHERE nombre LIKE ?", ('%' + nombre + '%',))
-        registros = cursor.fetchall()
-        conn.close()
+        # Búsqueda de texto completo (índice FTS5), sin distinguir mayúsculas ni acentos
+        self.controller.consultas.cancelar("consulta")
+        self.texto_buscado = nombre
+        self.tablas_buscadas = self.combo_fuente.currentData()
+        self.resultados = 0
         self.result_area.clear()
+        self.buscar_mas()
+    
+    def buscar_mas(self):
+        self.controller.consultas.ejecutar(
+            "consulta", buscador.buscar, self.texto_buscado, self.tablas_buscadas, buscador.TAMANO_PAGINA, self.resultados,
+            al_terminar=self.mostrar_tipos)
+    
+    def mostrar_tipos(self, registros):
+        if not registros and not self.resultados:
+            self.result_area.setPlainText("No se encontraron resultados.")
         if registros:
-            texto = ""
-            for r in registros:
-                texto += (f"Código: {r[0]}\nNombre: {r[1]}\nDescripción: {r[2]}\nImagen: {r[3]}\n"
-                          + "-" * 30 + "\n")
-            self.result_area.setPlainText(texto)
-        else:
-            self.result_area.setPlainText("No se encontró el tipo de cultivo.")
+            self.result_area.appendPlainText("\n".join(
+                f"[{buscador.NOMBRES_FUENTE[tabla]}] Código: {codigo}"
+                + (f"\nNombre: {titulo}" if titulo else "")
+                + f"\nCoincidencia: {fragmento}\n" + "-" * 30
+                for tabla, codigo, titulo, fragmento in registros))
+            self.resultados += len(registros)
+        self.btn_mas.setVisible(len(registros) == buscador.TAMANO_PAGINA)
+
+# PronosticoScreen: Hectáreas a cosechar por cultivo y período (lee el resumen pronostico_cosechas)
+class PronosticoScreen(QWidget):
+    def __init__(self, controller):
+        super().__init__()
+        self.controller = controller
+        layout = QVBoxLayout(self)
+        title = QLabel("Pronóstico de Cosechas")
+        title.setFont(QFont("Helvetica", 18, QFont.Bold))
+        layout.addWidget(title, alignment=Qt.AlignCenter)
+        opciones_layout = QHBoxLayout()
+        self.combo_escala = QComboBox()
+        for escala, etiqueta in pronostico.ESCALAS.items():
+            self.combo_escala.addItem(etiqueta, escala)
+        opciones_layout.addWidget(QLabel("Escala:"))
+        opciones_layout.addWidget(self.combo_escala)
+        self.combo_cosecha = QComboBox()
+        self.combo_cosecha.addItem("Todas", None)
+        for cosecha, etiqueta in pronostico.COSECHAS.items():
+            self.combo_cosecha.addItem(etiqueta, cosecha)
+        opciones_layout.addWidget(QLabel("Cosecha:"))
+        opciones_layout.addWidget(self.combo_cosecha)
+        self.spin_periodos = QSpinBox()
+        self.spin_periodos.setRange(1, 104)
+        self.spin_periodos.setValue(pronostico.PERIODOS["mes"])
+        opciones_layout.addWidget(QLabel("Períodos:"))
+        opciones_layout.addWidget(self.spin_periodos)
+        btn_actualizar = QPushButton("Actualizar")
+        btn_actualizar.clicked.connect(self.cargar_pronostico)
+        opciones_layout.addWidget(btn_actualizar)
+        layout.addLayout(opciones_layout)
+        self.combo_escala.currentIndexChanged.connect(
+            lambda: self.spin_periodos.setValue(pronostico.PERIODOS[self.combo_escala.currentData()]))
+        # Períodos en filas, cultivos en columnas; el promedio de temperatura va como tooltip
+        self.tabla_pronostico = QTableWidget()
+        self.tabla_pronostico.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.tabla_pronostico)
+        self.resumen_label = QLabel("")
+        layout.addWidget(self.resumen_label, alignment=Qt.AlignCenter)
+        btn_volver = QPushButton("Volver")
+        btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
+        layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
+        self.setLayout(layout)
+    
+    def cargar_pronostico(self):
+        escala = self.combo_escala.currentData()
+        desde, hasta = pronostico.rango(periodos=self.spin_periodos.value(), escala=escala)
+        self.resumen_label.setText("Cargando pronóstico...")
+        self.controller.consultas.cancelar("pronostico")
+        self.controller.consultas.ejecutar("pronostico", pronostico.tabla, escala, desde, hasta,
+                                           self.combo_cosecha.currentData(), al_terminar=self.mostrar_pronostico)
+    
+    def mostrar_pronostico(self, resultado):
+        periodos, cultivos, celdas = resultado
+        self.tabla_pronostico.clear()
+        self.tabla_pronostico.setRowCount(len(periodos))
+        self.tabla_pronostico.setColumnCount(len(cultivos) + 1)
+        self.tabla_pronostico.setHorizontalHeaderLabels([c.capitalize() for c in cultivos] + ["Total"])
+        self.tabla_pronostico.setVerticalHeaderLabels(periodos)
+        total_general = 0
+        for fila, periodo in enumerate(periodos):
+            total = 0
+            for columna, cultivo in enumerate(cultivos):
+                hectareas, temperatura = celdas.get((periodo, cultivo), (0, None))
+                item = QTableWidgetItem(str(hectareas) if hectareas else "")
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if temperatura is not None:
+                    item.setToolTip(f"Temperatura promedio: {temperatura:.1f} °C")
+                self.tabla_pronostico.setItem(fila, columna, item)
+                total += hectareas
+            item = QTableWidgetItem(str(total))
+            item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.tabla_pronostico.setItem(fila, len(cultivos), item)
+            total_general += total
+        self.resumen_label.setText(f"{total_general} cosechas de hectáreas en {len(periodos)} períodos"
+                                   if periodos else "No hay cosechas previstas en el rango elegido.")
+
+# CalendarioScreen: Cosechas por día del mes visible (incluidas las rutinarias que se repiten)
+class CalendarioScreen(QWidget):
+    def __init__(self, controller):
+        super().__init__()
+        self.controller = controller
+        layout = QVBoxLayout(self)
+        title = QLabel("Calendario de Cosechas")
+        title.setFont(QFont("Helvetica", 18, QFont.Bold))
+        layout.addWidget(title, alignment=Qt.AlignCenter)
+        # Solo se consulta el mes visible; cambiar de mes vuelve a consultar
+        self.calendario = QCalendarWidget()
+        self.calendario.setGridVisible(True)
+        self.calendario.currentPageChanged.connect(lambda anio, mes: self.cargar_mes())
+        self.calendario.selectionChanged.connect(self.cargar_dia)
+        layout.addWidget(self.calendario)
+        self.resumen_label = QLabel("")
+        layout.addWidget(self.resumen_label, alignment=Qt.AlignCenter)
+        self.dia_label = QLabel("")
+        layout.addWidget(self.dia_label)
+        self.lista_dia = QListWidget()
+        layout.addWidget(self.lista_dia)
+        btn_volver = QPushButton("Volver")
+        btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
+        layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
+        self.setLayout(layout)
+    
+    def cargar_mes(self):
+        anio, mes = self.calendario.yearShown(), self.calendario.monthShown()
+        desde = date(anio, mes, 1)
+        hasta = date(anio, mes, calendar.monthrange(anio, mes)[1])
+        self.resumen_label.setText("Cargando cosechas del mes...")
+        self.controller.consultas.cancelar("calendario")
+        self.controller.consultas.ejecutar("calendario", calendario_cosechas.por_dia, desde, hasta,
+                                           al_terminar=lambda conteo: self.mostrar_mes(desde, conteo))
+        self.cargar_dia()
+    
+    def mostrar_mes(self, desde, conteo):
+        self.calendario.setDateTextFormat(QDate(), QTextCharFormat())
+        maximo = max(conteo.values(), default=0)
+        for fecha, cantidad in conteo.items():
+            formato = QTextCharFormat()
+            # Verde más intenso cuanto más cosechas tiene el día respecto del máximo del mes
+            formato.setBackground(QColor("#66bb6a") if cantidad * 2 > maximo else QColor("#c5e1a5"))
+            formato.setToolTip(f"{cantidad} cosechas")
+            self.calendario.setDateTextFormat(QDate(fecha.year, fecha.month, fecha.day), formato)
+        self.resumen_label.setText(f"{sum(conteo.values())} cosechas en {desde:%m/%Y}, "
+                                   f"{len(conteo)} días con cosecha" if conteo
+                                   else f"No hay cosechas previstas en {desde:%m/%Y}.")
+    
+    def cargar_dia(self):
+        fecha = self.calendario.selectedDate().toPyDate()
+        self.dia_label.setText(f"Cargando hectáreas del {fecha:%d/%m/%Y}...")
+        self.controller.consultas.ejecutar("calendario", calendario_cosechas.hectareas_del_dia, fecha,
+                                           al_terminar=lambda resultado: self.mostrar_dia(fecha, resultado))
+    
+    def mostrar_dia(self, fecha, resultado):
+        if fecha != self.calendario.selectedDate().toPyDate():
+            return  # la selección cambió mientras se consultaba
+        total, filas = resultado
+        self.lista_dia.clear()
+        for cosecha, numero, tipo, suelo in filas:
+            self.lista_dia.addItem(f"Hectárea {numero} - {tipo} - {suelo} (cosecha {cosecha})")
+        if total > len(filas):
+            self.lista_dia.addItem(f"... y {total - len(filas)} hectáreas más")
+        self.dia_label.setText(f"{total} hectáreas cosechan el {fecha:%d/%m/%Y}")
 
 # GestionarHectareasScreen: Gestión de Hectáreas (Admin)
 class GestionarHectareasScreen(QWidget):
@@ -609,62 +927,97 @@ class GestionarHectareasScreen(QWidget):
         title.setFont(QFont("Helvetica", 18, QFont.Bold))
         layout.addWidget(title, alignment=Qt.AlignCenter)
         self.hectareas_list = QListWidget()
+        # Con Ctrl/Shift se seleccionan varias; eliminar y los cambios en bloque actúan sobre todas
+        self.hectareas_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         layout.addWidget(self.hectareas_list)
-        self.refresh_hectareas()
+        self.sincronizada = ListaSincronizada(
+            controller, "gestionar_hectareas", self.hectareas_list, "hectareas",
+            lambda h: f"N° {h[1]}: {h[2]} | Siembra: {h[3]} | 1ra: {h[4]} | Rutinaria: {h[5]} | Suelo: {h[6]} | Temp: {h[7]}")
         btn_editar = QPushButton("Editar Seleccionada")
         btn_editar.clicked.connect(self.edit_hectarea)
         layout.addWidget(btn_editar, alignment=Qt.AlignCenter)
-        btn_eliminar = QPushButton("Eliminar Seleccionada")
+        btn_eliminar = QPushButton("Eliminar Seleccionadas")
         btn_eliminar.clicked.connect(self.delete_hectarea)
         layout.addWidget(btn_eliminar, alignment=Qt.AlignCenter)
+        bloque_layout = QHBoxLayout()
+        btn_cultivo = QPushButton("Cambiar Cultivo")
+        btn_cultivo.clicked.connect(self.cambiar_cultivo)
+        bloque_layout.addWidget(btn_cultivo)
+        btn_suelo = QPushButton("Cambiar Suelo")
+        btn_suelo.clicked.connect(self.cambiar_suelo)
+        bloque_layout.addWidget(btn_suelo)
+        btn_siembra = QPushButton("Correr Siembra")
+        btn_siembra.clicked.connect(self.correr_siembra)
+        bloque_layout.addWidget(btn_siembra)
+        layout.addLayout(bloque_layout)
         btn_volver = QPushButton("Volver")
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
     
     def refresh_hectareas(self):
-        self.hectareas_list.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura FROM hectareas")
-        hectareas = cursor.fetchall()
-        conn.close()
-        for h in hectareas:
-            self.hectareas_list.addItem(
-                f"N° {h[0]}: {h[1]} | Siembra: {h[2]} | 1ra: {h[3]} | Rutinaria: {h[4]} | Suelo: {h[5]} | Temp: {h[6]}"
-            )
+        self.sincronizada.actualizar()
+    
+    def seleccionadas(self, accion):
+        """Ids de las hectáreas seleccionadas; si no hay ninguna avisa y devuelve una lista vacía."""
+        ids = self.sincronizada.claves_seleccionadas()
+        if not ids:
+            QMessageBox.critical(self, "Error", f"Seleccione una o más hectáreas para {accion}.")
+        return ids
     
     def delete_hectarea(self):
-        selected = self.hectareas_list.currentItem()
-        if not selected:
-            QMessageBox.critical(self, "Error", "Seleccione una hectárea para eliminar.")
+        ids = self.seleccionadas("eliminar")
+        if not ids:
             return
-        line = selected.text()
-        numero = int(line.split(":")[0].replace("N°", "").strip())
-        if QMessageBox.question(self, "Confirmar", f"¿Está seguro de eliminar la hectárea {numero}?",
+        if QMessageBox.question(self, "Confirmar", f"¿Está seguro de eliminar {len(ids)} hectárea(s)?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            Hectarea.eliminar(numero)
-            QMessageBox.information(self, "Éxito", "Hectárea eliminada.")
-            self.refresh_hectareas()
+            self.sincronizada.escribir(self, Hectarea.eliminar_varias, ids, mensaje="{} hectárea(s) eliminada(s).")
+    
+    def cambiar_cultivo(self):
+        ids = self.seleccionadas("cambiar el cultivo")
+        if not ids:
+            return
+        tipo, ok = QInputDialog.getItem(self, "Cambiar Cultivo", f"Nuevo cultivo para {len(ids)} hectárea(s):",
+                                        catalogos.nombres("tipo_cultivo"), 0, True)
+        if ok and tipo.strip():
+            self.sincronizada.escribir(self, Hectarea.cambiar_cultivo, ids, tipo.strip(),
+                                        mensaje="{} hectárea(s) actualizada(s); las cosechas se recalcularon.")
+    
+    def cambiar_suelo(self):
+        ids = self.seleccionadas("cambiar el suelo")
+        if not ids:
+            return
+        suelo, ok = QInputDialog.getItem(self, "Cambiar Suelo", f"Nuevo tipo de suelo para {len(ids)} hectárea(s):",
+                                         catalogos.nombres("tipo_suelo"), 0, False)
+        if ok:
+            self.sincronizada.escribir(self, Hectarea.cambiar_suelo, ids, suelo,
+                                        mensaje="{} hectárea(s) actualizada(s).")
+    
+    def correr_siembra(self):
+        ids = self.seleccionadas("correr la siembra")
+        if not ids:
+            return
+        dias, ok = QInputDialog.getInt(self, "Correr Siembra",
+                                       f"Días a correr la siembra y las cosechas de {len(ids)} hectárea(s) "
+                                       "(negativo: hacia atrás):", 0, -3650, 3650)
+        if ok and dias:
+            self.sincronizada.escribir(self, Hectarea.correr_siembra, ids, dias,
+                                        mensaje="{} hectárea(s) actualizada(s).")
     
     def edit_hectarea(self):
-        selected = self.hectareas_list.currentItem()
-        if not selected:
-            QMessageBox.critical(self, "Error", "Seleccione una hectárea para editar.")
+        ids = self.sincronizada.claves_seleccionadas()
+        if len(ids) != 1:
+            QMessageBox.critical(self, "Error", "Seleccione una sola hectárea para editar "
+                                 "(para varias use los cambios en bloque).")
             return
-        line = selected.text()
-        numero = int(line.split(":")[0].replace("N°", "").strip())
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura 
-            FROM hectareas WHERE numero = ?
-        """, (numero,))
-        data = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar("gestionar_hectareas", Hectarea.leer, ids[0],
+                                           al_terminar=self.editar_datos_hectarea)
+
+    def editar_datos_hectarea(self, data):
         if not data:
             QMessageBox.critical(self, "Error", "No se encontraron datos para la hectárea seleccionada.")
             return
+        numero = data[6]
         new_tipo, ok1 = QInputDialog.getText(self, "Editar", "Nuevo tipo de cultivo:", text=data[0])
         new_siembra, ok2 = QInputDialog.getText(self, "Editar", "Nueva fecha de siembra (YYYY-MM-DD):", text=data[1])
         new_primera, ok3 = QInputDialog.getText(self, "Editar", "Nueva fecha de primera cosecha (YYYY-MM-DD):", text=data[2])
@@ -674,15 +1027,23 @@ class GestionarHectareasScreen(QWidget):
         if not (ok1 and ok2 and ok3 and ok4 and ok5):
             QMessageBox.critical(self, "Error", "Edición cancelada o campos incompletos.")
             return
-        try:
-            Hectarea.actualizar(numero, new_tipo, new_siembra, new_primera, new_rutinaria, new_suelo, new_temp)
-            QMessageBox.information(self, "Éxito", "Hectárea actualizada.")
-            self.refresh_hectareas()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.sincronizada.escribir(self, Hectarea.actualizar, numero, new_tipo, new_siembra, new_primera,
+                                   new_rutinaria, new_suelo, new_temp, mensaje="Hectárea actualizada.")
+
+def preparar_dialogo_gestion(codigo=None):
+    """
+    Corre en segundo plano antes de abrir el diálogo de gestión: deja en la caché los
+    catálogos de sus combos, pone al día la matriz de aptitud y lee la gestión a editar.
+    """
+    for obtener in (obtener_personas, obtener_tipo_hortaliza, obtener_tipo_suelo, obtener_climas):
+        obtener()
+    aptitud.sincronizar()
+    return leer_gestion(codigo) if codigo is not None else None
 
 # GestionCultivoScreen: Gestión de Cultivos (Admin)
 class GestionCultivoScreen(QWidget):
+    RECOMENDACIONES = 5     # hortalizas sugeridas en el diálogo de registro
+
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
@@ -694,12 +1055,18 @@ class GestionCultivoScreen(QWidget):
         btn_registrar.clicked.connect(self.registrar_gestion)
         layout.addWidget(btn_registrar, alignment=Qt.AlignCenter)
         self.gestion_list = QListWidget()
+        self.gestion_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         layout.addWidget(self.gestion_list)
-        self.cargar_gestiones()
+        self.sincronizada = ListaSincronizada(
+            controller, "gestion_cultivo", self.gestion_list, "gestion_cultivo",
+            lambda g: f"Código: {g[0]} | Persona ID: {g[1]} | Hortaliza ID: {g[2]} | Suelo ID: {g[3]} | Clima ID: {g[4]} | Video: {g[5]} | Obs: {g[6]}")
         btn_editar = QPushButton("Editar Seleccionada")
         btn_editar.clicked.connect(self.editar_gestion)
         layout.addWidget(btn_editar, alignment=Qt.AlignCenter)
-        btn_eliminar = QPushButton("Eliminar Seleccionada")
+        btn_bloque = QPushButton("Cambiar Seleccionadas")
+        btn_bloque.clicked.connect(self.cambiar_gestiones)
+        layout.addWidget(btn_bloque, alignment=Qt.AlignCenter)
+        btn_eliminar = QPushButton("Eliminar Seleccionadas")
         btn_eliminar.clicked.connect(self.eliminar_gestion)
         layout.addWidget(btn_eliminar, alignment=Qt.AlignCenter)
         btn_volver = QPushButton("Volver")
@@ -708,18 +1075,13 @@ class GestionCultivoScreen(QWidget):
         self.setLayout(layout)
     
     def cargar_gestiones(self):
-        self.gestion_list.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT codigo, id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones FROM gestion_cultivo")
-        gestiones = cursor.fetchall()
-        conn.close()
-        for g in gestiones:
-            self.gestion_list.addItem(
-                f"Código: {g[0]} | Persona ID: {g[1]} | Hortaliza ID: {g[2]} | Suelo ID: {g[3]} | Clima ID: {g[4]} | Video: {g[5]} | Obs: {g[6]}"
-            )
+        self.sincronizada.actualizar()
     
     def registrar_gestion(self):
+        self.controller.consultas.ejecutar("gestion_cultivo", preparar_dialogo_gestion,
+                                           al_terminar=lambda _: self.abrir_registro_gestion())
+
+    def abrir_registro_gestion(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Registrar Gestión Cultivo")
         d_layout = QFormLayout(dialog)
@@ -755,6 +1117,36 @@ class GestionCultivoScreen(QWidget):
         combo_clima = QComboBox()
         combo_clima.addItems(list(clima_dict.keys()))
         d_layout.addRow("Seleccione Clima:", combo_clima)
+        # Hortalizas ordenadas por aptitud para el suelo y el clima elegidos (matriz precalculada)
+        label_aptitud = QLabel("")
+        d_layout.addRow("Aptitud de la combinación:", label_aptitud)
+        lista_recomendadas = QListWidget()
+        lista_recomendadas.setMaximumHeight(120)
+        d_layout.addRow("Hortalizas recomendadas:", lista_recomendadas)
+
+        # La matriz ya se sincronizó al preparar el diálogo: cada cambio de combo solo la lee, en segundo plano
+        def actualizar_aptitud():
+            self.controller.consultas.cancelar("aptitud")
+            self.controller.consultas.ejecutar(
+                "aptitud", aptitud.recomendacion, hort_dict[combo_hortaliza.currentText()],
+                suelo_dict[combo_suelo.currentText()], clima_dict[combo_clima.currentText()], self.RECOMENDACIONES,
+                al_terminar=mostrar_aptitud)
+
+        def mostrar_aptitud(resultado):
+            recomendadas, valor = resultado
+            lista_recomendadas.clear()
+            for codigo, nombre, puntaje in recomendadas:
+                item = QListWidgetItem(f"{puntaje:.0f}/100  {nombre}")
+                item.setData(Qt.UserRole, codigo)
+                lista_recomendadas.addItem(item)
+            label_aptitud.setText(f"{valor:.0f}/100" if valor is not None else "Sin datos")
+
+        combo_hortaliza.currentIndexChanged.connect(actualizar_aptitud)
+        combo_suelo.currentIndexChanged.connect(actualizar_aptitud)
+        combo_clima.currentIndexChanged.connect(actualizar_aptitud)
+        lista_recomendadas.itemClicked.connect(lambda item: combo_hortaliza.setCurrentIndex(
+            list(hort_dict.values()).index(item.data(Qt.UserRole))))
+        actualizar_aptitud()
         entry_video = QLineEdit()
         d_layout.addRow("Video (URL o ruta):", entry_video)
         entry_obs = QLineEdit()
@@ -763,7 +1155,9 @@ class GestionCultivoScreen(QWidget):
         d_layout.addRow(buttons)
         buttons.accepted.connect(dialog.accept)
         buttons.rejected.connect(dialog.reject)
-        if dialog.exec_() == QDialog.Accepted:
+        aceptado = dialog.exec_() == QDialog.Accepted
+        self.controller.consultas.cancelar("aptitud")
+        if aceptado:
             try:
                 id_persona = personas_dict[combo_persona.currentText()]
                 id_hortaliza = hort_dict[combo_hortaliza.currentText()]
@@ -774,32 +1168,19 @@ class GestionCultivoScreen(QWidget):
                 return
             video = entry_video.text().strip()
             observaciones = entry_obs.text().strip()
-            conn = sqlite3.connect("cultivos.db")
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO gestion_cultivo (id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (id_persona, id_hortaliza, id_suelo, id_clima, video, observaciones))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Gestión cultivo registrada.")
-            self.cargar_gestiones()
+            self.sincronizada.escribir(self, guardar_gestion, None, id_persona, id_hortaliza, id_suelo, id_clima,
+                                       video, observaciones, mensaje="Gestión cultivo registrada.")
     
     def editar_gestion(self):
-        selected = self.gestion_list.currentItem()
-        if not selected:
-            QMessageBox.critical(self, "Error", "Seleccione una gestión para editar.")
+        codigos = self.sincronizada.claves_seleccionadas()
+        if len(codigos) != 1:
+            QMessageBox.critical(self, "Error", "Seleccione una sola gestión para editar "
+                                 "(para varias use Cambiar Seleccionadas).")
             return
-        line = selected.text()
-        codigo = int(line.split("|")[0].split(":")[1].strip())
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones 
-            FROM gestion_cultivo WHERE codigo = ?
-        """, (codigo,))
-        data = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar("gestion_cultivo", preparar_dialogo_gestion, codigos[0],
+                                           al_terminar=lambda data: self.editar_datos_gestion(codigos[0], data))
+
+    def editar_datos_gestion(self, codigo, data):
         if not data:
             QMessageBox.critical(self, "Error", "No se encontró la gestión seleccionada.")
             return
@@ -867,43 +1248,41 @@ class GestionCultivoScreen(QWidget):
                 return
             video = entry_video.text().strip()
             observaciones = entry_obs.text().strip()
-            conn = sqlite3.connect("cultivos.db")
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE gestion_cultivo
-                SET id_persona = ?, id_tipo_hortaliza = ?, id_tipo_suelo = ?, id_clima = ?, video = ?, observaciones = ?
-                WHERE codigo = ?
-            """, (id_persona, id_hortaliza, id_suelo, id_clima, video, observaciones, codigo))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Gestión cultivo actualizada.")
-            self.cargar_gestiones()
+            self.sincronizada.escribir(self, guardar_gestion, codigo, id_persona, id_hortaliza, id_suelo, id_clima,
+                                       video, observaciones, mensaje="Gestión cultivo actualizada.")
     
     def eliminar_gestión(self):
         # Este método no se usa; se conecta el botón a eliminar_gestion
         pass
 
     def eliminar_gestion(self):
-        selected = self.gestion_list.currentItem()
-        if not selected:
-            QMessageBox.critical(self, "Error", "Seleccione una gestión para eliminar.")
-            return
-        line = selected.text()
-        try:
-            codigo = int(line.split("|")[0].split(":")[1].strip())
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error al obtener el código: {e}")
+        codigos = self.sincronizada.claves_seleccionadas()
+        if not codigos:
+            QMessageBox.critical(self, "Error", "Seleccione una o más gestiones para eliminar.")
             return
         if QMessageBox.question(self, "Confirmar",
-                                f"¿Está seguro de eliminar la gestión con código {codigo}?",
+                                f"¿Está seguro de eliminar {len(codigos)} gestión(es)?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM gestion_cultivo WHERE codigo = ?", (codigo,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Gestión cultivo eliminada.")
-            self.cargar_gestiones()
+            self.sincronizada.escribir(self, eliminar_gestiones, codigos, mensaje="{} gestión(es) eliminada(s).")
+    
+    def cambiar_gestiones(self):
+        codigos = self.sincronizada.claves_seleccionadas()
+        if not codigos:
+            QMessageBox.critical(self, "Error", "Seleccione una o más gestiones para cambiar.")
+            return
+        etiquetas = {"Tipo de hortaliza": "id_tipo_hortaliza", "Tipo de suelo": "id_tipo_suelo",
+                     "Clima": "id_clima", "Persona": "id_persona"}
+        etiqueta, ok = QInputDialog.getItem(self, "Cambiar Seleccionadas",
+                                            f"Dato a cambiar en {len(codigos)} gestión(es):", list(etiquetas), 0, False)
+        if not ok:
+            return
+        columna = etiquetas[etiqueta]
+        opciones = {f"{nombre} (ID {clave})": clave for clave, nombre in catalogos.pares(COLUMNAS_GESTION_EN_BLOQUE[columna])}
+        opcion, ok = QInputDialog.getItem(self, "Cambiar Seleccionadas", f"Nuevo valor de {etiqueta.lower()}:",
+                                          list(opciones), 0, False)
+        if ok:
+            self.sincronizada.escribir(self, cambiar_gestiones, codigos, columna, opciones[opcion],
+                                        mensaje="{} gestión(es) actualizada(s).")
 
 # CultivosScreen: Pantalla para mostrar datos de ejemplo (sin CRUD)
 class CultivosScreen(QWidget):
@@ -955,18 +1334,12 @@ class TipoHortalizaManagementScreen(QWidget):
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
-        self.cargar_hortalizas()
+        self.sincronizada = ListaSincronizada(controller, "gestion_hortaliza", self.list_hortalizas, "tipo_hortaliza",
+                                              lambda r: f"{r[0]} | {r[1]} | {r[2]} | {r[3]}")
         self.list_hortalizas.itemClicked.connect(self.cargar_en_formulario)
     
     def cargar_hortalizas(self):
-        self.list_hortalizas.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT codigo, nombre, descripcion, imagen FROM tipo_hortaliza")
-        rows = cursor.fetchall()
-        conn.close()
-        for r in rows:
-            self.list_hortalizas.addItem(f"{r[0]} | {r[1]} | {r[2]} | {r[3]}")
+        self.sincronizada.actualizar()
     
     def crear_actualizar_hortaliza(self):
         nombre = self.input_nombre.text().strip()
@@ -976,33 +1349,11 @@ class TipoHortalizaManagementScreen(QWidget):
             QMessageBox.critical(self, "Error", "El nombre es obligatorio.")
             return
         selected = self.list_hortalizas.currentItem()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        if selected:
-            codigo = selected.text().split("|")[0].strip()
-            try:
-                cursor.execute("""
-                    UPDATE tipo_hortaliza
-                    SET nombre = ?, descripcion = ?, imagen = ?
-                    WHERE codigo = ?
-                """, (nombre, descripcion, imagen, codigo))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Tipo de hortaliza actualizado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe una hortaliza con ese nombre.")
-        else:
-            try:
-                cursor.execute("""
-                    INSERT INTO tipo_hortaliza (nombre, descripcion, imagen)
-                    VALUES (?, ?, ?)
-                """, (nombre, descripcion, imagen))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Nuevo tipo de hortaliza creado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe una hortaliza con ese nombre.")
-        conn.close()
-        self.cargar_hortalizas()
-        self.limpiar_campos()
+        codigo = selected.text().split("|")[0].strip() if selected else None
+        self.sincronizada.escribir(self, catalogos.guardar, "tipo_hortaliza", codigo, (nombre, descripcion, imagen),
+                                   mensaje="Tipo de hortaliza actualizado." if selected else "Nuevo tipo de hortaliza creado.",
+                                   errores={sqlite3.IntegrityError: "Ya existe una hortaliza con ese nombre."},
+                                   despues=self.limpiar_campos)
     
     def eliminar_hortaliza(self):
         selected = self.list_hortalizas.currentItem()
@@ -1012,14 +1363,8 @@ class TipoHortalizaManagementScreen(QWidget):
         codigo = selected.text().split("|")[0].strip()
         if QMessageBox.question(self, "Confirmar", f"¿Desea eliminar el código {codigo}?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM tipo_hortaliza WHERE codigo = ?", (codigo,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Hortaliza eliminada.")
-            self.cargar_hortalizas()
-            self.limpiar_campos()
+            self.sincronizada.escribir(self, catalogos.eliminar, "tipo_hortaliza", codigo,
+                                       mensaje="Hortaliza eliminada.", despues=self.limpiar_campos)
     
     def cargar_en_formulario(self, item):
         line = item.text().split("|")
@@ -1068,22 +1413,12 @@ class TipoSueloManagementScreen(QWidget):
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
-        self.cargar_suelos()
+        self.sincronizada = ListaSincronizada(controller, "gestion_suelo", self.list_suelos, "tipo_suelo",
+                                              lambda r: f"{r[0]} | {r[1]} | {r[2]} | {r[3]}")
         self.list_suelos.itemClicked.connect(self.cargar_en_formulario)
     
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.cargar_suelos()
-    
     def cargar_suelos(self):
-        self.list_suelos.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT codigo, nombre, descripcion, imagen FROM tipo_suelo")
-        rows = cursor.fetchall()
-        conn.close()
-        for r in rows:
-            self.list_suelos.addItem(f"{r[0]} | {r[1]} | {r[2]} | {r[3]}")
+        self.sincronizada.actualizar()
     
     def crear_actualizar_suelo(self):
         nombre = self.input_nombre.text().strip()
@@ -1093,33 +1428,11 @@ class TipoSueloManagementScreen(QWidget):
             QMessageBox.critical(self, "Error", "El nombre es obligatorio.")
             return
         selected = self.list_suelos.currentItem()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        if selected:
-            codigo = selected.text().split("|")[0].strip()
-            try:
-                cursor.execute("""
-                    UPDATE tipo_suelo
-                    SET nombre = ?, descripcion = ?, imagen = ?
-                    WHERE codigo = ?
-                """, (nombre, descripcion, imagen, codigo))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Tipo de suelo actualizado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un tipo de suelo con ese nombre.")
-        else:
-            try:
-                cursor.execute("""
-                    INSERT INTO tipo_suelo (nombre, descripcion, imagen)
-                    VALUES (?, ?, ?)
-                """, (nombre, descripcion, imagen))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Nuevo tipo de suelo creado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un tipo de suelo con ese nombre.")
-        conn.close()
-        self.cargar_suelos()
-        self.limpiar_campos()
+        codigo = selected.text().split("|")[0].strip() if selected else None
+        self.sincronizada.escribir(self, catalogos.guardar, "tipo_suelo", codigo, (nombre, descripcion, imagen),
+                                   mensaje="Tipo de suelo actualizado." if selected else "Nuevo tipo de suelo creado.",
+                                   errores={sqlite3.IntegrityError: "Ya existe un tipo de suelo con ese nombre."},
+                                   despues=self.limpiar_campos)
     
     def eliminar_suelo(self):
         selected = self.list_suelos.currentItem()
@@ -1129,14 +1442,8 @@ class TipoSueloManagementScreen(QWidget):
         codigo = selected.text().split("|")[0].strip()
         if QMessageBox.question(self, "Confirmar", f"¿Desea eliminar el código {codigo}?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM tipo_suelo WHERE codigo = ?", (codigo,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Tipo de suelo eliminado.")
-            self.cargar_suelos()
-            self.limpiar_campos()
+            self.sincronizada.escribir(self, catalogos.eliminar, "tipo_suelo", codigo,
+                                       mensaje="Tipo de suelo eliminado.", despues=self.limpiar_campos)
     
     def cargar_en_formulario(self, item):
         line = item.text().split("|")
@@ -1187,18 +1494,12 @@ class ClimaManagementScreen(QWidget):
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
-        self.cargar_climas()
+        self.sincronizada = ListaSincronizada(controller, "gestion_clima", self.list_climas, "clima",
+                                              lambda r: f"{r[0]} | {r[1]} | {r[2]} | {r[3]} | {r[4]}")
         self.list_climas.itemClicked.connect(self.cargar_en_formulario)
     
     def cargar_climas(self):
-        self.list_climas.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT codigo, nombre, grados_temperatura, descripcion, imagen FROM clima")
-        rows = cursor.fetchall()
-        conn.close()
-        for r in rows:
-            self.list_climas.addItem(f"{r[0]} | {r[1]} | {r[2]} | {r[3]} | {r[4]}")
+        self.sincronizada.actualizar()
     
     def crear_actualizar_clima(self):
         nombre = self.input_nombre.text().strip()
@@ -1214,33 +1515,11 @@ class ClimaManagementScreen(QWidget):
             QMessageBox.critical(self, "Error", "Ingrese un valor numérico en grados de temperatura.")
             return
         selected = self.list_climas.currentItem()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        if selected:
-            codigo = selected.text().split("|")[0].strip()
-            try:
-                cursor.execute("""
-                    UPDATE clima
-                    SET nombre = ?, grados_temperatura = ?, descripcion = ?, imagen = ?
-                    WHERE codigo = ?
-                """, (nombre, grados, descripcion, imagen, codigo))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Clima actualizado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un clima con ese nombre.")
-        else:
-            try:
-                cursor.execute("""
-                    INSERT INTO clima (nombre, grados_temperatura, descripcion, imagen)
-                    VALUES (?, ?, ?, ?)
-                """, (nombre, grados, descripcion, imagen))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Nuevo clima creado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un clima con ese nombre.")
-        conn.close()
-        self.cargar_climas()
-        self.limpiar_campos()
+        codigo = selected.text().split("|")[0].strip() if selected else None
+        self.sincronizada.escribir(self, catalogos.guardar, "clima", codigo, (nombre, grados, descripcion, imagen),
+                                   mensaje="Clima actualizado." if selected else "Nuevo clima creado.",
+                                   errores={sqlite3.IntegrityError: "Ya existe un clima con ese nombre."},
+                                   despues=self.limpiar_campos)
     
     def eliminar_clima(self):
         selected = self.list_climas.currentItem()
@@ -1250,14 +1529,8 @@ class ClimaManagementScreen(QWidget):
         codigo = selected.text().split("|")[0].strip()
         if QMessageBox.question(self, "Confirmar", f"¿Desea eliminar el código {codigo}?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM clima WHERE codigo = ?", (codigo,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Clima eliminado.")
-            self.cargar_climas()
-            self.limpiar_campos()
+            self.sincronizada.escribir(self, catalogos.eliminar, "clima", codigo,
+                                       mensaje="Clima eliminado.", despues=self.limpiar_campos)
     
     def cargar_en_formulario(self, item):
         line = item.text().split("|")
@@ -1318,22 +1591,13 @@ class TipoCultivoManagementScreen(QWidget):
         btn_volver.clicked.connect(lambda: self.controller.show_screen("main"))
         layout.addWidget(btn_volver, alignment=Qt.AlignCenter)
         self.setLayout(layout)
-        self.cargar_cultivos()
+        self.sincronizada = ListaSincronizada(
+            controller, "gestion_tipo_cultivo", self.list_cultivos, "tipo_cultivo",
+            lambda r: f"{r[0]} | {r[1]} | 1ra: {r[2]} meses | Rutinaria: {r[3]} meses")
         self.list_cultivos.itemClicked.connect(self.cargar_en_formulario)
     
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.cargar_cultivos()
-    
     def cargar_cultivos(self):
-        self.list_cultivos.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nombre, meses_primera, meses_rutinaria FROM tipo_cultivo")
-        rows = cursor.fetchall()
-        conn.close()
-        for r in rows:
-            self.list_cultivos.addItem(f"{r[0]} | {r[1]} | 1ra: {r[2]} meses | Rutinaria: {r[3]} meses")
+        self.sincronizada.actualizar()
     
     def crear_actualizar_cultivo(self):
         nombre = self.input_nombre.text().strip()
@@ -1343,33 +1607,12 @@ class TipoCultivoManagementScreen(QWidget):
             QMessageBox.critical(self, "Error", "El nombre es obligatorio.")
             return
         selected = self.list_cultivos.currentItem()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        if selected:
-            cultivo_id = selected.text().split("|")[0].strip()
-            try:
-                cursor.execute("""
-                    UPDATE tipo_cultivo
-                    SET nombre = ?, meses_primera = ?, meses_rutinaria = ?
-                    WHERE id = ?
-                """, (nombre, meses_primera, meses_rutinaria, cultivo_id))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Tipo de cultivo actualizado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un tipo de cultivo con ese nombre.")
-        else:
-            try:
-                cursor.execute("""
-                    INSERT INTO tipo_cultivo (nombre, meses_primera, meses_rutinaria)
-                    VALUES (?, ?, ?)
-                """, (nombre, meses_primera, meses_rutinaria))
-                conn.commit()
-                QMessageBox.information(self, "Éxito", "Nuevo tipo de cultivo creado.")
-            except sqlite3.IntegrityError:
-                QMessageBox.critical(self, "Error", "Ya existe un tipo de cultivo con ese nombre.")
-        conn.close()
-        self.cargar_cultivos()
-        self.limpiar_campos()
+        cultivo_id = selected.text().split("|")[0].strip() if selected else None
+        self.sincronizada.escribir(self, catalogos.guardar, "tipo_cultivo", cultivo_id,
+                                   (nombre, meses_primera, meses_rutinaria),
+                                   mensaje="Tipo de cultivo actualizado." if selected else "Nuevo tipo de cultivo creado.",
+                                   errores={sqlite3.IntegrityError: "Ya existe un tipo de cultivo con ese nombre."},
+                                   despues=self.limpiar_campos)
     
     def eliminar_cultivo(self):
         selected = self.list_cultivos.currentItem()
@@ -1379,14 +1622,9 @@ class TipoCultivoManagementScreen(QWidget):
         cultivo_id = selected.text().split("|")[0].strip()
         if QMessageBox.question(self, "Confirmar", f"¿Desea eliminar el tipo de cultivo con ID {cultivo_id}?",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM tipo_cultivo WHERE id = ?", (cultivo_id,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Tipo de cultivo eliminado.")
-            self.cargar_cultivos()
-            self.limpiar_campos()
+            # También descarta las reglas de cosecha, que se releen en el próximo cálculo
+            self.sincronizada.escribir(self, catalogos.eliminar, "tipo_cultivo", cultivo_id,
+                                       mensaje="Tipo de cultivo eliminado.", despues=self.limpiar_campos)
     
     def cargar_en_formulario(self, item):
         parts = item.text().split("|")
@@ -1420,7 +1658,8 @@ class UserManagementScreen(QWidget):
         layout.addWidget(title, alignment=Qt.AlignCenter)
         self.user_list = QListWidget()
         layout.addWidget(self.user_list)
-        self.refresh_user_list()
+        self.sincronizada = ListaSincronizada(controller, "usuarios", self.user_list, "usuarios",
+                                              lambda user: f"{user[1]} - {user[2] if user[2] else ''}")
         form_layout = QFormLayout()
         self.new_username = QLineEdit()
         form_layout.addRow("Username:", self.new_username)
@@ -1445,14 +1684,7 @@ class UserManagementScreen(QWidget):
         self.setLayout(layout)
     
     def refresh_user_list(self):
-        self.user_list.clear()
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT username, email FROM usuarios")
-        users = cursor.fetchall()
-        conn.close()
-        for user in users:
-            self.user_list.addItem(f"{user[0]} - {user[1] if user[1] else ''}")
+        self.sincronizada.actualizar()
     
     def create_user(self):
         username = self.new_username.text().strip()
@@ -1461,20 +1693,15 @@ class UserManagementScreen(QWidget):
         if not username or not password or not email:
             QMessageBox.critical(self, "Error", "Todos los campos son requeridos para crear un usuario.")
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        try:
-            cursor.execute("INSERT INTO usuarios (username, password, role, email) VALUES (?, ?, 'usuario', ?)",
-                           (username, password, email))
-            conn.commit()
-            QMessageBox.information(self, "Éxito", "Usuario creado correctamente.")
-            self.refresh_user_list()
-            self.new_username.clear()
-            self.new_password.clear()
-            self.new_email.clear()
-        except sqlite3.IntegrityError:
-            QMessageBox.critical(self, "Error", "El usuario ya existe.")
-        conn.close()
+        self.sincronizada.escribir(self, crear_usuario, username, password, email,
+                                   mensaje="Usuario creado correctamente.",
+                                   errores={sqlite3.IntegrityError: "El usuario ya existe."},
+                                   despues=self.limpiar_campos)
+
+    def limpiar_campos(self):
+        self.new_username.clear()
+        self.new_password.clear()
+        self.new_email.clear()
     
     def delete_user(self):
         selected = self.user_list.currentItem()
@@ -1486,13 +1713,7 @@ class UserManagementScreen(QWidget):
         if username == "admin":
             QMessageBox.critical(self, "Error", "No se puede eliminar el usuario admin.")
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM usuarios WHERE username = ?", (username,))
-        conn.commit()
-        conn.close()
-        QMessageBox.information(self, "Éxito", "Usuario eliminado.")
-        self.refresh_user_list()
+        self.sincronizada.escribir(self, eliminar_usuario, username, mensaje="Usuario eliminado.")
     
     def edit_user(self):
         selected = self.user_list.currentItem()
@@ -1504,11 +1725,10 @@ class UserManagementScreen(QWidget):
         if username == "admin":
             QMessageBox.critical(self, "Error", "No se puede editar el usuario admin.")
             return
-        conn = sqlite3.connect("cultivos.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT username, password, email FROM usuarios WHERE username = ?", (username,))
-        data = cursor.fetchone()
-        conn.close()
+        self.controller.consultas.ejecutar("usuarios", leer_usuario, username,
+                                           al_terminar=lambda data: self.editar_datos_usuario(username, data))
+
+    def editar_datos_usuario(self, username, data):
         if not data:
             QMessageBox.critical(self, "Error", "No se encontró información del usuario.")
             return
@@ -1518,20 +1738,9 @@ class UserManagementScreen(QWidget):
         if not (ok1 and ok2 and ok3 and new_username and new_password and new_email):
             QMessageBox.critical(self, "Error", "Todos los campos son requeridos para editar el usuario.")
             return
-        try:
-            conn = sqlite3.connect("cultivos.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE usuarios
-                SET username = ?, password = ?, email = ?
-                WHERE username = ?
-            """, (new_username, new_password, new_email, username))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Éxito", "Usuario actualizado correctamente.")
-            self.refresh_user_list()
-        except sqlite3.IntegrityError:
-            QMessageBox.critical(self, "Error", "El nuevo username ya existe.")
+        self.sincronizada.escribir(self, actualizar_usuario, username, new_username, new_password, new_email,
+                                   mensaje="Usuario actualizado correctamente.",
+                                   errores={sqlite3.IntegrityError: "El nuevo username ya existe."})
 
 # CultivosScreen: Pantalla para mostrar datos de ejemplo (sin CRUD)
 class CultivosScreen(QWidget):
@@ -1555,6 +1764,11 @@ class CultivosScreen(QWidget):
 # Clase Principal: MainWindow y Controlador de Pantallas
 # -----------------------------
 class MainWindow(QMainWindow):
+    INTERVALO_CAMBIOS_MS = 2000
+    INTERVALO_RESPALDO_MS = 3600 * 1000   # cada hora se mira si el último respaldo ya venció
+    ESPERA_ESCRITURAS_MS = 50             # al cambiar de finca, cada cuánto se mira si terminaron las escrituras
+    INTERVALO_PODA_MS = 3600 * 1000       # cada hora se poda el registro de cambios
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Sistema de Cultivos")
@@ -1582,33 +1796,98 @@ class MainWindow(QMainWindow):
             QLabel {
                 color: #33691e;
             }
-            QLineEdit, QComboBox, QTextEdit, QListWidget {
+            QLineEdit, QComboBox, QTextEdit, QListWidget, QTableView {
                 background-color: #f1f8e9;
                 border: 1px solid #c5e1a5;
                 border-radius: 3px;
                 padding: 4px;
             }
         """)
+        # Consultas en segundo plano e indicador de actividad en la barra de estado
+        self.consultas = tareas.EjecutorConsultas(self)
+        self.indicador_ocupado = QProgressBar()
+        self.indicador_ocupado.setRange(0, 0)
+        self.indicador_ocupado.setMaximumWidth(120)
+        self.indicador_ocupado.hide()
+        self.statusBar().addPermanentWidget(self.indicador_ocupado)
+        self.consultas.ocupado.connect(self.indicador_ocupado.setVisible)
+        self.pantalla_actual = None
+        # Las pantallas se construyen la primera vez que se muestran (ver pantalla());
+        # las que cargan datos en su constructor recién consultan la base en ese momento.
+        self.fabricas = {
+            "login": LoginScreen,
+            "main": MainScreen,
+            "registrar": RegistrarScreen,
+            "buscar": BuscarScreen,
+            "perfil": PerfilScreen,
+            "informe": InformeScreen,
+            "consulta": ConsultaScreen,
+            "pronostico": PronosticoScreen,
+            "calendario": CalendarioScreen,
+            "gestionar_hectareas": GestionarHectareasScreen,
+            "gestion_cultivo": GestionCultivoScreen,
+            "usuarios": UserManagementScreen,
+            "cultivos": CultivosScreen,
+            "gestion_hortaliza": TipoHortalizaManagementScreen,
+            "gestion_suelo": TipoSueloManagementScreen,
+            "gestion_clima": ClimaManagementScreen,
+            "gestion_tipo_cultivo": TipoCultivoManagementScreen,
+        }
         self.screens = {}
-        self.screens["login"] = LoginScreen(self)
-        self.screens["main"] = MainScreen(self)
-        self.screens["registrar"] = RegistrarScreen(self)
-        self.screens["buscar"] = BuscarScreen(self)
-        self.screens["perfil"] = PerfilScreen(self)
-        self.screens["informe"] = InformeScreen(self)
-        self.screens["consulta"] = ConsultaScreen(self)
-        self.screens["gestionar_hectareas"] = GestionarHectareasScreen(self)
-        self.screens["gestion_cultivo"] = GestionCultivoScreen(self)
-        self.screens["usuarios"] = UserManagementScreen(self)
-        self.screens["cultivos"] = CultivosScreen(self)
-        self.screens["gestion_hortaliza"] = TipoHortalizaManagementScreen(self)
-        self.screens["gestion_suelo"] = TipoSueloManagementScreen(self)
-        self.screens["gestion_clima"] = ClimaManagementScreen(self)
-        self.screens["gestion_tipo_cultivo"] = TipoCultivoManagementScreen(self)
-        for screen in self.screens.values():
-            self.stack.addWidget(screen)
+        # Cambios hechos por otras instancias sobre el mismo archivo: se consulta el
+        # registro periódicamente y se actualiza la lista de la pantalla visible
+        self.version_cambios = None
+        self.tarea_cambios = None
+        self.cambiando_finca = False
+        self.temporizador_cambios = QTimer(self)
+        self.temporizador_cambios.timeout.connect(self.buscar_cambios)
+        self.temporizador_cambios.start(self.INTERVALO_CAMBIOS_MS)
+        # Respaldo automático en segundo plano; la base sigue disponible mientras se copia
+        self.tarea_respaldo = None
+        self.temporizador_respaldo = QTimer(self)
+        self.temporizador_respaldo.timeout.connect(lambda: self.respaldar(respaldo.respaldar_si_vencido))
+        self.temporizador_respaldo.start(self.INTERVALO_RESPALDO_MS)
+        # El registro de cambios se poda en segundo plano, no al arrancar (ver inicializar_db)
+        self.temporizador_poda = QTimer(self)
+        self.temporizador_poda.timeout.connect(lambda: self.consultas.ejecutar("mantenimiento", cambios.podar))
+        self.temporizador_poda.start(self.INTERVALO_PODA_MS)
         self.show_screen("login")
     
+    def pantalla(self, name):
+        """Devuelve la pantalla 'name', construyéndola si todavía no existe."""
+        if name not in self.screens:
+            screen = self.fabricas[name](self)
+            self.screens[name] = screen
+            self.stack.addWidget(screen)
+            arranque.marcar(f"pantalla {name} construida")
+        return self.screens[name]
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        arranque.terminar()
+    
+    def buscar_cambios(self):
+        if self.cambiando_finca or self.consultas.pendiente(self.tarea_cambios):
+            return
+        self.tarea_cambios = self.consultas.ejecutar("cambios", cambios.tablas_cambiadas, self.version_cambios,
+                                                     al_terminar=self.aplicar_cambios)
+    
+    def aplicar_cambios(self, resultado):
+        version, tablas = resultado
+        if self.version_cambios is None:
+            # Primera consulta: solo fija desde dónde mirar
+            self.version_cambios = version
+            return
+        self.version_cambios = version
+        for tabla in tablas & catalogos.CONSULTAS.keys():
+            catalogos.invalidar(tabla)
+        screen = self.screens.get(self.pantalla_actual)
+        sincronizada = getattr(screen, "sincronizada", None)
+        if sincronizada is not None and sincronizada.tabla in tablas:
+            sincronizada.actualizar()
+        elif self.pantalla_actual == "calendario" and tablas & {"hectareas", "tipo_cultivo"}:
+            screen.cargar_mes()
+    
     def update_menu(self):
         menu_bar = self.menuBar()
         menu_bar.clear()
@@ -1618,31 +1897,178 @@ class MainWindow(QMainWindow):
             accion_gestionar_suelo.triggered.connect(lambda: self.show_screen("gestion_suelo"))
             accion_gestionar_tipo_cultivo = datos_menu.addAction("Gestionar Tipos de Cultivo")
             accion_gestionar_tipo_cultivo.triggered.connect(lambda: self.show_screen("gestion_tipo_cultivo"))
+            datos_menu.addSeparator()
+            accion_respaldar = datos_menu.addAction("Respaldar ahora")
+            accion_respaldar.triggered.connect(lambda: self.respaldar(respaldo.respaldar))
+    
+    def cambiar_finca(self, codigo, al_terminar=None):
+        """
+        Pasa la aplicación a otra finca en segundo plano (activar aplica las migraciones de
+        su base) y después llama a al_terminar(). Se descartan las consultas pendientes;
+        las escrituras en curso terminan antes sobre la finca anterior, y avisan si fallan,
+        y el respaldo sigue copiando la base con la que empezó. Las pantallas ya construidas
+        (salvo la visible) se vuelven a armar con los datos de la nueva base la próxima vez
+        que se muestren.
+        """
+        self.cambiando_finca = True
+        self.consultas.cancelar_todo(excepto=("escrituras", "respaldo"))
+        if self.consultas.grupo_pendiente("escrituras"):
+            QTimer.singleShot(self.ESPERA_ESCRITURAS_MS, lambda: self.cambiar_finca(codigo, al_terminar))
+            return
+        self.consultas.ejecutar(
+            "finca", fincas.activar, codigo,
+            al_terminar=lambda finca: self.finca_activada(finca, al_terminar),
+            al_fallar=lambda error: self.finca_fallida(error, al_terminar))
+    
+    def finca_activada(self, finca, al_terminar):
+        self.cambiando_finca = False
+        for name, screen in list(self.screens.items()):
+            if name != self.pantalla_actual:
+                self.stack.removeWidget(screen)
+                screen.deleteLater()
+                del self.screens[name]
+        self.version_cambios = None
+        self.setWindowTitle(f"Sistema de Cultivos - {finca[1]}")
+        if al_terminar is not None:
+            al_terminar()
+    
+    def finca_fallida(self, error, al_terminar):
+        self.cambiando_finca = False
+        QMessageBox.critical(self, "Error", f"No se pudo abrir la finca: {error}")
+        if al_terminar is not None:
+            al_terminar()
+    
+    def respaldar(self, funcion):
+        """Corre funcion (respaldar o respaldar_si_vencido) en segundo plano, de a un respaldo por vez."""
+        if self.consultas.pendiente(self.tarea_respaldo):
+            return
+        self.statusBar().showMessage("Respaldando la base...")
+        self.tarea_respaldo = self.consultas.ejecutar(
+            "respaldo", funcion,
+            al_terminar=self.respaldo_terminado,
+            al_fallar=lambda error: self.statusBar().showMessage(f"No se pudo respaldar la base: {error}"))
+    
+    def respaldo_terminado(self, ruta):
+        if ruta is None:
+            self.statusBar().clearMessage()
+        else:
+            self.statusBar().showMessage(f"Respaldo verificado en {ruta}")
     
     def show_screen(self, name):
+        with trazas.medir("pantalla", name):
+            self._mostrar_pantalla(name)
+
+    def _mostrar_pantalla(self, name):
         # Restricción de acceso: Solo el administrador puede acceder a las pantallas de gestión de usuarios,
         # gestión de tipo cultivo, gestión de cultivo y gestión de hectáreas.
         if name in ["usuarios", "gestion_tipo_cultivo", "gestion_cultivo", "gestionar_hectareas"] and self.user_role != "admin":
             QMessageBox.critical(self, "Acceso Denegado", "Solo el administrador puede acceder a esta opción.")
             return
+        screen = self.pantalla(name)
         if name == "login":
-            self.screens["login"].refresh_users()
+            screen.cargar_fincas()
+            screen.refresh_users()
             self.menuBar().clear()
         elif name == "main":
-            self.screens["main"].update_header()
+            screen.update_header()
             self.update_menu()
         elif name == "perfil":
-            self.screens["perfil"].cargar_perfil()
+            screen.cargar_perfil()
         elif name == "informe":
-            self.screens["informe"].cargar_informe()
-        self.stack.setCurrentWidget(self.screens[name])
+            screen.cargar_informe()
+        elif name == "pronostico":
+            screen.cargar_pronostico()
+        elif name == "calendario":
+            screen.cargar_mes()
+        if getattr(screen, "sincronizada", None) is not None:
+            screen.sincronizada.actualizar()
+        # Los resultados que la pantalla anterior todavía esperaba ya no interesan
+        if self.pantalla_actual is not None and self.pantalla_actual != name:
+            self.consultas.cancelar(self.pantalla_actual)
+        self.pantalla_actual = name
+        self.stack.setCurrentWidget(screen)
+        estadisticas = datos.estadisticas()
+        cache = catalogos.estadisticas()
+        self.statusBar().showMessage(f"Conexiones abiertas: {estadisticas['conexiones_abiertas']} | "
+                                     f"Sentencias ejecutadas: {estadisticas['sentencias_ejecutadas']} | "
+                                     f"Catálogos: {cache['aciertos']} aciertos / {cache['fallos']} fallos")
+
+# -----------------------------
+# Aplicación con métricas de botones
+# -----------------------------
+class AplicacionMedida(QApplication):
+    """
+    Mide cada clic de botón (el manejador corre dentro de notify) y lo registra en trazas
+    como "Pantalla[texto del botón]". El tiempo con un diálogo modal abierto (confirmaciones,
+    mensajes, formularios) es espera del usuario y se descuenta de la medición.
+    """
+    def __init__(self, argv):
+        super().__init__(argv)
+        self._dialogos_abiertos = 0
+        self._dialogo_desde = 0.0
+        self._en_dialogos = 0.0   # segundos acumulados con algún diálogo abierto
+
+    def notify(self, receptor, evento):
+        if not trazas.activo():
+            return super().notify(receptor, evento)
+        tipo = evento.type()
+        if tipo in (QEvent.MouseButtonRelease, QEvent.KeyRelease) and isinstance(receptor, QAbstractButton) \
+                and receptor.isDown():
+            return self._medir_boton(receptor, evento)
+        if tipo in (QEvent.Show, QEvent.Hide) and isinstance(receptor, QDialog) and not evento.spontaneous():
+            self._contar_dialogo(tipo == QEvent.Show)
+        return super().notify(receptor, evento)
+
+    def _contar_dialogo(self, abierto):
+        if abierto:
+            if self._dialogos_abiertos == 0:
+                self._dialogo_desde = time.perf_counter()
+            self._dialogos_abiertos += 1
+        elif self._dialogos_abiertos:
+            self._dialogos_abiertos -= 1
+            if self._dialogos_abiertos == 0:
+                self._en_dialogos += time.perf_counter() - self._dialogo_desde
+
+    def _tiempo_en_dialogos(self):
+        abierto = time.perf_counter() - self._dialogo_desde if self._dialogos_abiertos else 0.0
+        return self._en_dialogos + abierto
+
+    def _medir_boton(self, boton, evento):
+        pantalla = boton.parentWidget()
+        # La pantalla es el widget que cuelga del QStackedWidget (o el diálogo que contiene al botón)
+        while pantalla is not None and not isinstance(pantalla, QDialog) \
+                and not isinstance(pantalla.parentWidget(), QStackedWidget):
+            pantalla = pantalla.parentWidget()
+        nombre = f"{type(pantalla).__name__ if pantalla is not None else 'MainWindow'}[{boton.text()}]"
+        inicio, espera_inicial = time.perf_counter(), self._tiempo_en_dialogos()
+        try:
+            with trazas.origen(nombre):
+                return super().notify(boton, evento)
+        finally:
+            espera = self._tiempo_en_dialogos() - espera_inicial
+            total = time.perf_counter() - inicio
+            trazas.registrar("boton", nombre, (total - espera) * 1000, espera_dialogos_ms=round(espera * 1000, 3))
 
 # -----------------------------
 # Ejecutar la aplicación
 # -----------------------------
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Métricas de consultas y pantallas, solo si se piden (AGRARIO_METRICAS=metricas.jsonl);
+    # una ruta relativa va junto a la base, no al directorio de trabajo
+    ruta_metricas = os.environ.get("AGRARIO_METRICAS")
+    if ruta_metricas:
+        trazas.activar(os.path.join(datos.carpeta_datos(), ruta_metricas))
     inicializar_db()
-    app = QApplication(sys.argv)
+    # Con fincas.db y una base que no es de ninguna finca, se arranca en la primera
+    if fincas.activa() is None and fincas.listar():
+        fincas.activar(fincas.listar()[0][0])
+    arranque.marcar("base de datos lista")
+    app = AplicacionMedida(sys.argv)
     window = MainWindow()
+    arranque.marcar("ventana creada")
     window.show()
-    sys.exit(app.exec_())
+    codigo_salida = app.exec_()
+    window.consultas.esperar()
+    datos.cerrar_conexion()
+    sys.exit(codigo_salida)
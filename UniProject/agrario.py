@@ -0,0 +1,327 @@
+import argparse
+import sqlite3
+import sys
+from datetime import date
+
+import datos
+import migraciones
+import nucleo
+import trazas
+
+# -----------------------------
+# Línea de comandos (sin interfaz gráfica)
+# -----------------------------
+# Uso: python -m agrario <comando> [opciones]   (desde la carpeta UniProject)
+# No importa PyQt5, así sirve en tareas programadas y servidores sin pantalla. Los
+# módulos que solo usa un comando se importan dentro de ese comando.
+
+
+def cmd_registrar(args):
+    hectarea = nucleo.Hectarea(args.numero, args.cultivo, args.siembra, args.primera, args.rutinaria,
+                               args.suelo, args.temperatura)
+    hectarea.guardar_en_bd()
+    print(f"Hectárea {hectarea.numero} registrada: primera cosecha {hectarea.primeracosecha:%Y-%m-%d}, "
+          f"rutinaria {hectarea.cosecha_rutinaria}")
+
+
+def cmd_importar(args):
+    import importador
+    resultado = importador.importar(args.archivo, args.lote, args.rechazos)
+    print(resultado)
+    for linea, motivo in resultado.rechazos[:20]:
+        print(f"  línea {linea}: {motivo}")
+
+
+def cmd_listar(args):
+    print("\t".join(nucleo.Hectarea.COLUMNAS))
+    for fila in nucleo.Hectarea.pagina(args.desde, args.limite):
+        print("\t".join("" if v is None else str(v) for v in fila))
+
+
+def cmd_buscar(args):
+    if args.texto.isdigit():
+        hectarea = nucleo.Hectarea.buscar(int(args.texto))
+        if hectarea is None:
+            print(f"No se encontró la Hectárea {args.texto}.")
+            return 1
+        for columna, valor in zip(nucleo.Hectarea.COLUMNAS, hectarea[1:]):
+            print(f"{columna}: {valor}")
+        return 0
+    import buscador
+    resultados = buscador.buscar(args.texto, limite=args.limite)
+    for tabla, codigo, titulo, fragmento in resultados:
+        print(f"[{buscador.NOMBRES_FUENTE[tabla]} {codigo}] {titulo or ''} {fragmento}")
+    print(f"{len(resultados)} resultados")
+    return 0 if resultados else 1
+
+
+def cmd_recalcular(args):
+    print(f"{nucleo.recalcular_cosechas(args.lote)} hectáreas recalculadas")
+
+
+def cmd_informe(args):
+    import informes
+    filtros = {clave: getattr(args, clave) for clave in informes.FILTROS}
+    if args.todas_las_fincas:
+        return _informe_fincas(args, filtros)
+    if args.archivo == "-":
+        informes.ESCRITORES[args.formato or "csv"](sys.stdout, informes.filas(filtros))
+    else:
+        print(f"{informes.exportar(args.archivo, filtros, args.formato)} registros exportados a {args.archivo}")
+
+
+def _informe_fincas(args, filtros):
+    import catalogos
+    import fincas
+    import informes
+    # Los códigos de los filtros son los de la finca activa; en las demás se buscan por nombre
+    tablas = {"usuario": "usuarios", "hortaliza": "tipo_hortaliza", "suelo": "tipo_suelo", "clima": "clima"}
+    por_nombre = {clave: None if codigo is None else catalogos.nombres_por_id(tablas[clave]).get(codigo, "")
+                  for clave, codigo in filtros.items()}
+    if args.archivo == "-":
+        informes.ESCRITORES[args.formato or "csv"](sys.stdout, fincas.filas_informe(por_nombre), fincas.COLUMNAS)
+    else:
+        print(f"{fincas.exportar_informe(args.archivo, por_nombre, args.formato)} registros exportados a {args.archivo}")
+
+
+def cmd_fincas(args):
+    import fincas
+    if args.crear:
+        print("Finca creada: {} {} ({})".format(*fincas.crear(args.crear, args.archivo)))
+    if args.cultivos:
+        for cultivo, por_finca in sorted(fincas.hectareas_por_cultivo().items()):
+            print(f"{cultivo:20} {sum(por_finca.values()):9d}  " + ", ".join(
+                f"{nombre}: {cantidad}" for nombre, cantidad in sorted(por_finca.items())))
+        return 0
+    activa = fincas.activa()
+    for codigo, nombre, ruta in fincas.listar():
+        print(f"{'*' if activa and activa[0] == codigo else ' '} {codigo:4d}  {nombre:30} {ruta}")
+    return 0
+
+
+def cmd_pronostico(args):
+    import pronostico
+    if args.verificar:
+        distintas = pronostico.diferencias()
+        print(f"{len(distintas)} claves del resumen difieren del recálculo.")
+        return 1 if distintas else 0
+    desde, hasta = pronostico.rango(args.desde, args.periodos, args.escala)
+    print(pronostico.formatear(*pronostico.tabla(args.escala, desde, hasta, args.cosecha)))
+    return 0
+
+
+def cmd_calendario(args):
+    import calendario_cosechas
+    hasta = args.hasta or args.desde
+    if args.verificar:
+        problemas = calendario_cosechas.diferencias(args.desde, hasta)
+        for problema in problemas:
+            print(problema)
+        print(f"{len(problemas)} diferencias entre el índice y la expansión completa.")
+        return 1 if problemas else 0
+    if args.dia:
+        total, filas = calendario_cosechas.hectareas_del_dia(args.desde, args.limite)
+        for cosecha, numero, tipo, suelo in filas:
+            print(f"{numero:8d}  {tipo or '':20} {suelo or '':20} {cosecha}")
+        print(f"{total} hectáreas cosechan el {args.desde}.")
+        return 0
+    for fecha, cantidad in sorted(calendario_cosechas.por_dia(args.desde, hasta).items()):
+        print(f"{fecha}  {cantidad:8d}")
+    return 0
+
+
+def cmd_temperatura(args):
+    import sensores
+    if args.archivo:
+        print(sensores.ingerir_archivo(args.archivo, args.lote))
+    if args.numero is not None:
+        for inicio, promedio, movil in sensores.promedio_movil(args.numero, args.horas):
+            print(f"{sensores.hora_utc(inicio)}  {promedio:6.2f} °C  promedio {args.horas} h: {movil:6.2f} °C")
+    return 0
+
+
+def cmd_aptitud(args):
+    import aptitud
+    if args.rango:
+        hortaliza, *rango = args.rango
+        aptitud.definir_rango(int(hortaliza), *rango)
+    if args.afinidad:
+        hortaliza, suelo, afinidad = args.afinidad
+        aptitud.definir_afinidad(int(hortaliza), int(suelo), afinidad)
+    if args.verificar:
+        distintas = aptitud.diferencias()
+        print(f"{len(distintas)} combinaciones difieren del recálculo.")
+        return 1 if distintas else 0
+    if args.suelo is not None and args.clima is not None:
+        for codigo, nombre, valor in aptitud.ranking(args.suelo, args.clima, args.limite):
+            print(f"{valor:6.1f}  {codigo}: {nombre}")
+    if args.hectareas:
+        for numero, hortaliza, valor in aptitud.mejores_por_hectarea():
+            print(f"{numero:8d}  {hortaliza:6d}  {valor:6.1f}")
+    return 0
+
+
+def cmd_respaldo(args):
+    import respaldo
+    if args.listar:
+        for ruta, tamano, fecha in respaldo.listar(args.carpeta):
+            print(f"{fecha:%Y-%m-%d %H:%M:%S}  {tamano / 1e6:9.1f} MB  {ruta}")
+    elif args.verificar:
+        print(f"{args.verificar}: íntegro (esquema versión {respaldo.verificar(args.verificar)}).")
+    elif args.restaurar:
+        previo = respaldo.restaurar(args.restaurar, args.carpeta)
+        print(f"Base restaurada desde {args.restaurar}; la anterior quedó en {previo}.")
+    else:
+        print(f"Respaldo verificado en {respaldo.respaldar(args.carpeta, args.conservar)}.")
+    return 0
+
+
+def cmd_analisis(args):
+    import almacen_hectareas
+    almacen = almacen_hectareas.AlmacenHectareas.cargar().filtrar(
+        cultivo=args.cultivo, suelo=args.suelo, siembra_desde=args.desde, siembra_hasta=args.hasta)
+    for clave, (cantidad, promedio) in sorted(almacen.agrupar(args.por).items(), key=lambda item: str(item[0])):
+        print(f"{str(clave):20} {cantidad:9d}  {'' if promedio is None else f'{promedio:6.2f} °C'}")
+    return 0
+
+
+def cmd_migrar(args):
+    for numero, descripcion, segundos, cambios in migraciones.migrar(simular=args.simular):
+        print(f"{'[simulación] ' if args.simular else ''}{numero}: {descripcion} ({segundos * 1000:.1f} ms)")
+        for cambio in cambios or []:
+            print(f"    {cambio}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="python -m agrario", description="Contabilidad agrícola sin interfaz gráfica")
+    parser.add_argument("--db", default=datos.RUTA_DB,
+                        help="archivo (relativo a la carpeta del programa), URI file: o :memory: "
+                             "(por defecto AGRARIO_DB, agrario.ini o cultivos.db)")
+    parser.add_argument("--finca", help="nombre o código de la finca (según fincas.db); reemplaza a --db")
+    parser.add_argument("--metricas", metavar="ARCHIVO", help="registrar cada sentencia SQL en este archivo (JSON por línea)")
+    parser.add_argument("--umbral-lenta", type=float, default=trazas.UMBRAL_LENTA_MS,
+                        help="ms a partir de los cuales se registra el plan de la sentencia")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("registrar", help="registra una hectárea")
+    p.add_argument("cultivo")
+    p.add_argument("siembra", help="fecha YYYY-MM-DD")
+    p.add_argument("--suelo")
+    p.add_argument("--temperatura", type=float)
+    p.add_argument("--numero", type=int, help="por defecto, el siguiente de la secuencia")
+    p.add_argument("--primera", help="primera cosecha YYYY-MM-DD (por defecto se calcula)")
+    p.add_argument("--rutinaria", help="cosecha rutinaria YYYY-MM-DD (por defecto se calcula)")
+    p.set_defaults(funcion=cmd_registrar)
+
+    p = comandos.add_parser("importar", help="importa hectáreas desde CSV o JSONL")
+    p.add_argument("archivo")
+    p.add_argument("--lote", type=int, default=5000, help="filas por transacción")
+    p.add_argument("--rechazos", help="archivo CSV donde escribir las filas rechazadas")
+    p.set_defaults(funcion=cmd_importar)
+
+    p = comandos.add_parser("listar", help="lista hectáreas ordenadas por número")
+    p.add_argument("--desde", type=int, help="mostrar números mayores que este")
+    p.add_argument("--limite", type=int, default=50)
+    p.set_defaults(funcion=cmd_listar)
+
+    p = comandos.add_parser("buscar", help="muestra una hectárea por número o busca texto en catálogos y gestiones")
+    p.add_argument("texto")
+    p.add_argument("--limite", type=int, default=20)
+    p.set_defaults(funcion=cmd_buscar)
+
+    p = comandos.add_parser("recalcular", help="recalcula las cosechas de todas las hectáreas")
+    p.add_argument("--lote", type=int, default=5000)
+    p.set_defaults(funcion=cmd_recalcular)
+
+    p = comandos.add_parser("informe", help="exporta el informe de gestión (csv, html o txt)")
+    p.add_argument("archivo", help="archivo de salida; '-' escribe por la salida estándar")
+    p.add_argument("--formato", choices=("csv", "html", "txt"))
+    for clave in ("usuario", "hortaliza", "suelo", "clima"):
+        p.add_argument(f"--{clave}", type=int, help=f"código de {clave}")
+    p.add_argument("--todas-las-fincas", action="store_true", help="juntar el informe de todas las fincas")
+    p.set_defaults(funcion=cmd_informe)
+
+    p = comandos.add_parser("fincas", help="lista o crea fincas; hectáreas por cultivo en todas")
+    p.add_argument("--crear", metavar="NOMBRE", help="registrar una finca (base nueva o --archivo existente)")
+    p.add_argument("--archivo", help="con --crear, base existente de la finca")
+    p.add_argument("--cultivos", action="store_true", help="hectáreas por cultivo sumando todas las fincas")
+    p.set_defaults(funcion=cmd_fincas)
+
+    p = comandos.add_parser("pronostico", help="hectáreas a cosechar por cultivo y mes o semana")
+    p.add_argument("--escala", choices=("mes", "semana"), default="mes")
+    p.add_argument("--desde", type=date.fromisoformat, help="fecha YYYY-MM-DD (por defecto, hoy)")
+    p.add_argument("--periodos", type=int, help="cantidad de meses o semanas")
+    p.add_argument("--cosecha", choices=("primera", "rutinaria"))
+    p.add_argument("--verificar", action="store_true", help="compara el resumen con un recálculo completo")
+    p.set_defaults(funcion=cmd_pronostico)
+
+    p = comandos.add_parser("calendario", help="cosechas por día entre dos fechas, incluidas las recurrentes")
+    p.add_argument("desde", type=date.fromisoformat, help="fecha YYYY-MM-DD")
+    p.add_argument("hasta", type=date.fromisoformat, nargs="?", help="fecha YYYY-MM-DD (por defecto, la misma)")
+    p.add_argument("--dia", action="store_true", help="listar las hectáreas que cosechan el día 'desde'")
+    p.add_argument("--limite", type=int, default=50)
+    p.add_argument("--verificar", action="store_true", help="compara el índice con la expansión completa")
+    p.set_defaults(funcion=cmd_calendario)
+
+    p = comandos.add_parser("temperatura", help="ingesta de lecturas de sensores y promedio móvil por hectárea")
+    p.add_argument("numero", type=int, nargs="?", help="número de hectárea")
+    p.add_argument("--horas", type=int, default=24, help="ventana del promedio móvil")
+    p.add_argument("--archivo", help="guardar antes las lecturas de este archivo (numero,instante,temperatura)")
+    p.add_argument("--lote", type=int, default=5000, help="lecturas por transacción")
+    p.set_defaults(funcion=cmd_temperatura)
+
+    p = comandos.add_parser("aptitud", help="hortalizas recomendadas por suelo y clima, y reglas de aptitud")
+    p.add_argument("--suelo", type=int, help="código de tipo_suelo")
+    p.add_argument("--clima", type=int, help="código de clima")
+    p.add_argument("--limite", type=int, default=10)
+    p.add_argument("--hectareas", action="store_true", help="mejor hortaliza para cada hectárea (numero, hortaliza, puntaje)")
+    p.add_argument("--rango", nargs=4, type=float, metavar=("HORTALIZA", "MINIMA", "OPTIMA", "MAXIMA"),
+                   help="definir el rango de temperatura de una hortaliza")
+    p.add_argument("--afinidad", nargs=3, type=float, metavar=("HORTALIZA", "SUELO", "AFINIDAD"),
+                   help="definir la afinidad (0 a 1) de una hortaliza con un suelo")
+    p.add_argument("--verificar", action="store_true", help="compara la matriz con un recálculo completo")
+    p.set_defaults(funcion=cmd_aptitud)
+
+    p = comandos.add_parser("respaldo", help="respalda la base en línea, lista, verifica o restaura respaldos")
+    p.add_argument("--carpeta", help="carpeta de respaldos (por defecto 'respaldos' junto a la base)")
+    p.add_argument("--conservar", type=int, default=7, help="respaldos que quedan al rotar")
+    p.add_argument("--listar", action="store_true")
+    p.add_argument("--verificar", metavar="RESPALDO", help="correr integrity_check sobre un respaldo")
+    p.add_argument("--restaurar", metavar="RESPALDO", help="reemplazar la base por un respaldo verificado")
+    p.set_defaults(funcion=cmd_respaldo)
+
+    p = comandos.add_parser("analisis", help="hectáreas y temperatura media agrupadas, en memoria por columnas")
+    p.add_argument("--por", choices=("cultivo", "suelo", "anio_siembra"), default="cultivo")
+    p.add_argument("--cultivo", help="solo este tipo de cultivo")
+    p.add_argument("--suelo", help="solo este tipo de suelo")
+    p.add_argument("--desde", type=date.fromisoformat, help="sembradas desde esta fecha (YYYY-MM-DD)")
+    p.add_argument("--hasta", type=date.fromisoformat, help="sembradas hasta esta fecha (YYYY-MM-DD)")
+    p.set_defaults(funcion=cmd_analisis)
+
+    p = comandos.add_parser("migrar", help="aplica las migraciones pendientes")
+    p.add_argument("--simular", action="store_true")
+    p.set_defaults(funcion=cmd_migrar)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    datos.configurar(args.db)
+    if args.metricas:
+        trazas.activar(args.metricas, args.umbral_lenta)
+    try:
+        if args.finca:
+            import fincas
+            fincas.activar(args.finca)
+        elif args.comando != "migrar":
+            nucleo.inicializar_db()
+        return args.funcion(args) or 0
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        datos.cerrar_conexion()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
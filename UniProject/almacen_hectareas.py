@@ -0,0 +1,422 @@
+import argparse
+import math
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import date, datetime
+
+import datos
+import migraciones
+from nucleo import Hectarea
+
+# NumPy es opcional, como en cosechas.py: sin él, filtrar y agrupar recorren los arreglos en Python
+np = None
+_numpy_buscado = False
+
+# -----------------------------
+# Almacén columnar de hectáreas
+# -----------------------------
+# Para analizar cientos de miles o millones de hectáreas no conviene tener una tupla (o
+# un objeto Hectarea, con su __dict__, dos datetime y las fechas como texto) por fila.
+# El almacén guarda cada columna en un arreglo tipado del módulo array: número (int64),
+# siembra y cosechas como ordinales de día (int32, 0 = sin fecha) y temperatura (float64,
+# NaN = sin dato). Cultivo y suelo se codifican con un diccionario: el arreglo guarda un
+# código de 2 bytes y los textos distintos se guardan una sola vez. Un millón de
+# hectáreas ocupa unos 30 MB. Las filas se leen de la base por bloques, sin fetchall, y
+# filtrar() / agrupar() trabajan sobre los arreglos (con NumPy, sin copiarlos).
+# almacen[i] devuelve una VistaHectarea, que ofrece los atributos de Hectarea sin copiar
+# la fila. Las fechas que no son fechas válidas se guardan como "sin fecha".
+#
+# Uso:
+#   python almacen_hectareas.py --cultivo                     (hectáreas y temperatura media por cultivo)
+#   python almacen_hectareas.py --anio --suelo Arcilloso      (por año de siembra, solo ese suelo)
+#   python almacen_hectareas.py --medir --muestra 100000      (memoria por fila: tuplas, Hectarea, almacén)
+#   python almacen_hectareas.py --verificar                   (compara con la base y con GROUP BY)
+
+TAMANO_BLOQUE = 10000
+AGRUPACIONES = ("cultivo", "suelo", "anio_siembra")
+_SIN_DATO = float("nan")
+_CONSULTA = """
+    SELECT numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura
+    FROM hectareas ORDER BY numero
+"""
+
+
+def _numpy():
+    """Devuelve el módulo numpy, o None si no está instalado."""
+    global np, _numpy_buscado
+    if not _numpy_buscado:
+        _numpy_buscado = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+class _Ordinales(dict):
+    """Texto de fecha -> ordinal de día (0 si no es una fecha); cada texto distinto se convierte una vez."""
+    def __missing__(self, texto):
+        try:
+            ordinal = date.fromisoformat(texto).toordinal()
+        except (TypeError, ValueError):
+            ordinal = 0
+        self[texto] = ordinal
+        return ordinal
+
+
+class _Diccionario(dict):
+    """Valor -> código, asignando el siguiente código a cada valor nuevo; valores[código] -> valor."""
+    def __init__(self):
+        super().__init__()
+        self.valores = []
+
+    def __missing__(self, valor):
+        codigo = len(self.valores)
+        self.valores.append(valor)
+        self[valor] = codigo
+        return codigo
+
+
+def _texto_fecha(ordinal):
+    return date.fromordinal(ordinal).isoformat() if ordinal else None
+
+
+def _real(valor):
+    try:
+        return float(valor) if valor not in (None, "") else _SIN_DATO
+    except (TypeError, ValueError):
+        return _SIN_DATO
+
+
+# -----------------------------
+# Vista de una fila
+# -----------------------------
+class VistaHectarea:
+    """Fila 'indice' del almacén con los atributos y tipos de Hectarea; no copia nada."""
+    __slots__ = ("_almacen", "_indice")
+
+    def __init__(self, almacen, indice):
+        self._almacen = almacen
+        self._indice = indice
+
+    @property
+    def numero(self):
+        return self._almacen.numero[self._indice]
+
+    @property
+    def tipo_de_cultivo(self):
+        return self._almacen.cultivos.valores[self._almacen.cultivo[self._indice]]
+
+    @property
+    def tipo_suelo(self):
+        return self._almacen.suelos.valores[self._almacen.suelo[self._indice]]
+
+    @property
+    def siembra(self):
+        ordinal = self._almacen.siembra[self._indice]
+        return datetime.fromordinal(ordinal) if ordinal else None
+
+    @property
+    def primeracosecha(self):
+        ordinal = self._almacen.primera[self._indice]
+        return datetime.fromordinal(ordinal) if ordinal else None
+
+    @property
+    def cosecha_rutinaria(self):
+        return _texto_fecha(self._almacen.rutinaria[self._indice])
+
+    @property
+    def temperatura(self):
+        valor = self._almacen.temperatura[self._indice]
+        return None if math.isnan(valor) else valor
+
+    def fila(self):
+        """La fila como la devuelve la base (columnas de Hectarea.COLUMNAS, fechas como texto)."""
+        almacen, i = self._almacen, self._indice
+        return (almacen.numero[i], self.tipo_de_cultivo, _texto_fecha(almacen.siembra[i]),
+                _texto_fecha(almacen.primera[i]), _texto_fecha(almacen.rutinaria[i]), self.tipo_suelo,
+                self.temperatura)
+
+    def hectarea(self):
+        """Un objeto Hectarea completo con los datos de la fila."""
+        numero, tipo, siembra, primera, rutinaria, suelo, temperatura = self.fila()
+        return Hectarea(numero, tipo or "", siembra, primera, rutinaria, suelo, temperatura)
+
+    def __repr__(self):
+        return f"VistaHectarea{self.fila()}"
+
+
+# -----------------------------
+# Almacén
+# -----------------------------
+class AlmacenHectareas:
+    """Hectáreas guardadas por columnas. Se llena con cargar() o extender() y no se modifica."""
+
+    def __init__(self, cultivos=None, suelos=None):
+        self.numero = array("q")
+        self.siembra = array("i")
+        self.primera = array("i")
+        self.rutinaria = array("i")
+        self.temperatura = array("d")
+        self.cultivo = array("H")
+        self.suelo = array("H")
+        # Los subconjuntos (filtrar) comparten los diccionarios del almacén original
+        self.cultivos = _Diccionario() if cultivos is None else cultivos
+        self.suelos = _Diccionario() if suelos is None else suelos
+        self._ordinales = _Ordinales()
+
+    @classmethod
+    def cargar(cls, tamano_bloque=TAMANO_BLOQUE):
+        """Lee todas las hectáreas de la base, de a 'tamano_bloque' filas."""
+        almacen = cls()
+        for bloque in datos.consultar_por_bloques(_CONSULTA, (), tamano_bloque, lectura=True):
+            almacen.extender(bloque)
+        return almacen
+
+    def extender(self, filas):
+        """Agrega filas con las columnas de Hectarea.COLUMNAS, en ese orden."""
+        ordinales, cultivos, suelos = self._ordinales, self.cultivos, self.suelos
+        self.numero.extend([fila[0] for fila in filas])
+        self.siembra.extend([ordinales[fila[2]] for fila in filas])
+        self.primera.extend([ordinales[fila[3]] for fila in filas])
+        self.rutinaria.extend([ordinales[fila[4]] for fila in filas])
+        try:
+            self.temperatura.extend([_SIN_DATO if fila[6] is None else fila[6] for fila in filas])
+        except TypeError:
+            # Algún valor no numérico: se convierte fila por fila
+            del self.temperatura[len(self.numero) - len(filas):]
+            self.temperatura.extend([_real(fila[6]) for fila in filas])
+        self._extender_codigos("cultivo", [cultivos[fila[1]] for fila in filas])
+        self._extender_codigos("suelo", [suelos[fila[5]] for fila in filas])
+
+    def _extender_codigos(self, columna, codigos):
+        arreglo = getattr(self, columna)
+        if arreglo.typecode == "H" and codigos and max(codigos) > 0xFFFF:
+            arreglo = array("I", arreglo)
+            setattr(self, columna, arreglo)
+        arreglo.extend(codigos)
+
+    def __len__(self):
+        return len(self.numero)
+
+    def __getitem__(self, indice):
+        if not -len(self) <= indice < len(self):
+            raise IndexError(indice)
+        return VistaHectarea(self, indice % len(self))
+
+    def __iter__(self):
+        return (VistaHectarea(self, i) for i in range(len(self)))
+
+    def _columnas(self):
+        return ("numero", "siembra", "primera", "rutinaria", "temperatura", "cultivo", "suelo")
+
+    def memoria(self):
+        """Bytes aproximados que ocupan los arreglos y los textos de los diccionarios."""
+        arreglos = sum(len(getattr(self, c)) * getattr(self, c).itemsize for c in self._columnas())
+        textos = sum(sys.getsizeof(v) for v in self.cultivos.valores + self.suelos.valores)
+        return arreglos + textos
+
+    # -----------------------------
+    # Filtrar
+    # -----------------------------
+    def filtrar(self, cultivo=None, suelo=None, siembra_desde=None, siembra_hasta=None,
+                temperatura_minima=None, temperatura_maxima=None):
+        """
+        Nuevo almacén con las hectáreas que cumplen todas las condiciones indicadas
+        (fechas como date, inclusive; las hectáreas sin temperatura no pasan un filtro
+        de temperatura). Comparte los diccionarios con este almacén.
+        """
+        condiciones = []
+        for columna, diccionario, valor in (("cultivo", self.cultivos, cultivo), ("suelo", self.suelos, suelo)):
+            if valor is not None:
+                if valor not in diccionario:
+                    return self._tomar([])
+                condiciones.append((columna, "==", diccionario[valor]))
+        if siembra_desde is not None:
+            condiciones.append(("siembra", ">=", siembra_desde.toordinal()))
+        if siembra_hasta is not None:
+            condiciones.append(("siembra", "<=", siembra_hasta.toordinal()))
+            condiciones.append(("siembra", ">=", 1))
+        if temperatura_minima is not None:
+            condiciones.append(("temperatura", ">=", temperatura_minima))
+        if temperatura_maxima is not None:
+            condiciones.append(("temperatura", "<=", temperatura_maxima))
+        if _numpy() is None:
+            return self._tomar(self._filtrar_por_filas(condiciones))
+        return self._tomar_vectorizado(self._filtrar_vectorizado(condiciones))
+
+    def _vista(self, columna):
+        """La columna como arreglo de NumPy sobre la misma memoria (sin copia)."""
+        arreglo = getattr(self, columna)
+        return np.frombuffer(arreglo, dtype=arreglo.typecode) if len(arreglo) else np.empty(0, arreglo.typecode)
+
+    def _filtrar_vectorizado(self, condiciones):
+        mascara = np.ones(len(self), dtype=bool)
+        for columna, operador, valor in condiciones:
+            vista = self._vista(columna)
+            mascara &= (vista == valor) if operador == "==" else (vista >= valor) if operador == ">=" else (vista <= valor)
+        return np.flatnonzero(mascara)
+
+    def _filtrar_por_filas(self, condiciones):
+        indices = range(len(self))
+        for columna, operador, valor in condiciones:
+            arreglo = getattr(self, columna)
+            if operador == "==":
+                indices = [i for i in indices if arreglo[i] == valor]
+            elif operador == ">=":
+                indices = [i for i in indices if arreglo[i] >= valor]
+            else:
+                indices = [i for i in indices if arreglo[i] <= valor]
+        return indices
+
+    def _tomar(self, indices):
+        subconjunto = AlmacenHectareas(self.cultivos, self.suelos)
+        for columna in self._columnas():
+            arreglo = getattr(self, columna)
+            setattr(subconjunto, columna, array(arreglo.typecode, [arreglo[i] for i in indices]))
+        return subconjunto
+
+    def _tomar_vectorizado(self, indices):
+        subconjunto = AlmacenHectareas(self.cultivos, self.suelos)
+        for columna in self._columnas():
+            arreglo = getattr(self, columna)
+            setattr(subconjunto, columna, array(arreglo.typecode, self._vista(columna)[indices].tobytes()))
+        return subconjunto
+
+    # -----------------------------
+    # Agrupar
+    # -----------------------------
+    def agrupar(self, por):
+        """
+        {clave: (hectáreas, temperatura media o None)} agrupando por 'por' (cultivo,
+        suelo o anio_siembra). Las hectáreas sin siembra quedan bajo la clave None.
+        """
+        if por not in AGRUPACIONES:
+            raise ValueError(f"No se puede agrupar por '{por}'")
+        if _numpy() is None:
+            return self._agrupar_por_filas(por)
+        return self._agrupar_vectorizado(por)
+
+    def _claves(self, por):
+        """(códigos por fila, valor de cada código) para la agrupación pedida."""
+        if por == "cultivo":
+            return self.cultivo, self.cultivos.valores
+        if por == "suelo":
+            return self.suelo, self.suelos.valores
+        anios = _Diccionario()
+        return [anios[date.fromordinal(o).year if o else None] for o in self.siembra], anios.valores
+
+    def _agrupar_por_filas(self, por):
+        codigos, valores = self._claves(por)
+        cantidades, sumas, con_dato = [0] * len(valores), [0.0] * len(valores), [0] * len(valores)
+        for codigo, temperatura in zip(codigos, self.temperatura):
+            cantidades[codigo] += 1
+            if temperatura == temperatura:   # NaN no es igual a sí mismo
+                sumas[codigo] += temperatura
+                con_dato[codigo] += 1
+        return {valores[c]: (cantidades[c], sumas[c] / con_dato[c] if con_dato[c] else None)
+                for c in range(len(valores)) if cantidades[c]}
+
+    def _agrupar_vectorizado(self, por):
+        if por == "anio_siembra":
+            # Los años salen de los ordinales distintos, que son pocos miles aunque haya millones de filas
+            distintos, codigos = np.unique(self._vista("siembra"), return_inverse=True)
+            anios = _Diccionario()
+            traduccion = np.array([anios[date.fromordinal(int(o)).year if o else None] for o in distintos],
+                                  dtype=np.int64)
+            codigos, valores = traduccion[codigos] if len(distintos) else codigos, anios.valores
+        else:
+            codigos, valores = self._vista(por), getattr(self, por + "s").valores
+        temperatura = self._vista("temperatura")
+        con_dato = ~np.isnan(temperatura)
+        cantidades = np.bincount(codigos, minlength=len(valores))
+        sumas = np.bincount(codigos[con_dato], weights=temperatura[con_dato], minlength=len(valores))
+        medidas = np.bincount(codigos[con_dato], minlength=len(valores))
+        return {valores[c]: (int(cantidades[c]), float(sumas[c] / medidas[c]) if medidas[c] else None)
+                for c in range(len(valores)) if cantidades[c]}
+
+
+# -----------------------------
+# Verificación y medición
+# -----------------------------
+
+def verificar(almacen=None):
+    """Lista de diferencias entre el almacén y la base (filas y conteos por cultivo y suelo)."""
+    almacen = AlmacenHectareas.cargar() if almacen is None else almacen
+    diferencias = []
+    ordinales = _Ordinales()
+    for i, fila in enumerate(datos.consultar(_CONSULTA)):
+        # Las fechas inválidas de la base se leen como "sin fecha"
+        esperada = tuple(_texto_fecha(ordinales[v]) if 2 <= j <= 4 else v for j, v in enumerate(fila))
+        if almacen[i].fila() != esperada:
+            diferencias.append(f"fila {i}: {almacen[i].fila()} != {esperada}")
+    for por, columna in (("cultivo", "tipo_de_cultivo"), ("suelo", "tipo_suelo")):
+        base = {valor: (cantidad, promedio) for valor, cantidad, promedio in datos.consultar(
+            f"SELECT {columna}, COUNT(*), AVG(temperatura) FROM hectareas GROUP BY {columna}")}
+        agrupado = almacen.agrupar(por)
+        for clave in base.keys() | agrupado.keys():
+            (c1, p1), (c2, p2) = base.get(clave, (0, None)), agrupado.get(clave, (0, None))
+            if c1 != c2 or (p1 is None) != (p2 is None) or (p1 is not None and abs(p1 - p2) > 1e-9):
+                diferencias.append(f"{por} {clave}: base {(c1, p1)}, almacén {(c2, p2)}")
+    return diferencias
+
+
+def medir(muestra):
+    """Bytes por fila de 'muestra' hectáreas como tuplas (fetchall), objetos Hectarea y almacén."""
+    resultados = {}
+    tracemalloc.start()
+    try:
+        inicio = tracemalloc.get_traced_memory()[0]
+        tuplas = datos.consultar(_CONSULTA + " LIMIT ?", (muestra,))
+        resultados["tuplas"] = (tracemalloc.get_traced_memory()[0] - inicio) / max(len(tuplas), 1)
+        inicio = tracemalloc.get_traced_memory()[0]
+        objetos = [Hectarea(*fila) for fila in tuplas if fila[2]]
+        resultados["hectarea"] = (tracemalloc.get_traced_memory()[0] - inicio) / max(len(objetos), 1)
+        del objetos
+        inicio = tracemalloc.get_traced_memory()[0]
+        almacen = AlmacenHectareas()
+        almacen.extender(tuplas)
+        resultados["almacen"] = (tracemalloc.get_traced_memory()[0] - inicio) / max(len(almacen), 1)
+    finally:
+        tracemalloc.stop()
+    return {clave: round(valor, 1) for clave, valor in resultados.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén columnar de hectáreas para análisis")
+    parser.add_argument("--db", default=datos.RUTA_DB)
+    parser.add_argument("--cultivo", action="store_true", help="agrupar por cultivo")
+    parser.add_argument("--suelo", help="solo hectáreas con este tipo de suelo")
+    parser.add_argument("--anio", action="store_true", help="agrupar por año de siembra")
+    parser.add_argument("--medir", action="store_true", help="memoria por fila y tiempos de carga y agrupación")
+    parser.add_argument("--muestra", type=int, default=100000, help="filas para medir la memoria")
+    parser.add_argument("--verificar", action="store_true")
+    args = parser.parse_args()
+    datos.configurar(args.db)
+    migraciones.migrar()
+    if args.medir:
+        for clave, bytes_por_fila in medir(args.muestra).items():
+            print(f"{clave:10} {bytes_por_fila:8.1f} bytes por fila")
+    inicio = time.perf_counter()
+    almacen = AlmacenHectareas.cargar()
+    print(f"{len(almacen)} hectáreas cargadas en {time.perf_counter() - inicio:.2f} s, "
+          f"{almacen.memoria() / 1e6:.1f} MB")
+    if args.verificar:
+        diferencias = verificar(almacen)
+        for diferencia in diferencias[:20]:
+            print(diferencia)
+        print(f"{len(diferencias)} diferencias con la base.")
+        sys.exit(1 if diferencias else 0)
+    if args.suelo:
+        almacen = almacen.filtrar(suelo=args.suelo)
+    por = "anio_siembra" if args.anio else "cultivo" if args.cultivo or not args.medir else None
+    if por:
+        inicio = time.perf_counter()
+        grupos = almacen.agrupar(por)
+        segundos = time.perf_counter() - inicio
+        for clave, (cantidad, promedio) in sorted(grupos.items(), key=lambda item: str(item[0])):
+            print(f"{str(clave):20} {cantidad:9d}  {'' if promedio is None else f'{promedio:6.2f} °C'}")
+        print(f"Agrupado por {por} en {segundos * 1000:.1f} ms{'' if _numpy() is not None else ' [sin NumPy]'}.")
@@ -0,0 +1,336 @@
+import argparse
+import json
+import sys
+import time
+
+import cambios
+import catalogos
+import datos
+import migraciones
+
+# NumPy se importa recién en el primer cálculo por lotes, como en cosechas.py
+np = None
+_numpy_buscado = False
+
+# -----------------------------
+# Motor de aptitud hortaliza × suelo × clima
+# -----------------------------
+# Cada hortaliza tiene un rango de temperatura (mínima, óptima, máxima) y una afinidad de
+# 0 a 1 con cada tipo de suelo (tablas aptitud_temperatura y aptitud_suelo, migración 9).
+# El puntaje de una combinación es 100 × ajuste de temperatura × afinidad, donde el ajuste
+# vale 1 en la óptima y baja en línea recta hasta 0 en la mínima y en la máxima. Para un
+# clima se usa grados_temperatura; para una hectárea, su temperatura (la de sus sensores).
+#
+# La matriz aptitud guarda el puntaje de todas las combinaciones: el diálogo de gestión
+# ordena las hortalizas para un suelo y un clima con una sola consulta por índice. Se
+# pone al día con el registro de cambios (cambios.py) recalculando solo las filas de las
+# hortalizas, suelos o climas que cambiaron; definir_rango y definir_afinidad recalculan
+# su parte al guardar la regla.
+# Uso: python aptitud.py --suelo 3 --clima 3          (hortalizas recomendadas)
+#      python aptitud.py --hectareas                  (mejor hortaliza para cada hectárea)
+#      python aptitud.py --verificar                  (matriz contra recálculo completo)
+
+RANGO_POR_DEFECTO = (5.0, 20.0, 32.0)    # hortalizas sin regla de temperatura
+AFINIDAD_POR_DEFECTO = 0.5               # combinaciones hortaliza-suelo sin regla
+AJUSTE_SIN_TEMPERATURA = 0.5             # climas o hectáreas sin temperatura conocida
+TAMANO_BLOQUE = 50000                    # hectáreas por pasada vectorizada
+
+_INSERTAR = "INSERT OR REPLACE INTO aptitud (hortaliza, suelo, clima, puntaje) VALUES (?, ?, ?, ?)"
+
+
+def _numpy():
+    """Devuelve el módulo numpy, o None si no está instalado (se usa el cálculo fila a fila)."""
+    global np, _numpy_buscado
+    if not _numpy_buscado:
+        _numpy_buscado = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+def puntaje(temperatura, afinidad, minima, optima, maxima):
+    """Puntaje de 0 a 100 de una hortaliza con su rango, a una temperatura y con una afinidad de suelo."""
+    if temperatura is None:
+        ajuste = AJUSTE_SIN_TEMPERATURA
+    else:
+        subida = (temperatura - minima) / max(optima - minima, 1e-9)
+        bajada = (maxima - temperatura) / max(maxima - optima, 1e-9)
+        ajuste = min(max(min(subida, bajada), 0.0), 1.0)
+    return 100 * ajuste * afinidad
+
+
+def _puntajes(temperaturas, afinidades, minimas, optimas, maximas):
+    """Versión vectorizada de puntaje(): arreglos que se combinan por broadcasting; NaN = sin temperatura."""
+    subida = (temperaturas - minimas) / np.maximum(optimas - minimas, 1e-9)
+    bajada = (maximas - temperaturas) / np.maximum(maximas - optimas, 1e-9)
+    ajuste = np.clip(np.minimum(subida, bajada), 0.0, 1.0)
+    ajuste = np.where(np.isnan(temperaturas), AJUSTE_SIN_TEMPERATURA, ajuste)
+    return 100 * ajuste * afinidades
+
+
+class Reglas:
+    """Reglas y catálogos leídos de la base: listas de códigos y diccionarios de rangos y afinidades."""
+
+    def __init__(self):
+        self.hortalizas = [fila[0] for fila in datos.consultar(catalogos.CONSULTAS["tipo_hortaliza"])]
+        self.suelos = {fila[0]: fila[1] for fila in datos.consultar(catalogos.CONSULTAS["tipo_suelo"])}
+        self.climas = {fila[0]: fila[2] for fila in datos.consultar(catalogos.CONSULTAS["clima"])}
+        self.rangos = {fila[0]: tuple(fila[1:])
+                       for fila in datos.consultar("SELECT hortaliza, minima, optima, maxima FROM aptitud_temperatura")}
+        self.afinidades = {(hortaliza, suelo): afinidad for hortaliza, suelo, afinidad in
+                           datos.consultar("SELECT hortaliza, suelo, afinidad FROM aptitud_suelo")}
+
+    def rango(self, hortaliza):
+        return self.rangos.get(hortaliza, RANGO_POR_DEFECTO)
+
+    def afinidad(self, hortaliza, suelo):
+        return self.afinidades.get((hortaliza, suelo), AFINIDAD_POR_DEFECTO)
+
+    def combinaciones(self, hortalizas=None, suelos=None, climas=None):
+        """
+        Filas (hortaliza, suelo, clima, puntaje). Sin argumentos, todas; con conjuntos de
+        códigos, solo las combinaciones que incluyen alguno de ellos.
+        """
+        todas = hortalizas is None and suelos is None and climas is None
+        hortalizas, suelos, climas = hortalizas or set(), suelos or set(), climas or set()
+        for hortaliza in self.hortalizas:
+            rango = self.rango(hortaliza)
+            for suelo in self.suelos:
+                afinidad = self.afinidad(hortaliza, suelo)
+                for clima, temperatura in self.climas.items():
+                    if todas or hortaliza in hortalizas or suelo in suelos or clima in climas:
+                        yield hortaliza, suelo, clima, puntaje(temperatura, afinidad, *rango)
+
+
+# -----------------------------
+# Matriz precalculada
+# -----------------------------
+def _version_matriz():
+    return datos.consultar_uno("SELECT valor FROM secuencias WHERE nombre = 'aptitud'")[0]
+
+
+def _marcar(version):
+    datos.ejecutar("UPDATE secuencias SET valor = ? WHERE nombre = 'aptitud'", (version,))
+
+
+def reconstruir():
+    """Recalcula la matriz completa. Devuelve cuántas combinaciones guardó."""
+    with datos.transaccion():
+        version = cambios.version_actual()
+        datos.ejecutar("DELETE FROM aptitud")
+        cantidad = datos.ejecutar_muchos(_INSERTAR, Reglas().combinaciones()).rowcount
+        _marcar(version)
+    return cantidad
+
+
+def _recalcular(hortalizas=(), suelos=(), climas=()):
+    """Recalcula las combinaciones que incluyen los códigos indicados. Devuelve cuántas guardó."""
+    if not (hortalizas or suelos or climas):
+        return 0
+    filas = Reglas().combinaciones(set(hortalizas), set(suelos), set(climas))
+    return datos.ejecutar_muchos(_INSERTAR, filas).rowcount
+
+
+def sincronizar():
+    """
+    Pone la matriz al día con los cambios de tipo_hortaliza, tipo_suelo y clima. Devuelve
+    cuántas combinaciones recalculó, o None si tuvo que reconstruirla.
+    """
+    if _version_matriz() == cambios.version_actual():
+        return 0
+    with datos.transaccion():
+        version = _version_matriz()
+        nueva = cambios.version_actual()
+        cambiadas = {}
+        for tabla in ("tipo_hortaliza", "tipo_suelo", "clima"):
+            resultado = cambios.leer_cambios(tabla, version) if version >= 0 else None
+            if resultado is None:
+                reconstruir()
+                return None
+            cambiadas[tabla] = resultado[1]
+        for tabla, columna in (("tipo_hortaliza", "hortaliza"), ("tipo_suelo", "suelo"), ("clima", "clima")):
+            eliminadas = [clave for clave, fila in cambiadas[tabla].items() if fila is None]
+            for clave in eliminadas:
+                datos.ejecutar(f"DELETE FROM aptitud WHERE {columna} = ?", (clave,))
+            if columna != "clima" and eliminadas:
+                datos.ejecutar(f"DELETE FROM aptitud_suelo WHERE {columna} IN (SELECT value FROM json_each(?))",
+                               (json.dumps(eliminadas),))
+        datos.ejecutar("DELETE FROM aptitud_temperatura WHERE hortaliza NOT IN (SELECT codigo FROM tipo_hortaliza)")
+        vivas = {tabla: [clave for clave, fila in filas.items() if fila is not None] for tabla, filas in cambiadas.items()}
+        cantidad = _recalcular(vivas["tipo_hortaliza"], vivas["tipo_suelo"], vivas["clima"])
+        _marcar(nueva)
+    return cantidad
+
+
+def definir_rango(hortaliza, minima, optima, maxima):
+    """Guarda el rango de temperatura de una hortaliza y recalcula sus combinaciones."""
+    if not minima <= optima <= maxima:
+        raise ValueError("El rango debe cumplir mínima <= óptima <= máxima.")
+    with datos.transaccion():
+        datos.ejecutar("INSERT OR REPLACE INTO aptitud_temperatura (hortaliza, minima, optima, maxima) VALUES (?, ?, ?, ?)",
+                       (hortaliza, minima, optima, maxima))
+        return _recalcular(hortalizas=[hortaliza])
+
+
+def definir_afinidad(hortaliza, suelo, afinidad):
+    """Guarda la afinidad (0 a 1) de una hortaliza con un suelo y recalcula esas combinaciones."""
+    if not 0 <= afinidad <= 1:
+        raise ValueError("La afinidad debe estar entre 0 y 1.")
+    with datos.transaccion():
+        datos.ejecutar("INSERT OR REPLACE INTO aptitud_suelo (hortaliza, suelo, afinidad) VALUES (?, ?, ?)",
+                       (hortaliza, suelo, afinidad))
+        reglas = Reglas()
+        filas = [(hortaliza, suelo, clima, puntaje(temperatura, afinidad, *reglas.rango(hortaliza)))
+                 for clima, temperatura in reglas.climas.items()]
+        return datos.ejecutar_muchos(_INSERTAR, filas).rowcount
+
+
+# -----------------------------
+# Consultas
+# -----------------------------
+def ranking(suelo, clima, limite=None):
+    """[(codigo, nombre, puntaje)] de las hortalizas para un suelo y un clima, de mejor a peor."""
+    sincronizar()
+    return _ranking(suelo, clima, limite)
+
+
+def puntaje_de(hortaliza, suelo, clima):
+    """Puntaje de una combinación, o None si alguno de los códigos no existe."""
+    sincronizar()
+    return _puntaje_guardado(hortaliza, suelo, clima)
+
+
+def recomendacion(hortaliza, suelo, clima, limite=None):
+    """
+    (ranking, puntaje) como ranking() y puntaje_de(), pero sin poner al día la matriz: solo
+    lee, con la conexión de lectura. Para la interfaz, que sincroniza una vez al abrir el
+    diálogo (ver preparar_dialogo_gestion) y consulta en cada cambio de los combos.
+    """
+    return _ranking(suelo, clima, limite), _puntaje_guardado(hortaliza, suelo, clima)
+
+
+def _ranking(suelo, clima, limite):
+    return datos.consultar("""
+        SELECT a.hortaliza, h.nombre, a.puntaje FROM aptitud a JOIN tipo_hortaliza h ON h.codigo = a.hortaliza
+        WHERE a.suelo = ? AND a.clima = ? ORDER BY a.puntaje DESC, h.nombre LIMIT ?
+    """, (suelo, clima, -1 if limite is None else limite), lectura=True)
+
+
+def _puntaje_guardado(hortaliza, suelo, clima):
+    fila = datos.consultar_uno("SELECT puntaje FROM aptitud WHERE hortaliza = ? AND suelo = ? AND clima = ?",
+                               (hortaliza, suelo, clima), lectura=True)
+    return fila[0] if fila else None
+
+
+def diferencias():
+    """Compara la matriz con un recálculo completo; devuelve las combinaciones distintas (vacío si coinciden)."""
+    sincronizar()
+    guardadas = {(h, s, c): p for h, s, c, p in datos.consultar("SELECT hortaliza, suelo, clima, puntaje FROM aptitud")}
+    distintas = []
+    for hortaliza, suelo, clima, valor in Reglas().combinaciones():
+        guardado = guardadas.pop((hortaliza, suelo, clima), None)
+        if guardado is None or abs(guardado - valor) > 1e-9:
+            distintas.append((hortaliza, suelo, clima, guardado, valor))
+    distintas += [(h, s, c, p, None) for (h, s, c), p in guardadas.items()]
+    return distintas
+
+
+# -----------------------------
+# Puntaje de todas las hectáreas
+# -----------------------------
+def mejores_por_hectarea(tamano_bloque=TAMANO_BLOQUE, por_filas=False):
+    """
+    Genera (numero, hortaliza, puntaje) con la mejor hortaliza para cada hectárea según su
+    suelo y su temperatura. Cada bloque de hectáreas se puntúa contra todas las
+    hortalizas en una sola operación de NumPy (fila a fila si no está instalado).
+    """
+    reglas = Reglas()
+    if not reglas.hortalizas:
+        return
+    suelos = {nombre.lower(): codigo for codigo, nombre in reglas.suelos.items()}
+    for bloque in datos.consultar_por_bloques("SELECT numero, tipo_suelo, temperatura FROM hectareas", (),
+                                              tamano_bloque):
+        if por_filas or _numpy() is None:
+            yield from _mejores_por_filas(reglas, suelos, bloque)
+        else:
+            yield from _mejores_vectorizado(reglas, suelos, bloque)
+
+
+def _mejores_vectorizado(reglas, suelos, bloque):
+    hortalizas = reglas.hortalizas
+    # Fila 0 de la matriz de afinidades: suelos desconocidos (todas las afinidades por defecto)
+    indices = {codigo: i + 1 for i, codigo in enumerate(reglas.suelos)}
+    afinidades = np.array([[AFINIDAD_POR_DEFECTO] * len(hortalizas)] +
+                          [[reglas.afinidad(h, s) for h in hortalizas] for s in reglas.suelos])
+    minimas, optimas, maximas = np.array([reglas.rango(h) for h in hortalizas], dtype=float).T
+    fila_suelo = np.fromiter((indices.get(suelos.get((suelo or "").lower()), 0) for _, suelo, _ in bloque),
+                             dtype=np.int64, count=len(bloque))
+    temperaturas = np.array([np.nan if t is None else t for _, _, t in bloque], dtype=float)
+    puntajes = _puntajes(temperaturas[:, None], afinidades[fila_suelo], minimas, optimas, maximas)
+    mejores = puntajes.argmax(axis=1)
+    valores = puntajes[np.arange(len(bloque)), mejores]
+    return zip((fila[0] for fila in bloque), (hortalizas[i] for i in mejores.tolist()), valores.tolist())
+
+
+def _mejores_por_filas(reglas, suelos, bloque):
+    for numero, suelo, temperatura in bloque:
+        codigo_suelo = suelos.get((suelo or "").lower())
+        mejor = None
+        for hortaliza in reglas.hortalizas:
+            valor = puntaje(temperatura, reglas.afinidad(hortaliza, codigo_suelo), *reglas.rango(hortaliza))
+            if mejor is None or valor > mejor[1]:
+                mejor = (hortaliza, valor)
+        yield (numero,) + mejor
+
+
+def comparar():
+    """Mide el puntaje fila a fila contra el vectorizado sobre todas las hectáreas y comprueba que coincidan."""
+    _numpy()  # la importación de NumPy no entra en la medición
+    inicio = time.perf_counter()
+    por_filas = list(mejores_por_hectarea(por_filas=True))
+    segundos_filas = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    vectorizado = list(mejores_por_hectarea())
+    segundos_lote = time.perf_counter() - inicio
+    distintas = sum(1 for a, b in zip(por_filas, vectorizado) if a[:2] != b[:2] or abs(a[2] - b[2]) > 1e-9)
+    return len(por_filas), distintas, segundos_filas, segundos_lote
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aptitud de hortalizas por suelo y clima")
+    parser.add_argument("--suelo", type=int, help="código de tipo_suelo")
+    parser.add_argument("--clima", type=int, help="código de clima")
+    parser.add_argument("--hectareas", action="store_true", help="mejor hortaliza para cada hectárea (resumen)")
+    parser.add_argument("--comparar", action="store_true", help="medir el puntaje fila a fila contra el vectorizado")
+    parser.add_argument("--verificar", action="store_true", help="comparar la matriz con un recálculo completo")
+    parser.add_argument("--reconstruir", action="store_true")
+    args = parser.parse_args()
+    migraciones.migrar()
+    if args.reconstruir:
+        print(f"{reconstruir()} combinaciones calculadas.")
+    if args.verificar:
+        distintas = diferencias()
+        for fila in distintas[:20]:
+            print("hortaliza {} suelo {} clima {}: guardado {} / recalculado {}".format(*fila))
+        print(f"{len(distintas)} combinaciones difieren del recálculo.")
+        sys.exit(1 if distintas else 0)
+    if args.suelo is not None and args.clima is not None:
+        for codigo, nombre, valor in ranking(args.suelo, args.clima):
+            print(f"{valor:6.1f}  {codigo}: {nombre}")
+    if args.hectareas:
+        nombres = catalogos.nombres_por_id("tipo_hortaliza")
+        conteo = {}
+        for _, hortaliza, valor in mejores_por_hectarea():
+            cantidad, suma = conteo.get(hortaliza, (0, 0.0))
+            conteo[hortaliza] = (cantidad + 1, suma + valor)
+        for hortaliza, (cantidad, suma) in sorted(conteo.items(), key=lambda item: -item[1][0]):
+            print(f"{cantidad:8d} hectáreas  {nombres.get(hortaliza, hortaliza)} (puntaje medio {suma / cantidad:.1f})")
+    if args.comparar:
+        filas, distintas, segundos_filas, segundos_lote = comparar()
+        print(f"{filas} hectáreas: fila a fila {segundos_filas:.2f} s, vectorizado {segundos_lote:.2f} s "
+              f"({segundos_filas / segundos_lote:.1f}x), {distintas} diferencias"
+              f"{'' if _numpy() is not None else ' [sin NumPy]'}")
+        sys.exit(1 if distintas else 0)
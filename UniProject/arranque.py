@@ -0,0 +1,47 @@
+import logging
+import time
+
+# -----------------------------
+# Línea de tiempo de arranque
+# -----------------------------
+# ContabilidadAgricola.py importa este módulo antes que nada, así INICIO queda lo más
+# cerca posible del comienzo del proceso. Cada etapa (módulos cargados, base lista,
+# ventana creada, primer pintado) se registra con marcar(); al primer pintado, terminar()
+# escribe el resumen en el log y avisa si se superó PRESUPUESTO_MS.
+
+INICIO = time.perf_counter()
+PRESUPUESTO_MS = 1500
+
+log = logging.getLogger(__name__)
+_marcas = [("inicio", INICIO)]
+_terminado = False
+
+
+def marcar(etapa):
+    ahora = time.perf_counter()
+    anterior = _marcas[-1][1]
+    _marcas.append((etapa, ahora))
+    log.debug("Arranque: %s a los %.0f ms (+%.0f ms)", etapa, (ahora - INICIO) * 1000, (ahora - anterior) * 1000)
+
+
+def etapas():
+    """Lista de (etapa, milisegundos desde INICIO)."""
+    return [(etapa, (momento - INICIO) * 1000) for etapa, momento in _marcas]
+
+
+def resumen():
+    return " -> ".join(f"{etapa} {ms:.0f} ms" for etapa, ms in etapas())
+
+
+def terminar(etapa="primer pintado"):
+    """Marca la última etapa y registra el resumen (solo la primera vez)."""
+    global _terminado
+    if _terminado:
+        return
+    _terminado = True
+    marcar(etapa)
+    total = etapas()[-1][1]
+    if total > PRESUPUESTO_MS:
+        log.warning("Arranque en %.0f ms, supera el presupuesto de %d ms: %s", total, PRESUPUESTO_MS, resumen())
+    else:
+        log.info("Arranque en %.0f ms: %s", total, resumen())
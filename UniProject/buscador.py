@@ -0,0 +1,81 @@
+import argparse
+import time
+
+import datos
+import migraciones
+
+# -----------------------------
+# Búsqueda de texto completo
+# -----------------------------
+# Consulta la tabla FTS5 'busqueda' (migración 4, con índices de prefijos desde la 10),
+# que indexa nombre y descripción de hortalizas, suelos y climas, y las observaciones de
+# gestion_cultivo. Los triggers de cada tabla la mantienen al día. Los resultados se ordenan por relevancia (bm25) y se
+# entregan por páginas; la fuente y el código se obtienen del rowid (codigo * 4 + fuente).
+# bm25 se calcula sobre todas las coincidencias, así que si una búsqueda coincide con más
+# de MAX_RANKEADAS filas (palabras muy comunes) los resultados salen del más reciente al
+# más antiguo, que FTS5 recorre sin leer el resto.
+
+FUENTES = {fuente: tabla for fuente, tabla, _, _ in migraciones.FUENTES_BUSQUEDA}
+NOMBRES_FUENTE = {
+    "tipo_hortaliza": "Hortaliza",
+    "tipo_suelo": "Suelo",
+    "clima": "Clima",
+    "gestion_cultivo": "Gestión",
+}
+TAMANO_PAGINA = 50
+MAX_RANKEADAS = 5000
+
+
+def expresion(texto):
+    """
+    Convierte lo que escribió el usuario en una consulta FTS5: cada palabra entre comillas
+    (así los signos no se interpretan como operadores), todas requeridas y buscadas como
+    prefijo, así "tomat" encuentra "tomate" mientras se escribe. Un * final se acepta
+    pero ya no cambia nada.
+    """
+    terminos = []
+    for palabra in texto.split():
+        palabra = palabra.rstrip("*").replace('"', '""')
+        if palabra:
+            terminos.append(f'"{palabra}"*')
+    return " ".join(terminos) or None
+
+
+def buscar(texto, tablas=None, limite=TAMANO_PAGINA, desplazamiento=0):
+    """
+    Devuelve hasta 'limite' resultados (tabla, codigo, titulo, fragmento), del más al menos
+    relevante (ver MAX_RANKEADAS). 'tablas' restringe la búsqueda a algunas fuentes.
+    """
+    consulta = expresion(texto)
+    if consulta is None:
+        return []
+    condicion, parametros = "busqueda MATCH ?", [consulta]
+    if tablas:
+        fuentes = [fuente for fuente, tabla in FUENTES.items() if tabla in tablas]
+        condicion += f" AND rowid % 4 IN ({', '.join('?' * len(fuentes))})"
+        parametros += fuentes
+    coincidencias = datos.consultar(f"SELECT rowid FROM busqueda WHERE {condicion} LIMIT ?",
+                                    parametros + [MAX_RANKEADAS + 1])
+    orden = "rank" if len(coincidencias) <= MAX_RANKEADAS else "rowid DESC"
+    sql = f"""
+        SELECT rowid, titulo, snippet(busqueda, -1, '[', ']', '...', 12)
+        FROM busqueda
+        WHERE {condicion}
+        ORDER BY {orden} LIMIT ? OFFSET ?
+    """
+    return [(FUENTES[rowid % 4], rowid // 4, titulo, fragmento)
+            for rowid, titulo, fragmento in datos.consultar(sql, parametros + [limite, desplazamiento])]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca en catálogos y observaciones de gestión")
+    parser.add_argument("texto")
+    parser.add_argument("--limite", type=int, default=TAMANO_PAGINA)
+    args = parser.parse_args()
+    migraciones.migrar()
+    inicio = time.perf_counter()
+    resultados = buscar(args.texto, limite=args.limite)
+    segundos = time.perf_counter() - inicio
+    for tabla, codigo, titulo, fragmento in resultados:
+        print(f"[{NOMBRES_FUENTE[tabla]} {codigo}] {titulo or ''} {fragmento}")
+    print(f"{len(resultados)} resultados en {segundos * 1000:.1f} ms")
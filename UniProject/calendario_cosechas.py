@@ -0,0 +1,319 @@
+import argparse
+import calendar
+import json
+import sys
+from datetime import date, timedelta
+
+import cambios
+import catalogos
+import cosechas
+import datos
+import migraciones
+
+# -----------------------------
+# Calendario de cosechas recurrentes
+# -----------------------------
+# Después de la cosecha rutinaria, una hectárea vuelve a cosecharse cada meses_rutinaria
+# meses (o cada tantos días, para los cultivos con reglas fijas) mientras dure la
+# plantación. Los eventos no se guardan: la tabla calendario_cosechas (migración 7)
+# describe la serie de cada hectárea con su fase, y una consulta "qué hectáreas cosechan
+# entre A y B" parte el rango en ventanas no más largas que el período, donde cada serie
+# tiene a lo sumo un evento, y busca por rango de fase en el índice. Solo se expanden
+# las series de las hectáreas que cosechan en el rango.
+# El índice se construye la primera vez que se consulta y después se pone al día con el
+# registro de cambios (cambios.py); si cambian las reglas de tipo_cultivo se reconstruye.
+# Uso: python calendario_cosechas.py --desde 2025-03-01 --hasta 2025-03-31
+#      python calendario_cosechas.py --verificar   (compara el índice con la expansión completa)
+
+TAMANO_BLOQUE = 50000        # hectáreas por lectura al reconstruir
+MAXIMO_CAMBIOS = 100000      # con más hectáreas cambiadas se reconstruye en lugar de actualizar
+LIMITE_DETALLE = 200         # hectáreas que se muestran para un día en la pantalla
+
+_INSERTAR = """
+    INSERT OR REPLACE INTO calendario_cosechas (id, primera, unidad, periodo, inicio, fase, dia)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+# Serie con a lo sumo un evento en la ventana [:desde, :desde + periodo): el evento es el
+# único número congruente con la fase dentro de la ventana, si la serie ya empezó
+_EVENTO = ":desde + (fase - :resto + :periodo) % :periodo"
+_SERIE = """
+    SELECT {columnas} FROM calendario_cosechas
+    WHERE unidad = :unidad AND periodo = :periodo AND fase BETWEEN :fase_desde AND :fase_hasta
+      AND inicio <= {evento}
+"""
+# Cosecha rutinaria sin repetición (cultivos con período 0)
+_UNICA = """
+    SELECT {columnas} FROM calendario_cosechas
+    WHERE unidad = :unidad AND periodo = 0 AND fase = 0 AND inicio BETWEEN :desde AND :hasta
+"""
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _mes(fecha):
+    return fecha.year * 12 + fecha.month - 1
+
+
+def _fecha_del_mes(mes, dia):
+    """Fecha del mes número 'mes' con el día 'dia', o el último día si el mes es más corto."""
+    anio, indice = divmod(mes, 12)
+    return date(anio, indice + 1, min(dia, calendar.monthrange(anio, indice + 1)[1]))
+
+
+def fila_indice(reglas, id_hectarea, tipo_de_cultivo, primera_cosecha, cosecha_rutinaria):
+    """Fila de calendario_cosechas para una hectárea; reglas es un cosechas.CalendarioCosechas."""
+    primera, rutinaria = _fecha(primera_cosecha), _fecha(cosecha_rutinaria)
+    fila = (id_hectarea, primera.toordinal() if primera else None)
+    if rutinaria is None:
+        return fila + (None, None, None, None, None)
+    _, _, meses, dias = reglas.regla(tipo_de_cultivo or "")
+    if meses:
+        return fila + ("mes", meses, _mes(rutinaria), _mes(rutinaria) % meses, rutinaria.day)
+    inicio = rutinaria.toordinal()
+    return fila + ("dia", dias, inicio, inicio % dias if dias else 0, None)
+
+
+# -----------------------------
+# Mantenimiento del índice
+# -----------------------------
+def _version_indice():
+    return datos.consultar_uno("SELECT valor FROM secuencias WHERE nombre = 'calendario_cosechas'")[0]
+
+
+def _guardar(filas):
+    datos.ejecutar_muchos(_INSERTAR, filas)
+    datos.ejecutar_muchos("INSERT OR IGNORE INTO calendario_periodos (unidad, periodo) VALUES (?, ?)",
+                          {(fila[2], fila[3]) for fila in filas if fila[2] is not None})
+
+
+def _marcar(version):
+    datos.ejecutar("UPDATE secuencias SET valor = ? WHERE nombre = 'calendario_cosechas'", (version,))
+
+
+def reconstruir(tamano_bloque=TAMANO_BLOQUE):
+    """Vuelve a calcular la serie de todas las hectáreas. Devuelve cuántas indexó."""
+    with datos.transaccion():
+        version = cambios.version_actual()
+        reglas = cosechas.calendario()
+        datos.ejecutar("DELETE FROM calendario_cosechas")
+        datos.ejecutar("DELETE FROM calendario_periodos")
+        cantidad, ultimo_id = 0, 0
+        while True:
+            filas = datos.consultar("""
+                SELECT id, tipo_de_cultivo, primera_cosecha, cosecha_rutinaria FROM hectareas
+                WHERE id > ? ORDER BY id LIMIT ?
+            """, (ultimo_id, tamano_bloque))
+            if not filas:
+                break
+            _guardar([fila_indice(reglas, *fila) for fila in filas])
+            cantidad += len(filas)
+            ultimo_id = filas[-1][0]
+        _marcar(version)
+    return cantidad
+
+
+def sincronizar():
+    """
+    Pone el índice al día. Devuelve cuántas hectáreas actualizó, o None si tuvo que
+    reconstruirlo (primera vez, carga masiva, registro podado o reglas cambiadas).
+    """
+    if _version_indice() == cambios.version_actual():
+        return 0
+    with datos.transaccion():
+        version = _version_indice()
+        resultado = cambios.leer_cambios("hectareas", version, MAXIMO_CAMBIOS) if version >= 0 else None
+        if resultado is not None and "tipo_cultivo" in cambios.tablas_cambiadas(version)[1]:
+            # Otra instancia pudo cambiar las reglas: la caché de este proceso no lo sabe
+            catalogos.invalidar("tipo_cultivo")
+            resultado = None
+        if resultado is None:
+            reconstruir()
+            return None
+        nueva, cambiadas = resultado
+        eliminadas = [clave for clave, fila in cambiadas.items() if fila is None]
+        if eliminadas:
+            datos.ejecutar("DELETE FROM calendario_cosechas WHERE id IN (SELECT value FROM json_each(?))",
+                           (json.dumps(eliminadas),))
+        reglas = cosechas.calendario()
+        # Columnas de cambios.COLUMNAS["hectareas"]: id, numero, tipo, siembra, primera, rutinaria, ...
+        _guardar([fila_indice(reglas, fila[0], fila[2], fila[4], fila[5]) for fila in cambiadas.values() if fila])
+        _marcar(nueva)
+    return len(cambiadas)
+
+
+# -----------------------------
+# Consultas por rango de fechas
+# -----------------------------
+def _ventanas(desde, hasta, periodo):
+    """Parte [desde, hasta] en ventanas de a lo sumo 'periodo' unidades."""
+    while desde <= hasta:
+        fin = min(hasta, desde + periodo - 1)
+        yield desde, fin
+        desde = fin + 1
+
+
+def _rangos_fase(desde, hasta, periodo):
+    """Rangos de fase (uno o dos, si la ventana da la vuelta) con un evento en [desde, hasta]."""
+    if hasta - desde + 1 >= periodo:
+        return [(0, periodo - 1)]
+    resto_desde, resto_hasta = desde % periodo, hasta % periodo
+    if resto_desde <= resto_hasta:
+        return [(resto_desde, resto_hasta)]
+    return [(resto_desde, periodo - 1), (0, resto_hasta)]
+
+
+def _series(unidad, periodo, desde, hasta, columnas, agrupar=""):
+    """
+    Filas de las series (unidad, periodo) con un evento en [desde, hasta] (días ordinales
+    o números de mes). En 'columnas', {evento} es el evento de la serie en la ventana.
+    """
+    if periodo == 0:
+        sql = _UNICA.format(columnas=columnas.format(evento="inicio")) + agrupar
+        yield from datos.consultar(sql, {"unidad": unidad, "desde": desde, "hasta": hasta})
+        return
+    sql = _SERIE.format(columnas=columnas.format(evento=_EVENTO), evento=_EVENTO) + agrupar
+    for inicio, fin in _ventanas(desde, hasta, periodo):
+        for fase_desde, fase_hasta in _rangos_fase(inicio, fin, periodo):
+            yield from datos.consultar(sql, {"unidad": unidad, "periodo": periodo, "desde": inicio,
+                                             "resto": inicio % periodo, "fase_desde": fase_desde,
+                                             "fase_hasta": fase_hasta})
+
+
+def eventos(desde, hasta, cosecha=None):
+    """
+    Cosechas en [desde, hasta] (date): genera (fecha, id de hectárea, 'primera' o
+    'rutinaria'), sin un orden particular. cosecha limita a uno de los dos tipos.
+    """
+    sincronizar()
+    if cosecha in (None, "primera"):
+        for id_hectarea, dia in datos.consultar(
+                "SELECT id, primera FROM calendario_cosechas WHERE primera BETWEEN ? AND ?",
+                (desde.toordinal(), hasta.toordinal())):
+            yield date.fromordinal(dia), id_hectarea, "primera"
+    if cosecha in (None, "rutinaria"):
+        for unidad, periodo in datos.consultar("SELECT unidad, periodo FROM calendario_periodos"):
+            if unidad == "dia":
+                for id_hectarea, dia in _series(unidad, periodo, desde.toordinal(), hasta.toordinal(), "id, {evento}"):
+                    yield date.fromordinal(dia), id_hectarea, "rutinaria"
+                continue
+            # Series mensuales: se busca por mes y el día se resuelve después (los meses
+            # de los extremos pueden quedar afuera por el día)
+            for id_hectarea, mes, dia in _series(unidad, periodo, _mes(desde), _mes(hasta), "id, {evento}, dia"):
+                fecha = _fecha_del_mes(mes, dia)
+                if desde <= fecha <= hasta:
+                    yield fecha, id_hectarea, "rutinaria"
+
+
+def por_dia(desde, hasta):
+    """{fecha: cantidad de cosechas} en [desde, hasta]; el conteo se agrupa en la base."""
+    sincronizar()
+    conteo = {}
+
+    def sumar(fecha, cantidad):
+        if desde <= fecha <= hasta:
+            conteo[fecha] = conteo.get(fecha, 0) + cantidad
+
+    for dia, cantidad in datos.consultar("""
+        SELECT primera, COUNT(*) FROM calendario_cosechas WHERE primera BETWEEN ? AND ? GROUP BY primera
+    """, (desde.toordinal(), hasta.toordinal())):
+        sumar(date.fromordinal(dia), cantidad)
+    for unidad, periodo in datos.consultar("SELECT unidad, periodo FROM calendario_periodos"):
+        if unidad == "dia":
+            for dia, cantidad in _series(unidad, periodo, desde.toordinal(), hasta.toordinal(),
+                                         "{evento}, COUNT(*)", " GROUP BY 1"):
+                sumar(date.fromordinal(dia), cantidad)
+        else:
+            for mes, dia, cantidad in _series(unidad, periodo, _mes(desde), _mes(hasta),
+                                              "{evento}, dia, COUNT(*)", " GROUP BY 1, 2"):
+                sumar(_fecha_del_mes(mes, dia), cantidad)
+    return conteo
+
+
+def hectareas_del_dia(fecha, limite=LIMITE_DETALLE):
+    """
+    (total, filas) de las hectáreas que cosechan en 'fecha'; filas tiene hasta 'limite'
+    tuplas (cosecha, numero, tipo_de_cultivo, tipo_suelo) ordenadas por número.
+    """
+    del_dia = {id_hectarea: cosecha for _, id_hectarea, cosecha in eventos(fecha, fecha)}
+    filas = datos.consultar("""
+        SELECT id, numero, tipo_de_cultivo, tipo_suelo FROM hectareas
+        WHERE id IN (SELECT value FROM json_each(?)) ORDER BY numero LIMIT ?
+    """, (json.dumps(list(del_dia)), limite))
+    return len(del_dia), [(del_dia[id_hectarea],) + tuple(resto) for id_hectarea, *resto in filas]
+
+
+def fechas(fila, desde, hasta):
+    """Expande una fila de calendario_cosechas en sus cosechas (fecha, tipo) dentro de [desde, hasta]."""
+    _, primera, unidad, periodo, inicio, _, dia = fila
+    if primera is not None and desde.toordinal() <= primera <= hasta.toordinal():
+        yield date.fromordinal(primera), "primera"
+    if unidad == "dia":
+        if periodo == 0:
+            if desde.toordinal() <= inicio <= hasta.toordinal():
+                yield date.fromordinal(inicio), "rutinaria"
+            return
+        actual = inicio + max(0, -(-(desde.toordinal() - inicio) // periodo)) * periodo
+        while actual <= hasta.toordinal():
+            yield date.fromordinal(actual), "rutinaria"
+            actual += periodo
+    elif unidad == "mes":
+        mes = inicio + max(0, -(-(_mes(desde) - inicio) // periodo)) * periodo
+        while mes <= _mes(hasta):
+            fecha = _fecha_del_mes(mes, dia)
+            if desde <= fecha <= hasta:
+                yield fecha, "rutinaria"
+            mes += periodo
+
+
+def diferencias(desde, hasta):
+    """
+    Compara el índice con las hectáreas y las consultas por rango con la expansión de
+    todas las series. Devuelve una lista de diferencias (vacía si todo coincide).
+    """
+    sincronizar()
+    reglas = cosechas.calendario()
+    problemas = []
+    indice = {fila[0]: tuple(fila) for fila in datos.consultar("SELECT * FROM calendario_cosechas")}
+    for bloque in datos.consultar_por_bloques(
+            "SELECT id, tipo_de_cultivo, primera_cosecha, cosecha_rutinaria FROM hectareas"):
+        for fila in bloque:
+            if indice.pop(fila[0], None) != fila_indice(reglas, *fila):
+                problemas.append(f"hectárea {fila[0]}: el índice no coincide con sus fechas")
+    problemas += [f"hectárea {id_hectarea}: sigue en el índice pero ya no existe" for id_hectarea in indice]
+    completos = {(fecha, fila[0], cosecha)
+                 for bloque in datos.consultar_por_bloques("SELECT * FROM calendario_cosechas")
+                 for fila in bloque
+                 for fecha, cosecha in fechas(fila, desde, hasta)}
+    consultados = list(eventos(desde, hasta))
+    if len(consultados) != len(set(consultados)):
+        problemas.append("la consulta por rango devolvió eventos repetidos")
+    for fecha, id_hectarea, cosecha in sorted(completos ^ set(consultados))[:20]:
+        problemas.append(f"{fecha} hectárea {id_hectarea} ({cosecha}): la consulta por rango no coincide")
+    return problemas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hectáreas con cosecha en un rango de fechas")
+    parser.add_argument("--desde", type=date.fromisoformat, help="fecha YYYY-MM-DD (por defecto, hoy)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="fecha YYYY-MM-DD (por defecto, 30 días después)")
+    parser.add_argument("--verificar", action="store_true", help="compara el índice con la expansión completa")
+    parser.add_argument("--reconstruir", action="store_true", help="vuelve a calcular el índice")
+    args = parser.parse_args()
+    desde = args.desde or date.today()
+    hasta = args.hasta or desde + timedelta(days=30)
+    migraciones.migrar()
+    if args.reconstruir:
+        print(f"{reconstruir()} hectáreas indexadas.")
+    if args.verificar:
+        problemas = diferencias(desde, hasta)
+        for problema in problemas:
+            print(problema)
+        print(f"{len(problemas)} diferencias entre el índice y la expansión completa.")
+        sys.exit(1 if problemas else 0)
+    for fecha, cantidad in sorted(por_dia(desde, hasta).items()):
+        print(f"{fecha}  {cantidad:8d}")
@@ -0,0 +1,126 @@
+import argparse
+
+import datos
+import migraciones
+
+# -----------------------------
+# Registro de cambios
+# -----------------------------
+# Los triggers de la migración 6 anotan en la tabla cambios cada alta, cambio y baja de
+# las tablas que muestran las pantallas de gestión, con una versión creciente. Una
+# pantalla carga la tabla completa una sola vez (leer_todo) y después pide solo lo que
+# cambió desde la última versión que vio (leer_cambios): las claves tocadas y sus filas
+# actuales. Como el registro vive en la base, también aparecen los cambios hechos por
+# otra instancia de la aplicación que use el mismo archivo.
+# Uso: python cambios.py [--desde 120]      (lista los cambios registrados)
+#      python cambios.py --podar 100000     (conserva solo los últimos cambios)
+
+CONSERVAR = 100000      # cambios que quedan en el registro al podar
+MAXIMO_CLAVES = 2000    # con más claves cambiadas conviene volver a leer toda la tabla
+TAMANO_BLOQUE = 500     # claves por sentencia al leer las filas cambiadas
+
+CLAVES = dict(migraciones.TABLAS_CAMBIOS)
+# Columnas que muestra cada pantalla; la primera es siempre la clave primaria. La
+# temperatura de las hectáreas es la de sus sensores cuando los tiene.
+COLUMNAS = {
+    "hectareas": "id, numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, "
+                 + migraciones.TEMPERATURA_ACTUAL.format(h="hectareas"),
+    "gestion_cultivo": "codigo, id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones",
+    "tipo_hortaliza": "codigo, nombre, descripcion, imagen",
+    "tipo_suelo": "codigo, nombre, descripcion, imagen",
+    "clima": "codigo, nombre, grados_temperatura, descripcion, imagen",
+    "tipo_cultivo": "id, nombre, meses_primera, meses_rutinaria",
+    "usuarios": "id, username, email",
+}
+
+
+def version_actual():
+    """Última versión registrada (0 si el registro está vacío)."""
+    return datos.consultar_uno("SELECT coalesce(MAX(version), 0) FROM cambios")[0]
+
+
+def podado_hasta():
+    return datos.consultar_uno("SELECT valor FROM secuencias WHERE nombre = 'cambios_podados'")[0]
+
+
+def leer_todo(tabla):
+    """
+    (version, filas) con la tabla completa. La versión se lee antes que las filas: un
+    cambio que ocurra en el medio vuelve a aparecer en la siguiente leer_cambios, y
+    aplicarlo dos veces no tiene efecto.
+    """
+    version = version_actual()
+    filas = datos.consultar(f"SELECT {COLUMNAS[tabla]} FROM {tabla} ORDER BY {CLAVES[tabla]}")
+    return version, filas
+
+
+def tablas_cambiadas(desde):
+    """(version, tablas con cambios posteriores a 'desde'); la versión es la actual. desde=None solo da la versión."""
+    version = version_actual()
+    if desde is None or version <= desde:
+        return version, set()
+    filas = datos.consultar("SELECT DISTINCT tabla FROM cambios WHERE version > ? AND version <= ?", (desde, version))
+    return version, {fila[0] for fila in filas}
+
+
+def leer_cambios(tabla, desde, maximo=MAXIMO_CLAVES):
+    """
+    (version, {clave: fila actual o None si se eliminó}) con lo que cambió en 'tabla'
+    después de la versión 'desde'. Devuelve None cuando conviene volver a leer todo: el
+    registro ya se podó más allá de 'desde', hubo una carga masiva ('recarga') o
+    cambiaron más de 'maximo' filas (maximo=None: sin límite).
+    """
+    version = version_actual()
+    if version <= desde:
+        return version, {}
+    if desde < podado_hasta():
+        return None
+    filas = datos.consultar("""
+        SELECT clave, MAX(operacion = 'recarga') FROM cambios
+        WHERE version > ? AND version <= ? AND tabla = ? GROUP BY clave
+    """, (desde, version, tabla))
+    if (maximo is not None and len(filas) > maximo) or any(recarga for _, recarga in filas):
+        return None
+    claves = [clave for clave, _ in filas]
+    cambiadas = dict.fromkeys(claves)
+    for inicio in range(0, len(claves), TAMANO_BLOQUE):
+        bloque = claves[inicio:inicio + TAMANO_BLOQUE]
+        marcas = ", ".join("?" * len(bloque))
+        for fila in datos.consultar(f"SELECT {COLUMNAS[tabla]} FROM {tabla} WHERE {CLAVES[tabla]} IN ({marcas})", bloque):
+            cambiadas[fila[0]] = fila
+    return version, cambiadas
+
+
+def registrar_recarga(tabla):
+    """Anota que 'tabla' cambió en bloque: quien la muestra debe volver a leerla entera."""
+    datos.ejecutar("INSERT INTO cambios (tabla, clave, operacion) VALUES (?, NULL, 'recarga')", (tabla,))
+
+
+def podar(conservar=CONSERVAR):
+    """Borra del registro todo salvo los últimos 'conservar' cambios. Devuelve cuántos borró."""
+    limite = version_actual() - conservar
+    if limite <= podado_hasta():
+        return 0
+    with datos.transaccion():
+        borrados = datos.ejecutar("DELETE FROM cambios WHERE version <= ?", (limite,)).rowcount
+        datos.ejecutar("UPDATE secuencias SET valor = ? WHERE nombre = 'cambios_podados'", (limite,))
+    return borrados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registro de cambios de las tablas de gestión")
+    parser.add_argument("--desde", type=int, default=0, help="mostrar los cambios posteriores a esta versión")
+    parser.add_argument("--tabla", choices=CLAVES)
+    parser.add_argument("--podar", type=int, metavar="CONSERVAR", help="conservar solo los últimos cambios")
+    args = parser.parse_args()
+    migraciones.migrar()
+    if args.podar is not None:
+        print(f"{podar(args.podar)} cambios borrados del registro.")
+    condicion, parametros = "version > ?", [args.desde]
+    if args.tabla:
+        condicion += " AND tabla = ?"
+        parametros.append(args.tabla)
+    for version, tabla, clave, operacion in datos.consultar(
+            f"SELECT version, tabla, clave, operacion FROM cambios WHERE {condicion} ORDER BY version", parametros):
+        print(f"{version:8d}  {operacion:8} {tabla}:{clave}")
+    print(f"Versión actual: {version_actual()} (podado hasta {podado_hasta()})")
@@ -0,0 +1,106 @@
+import threading
+
+import datos
+
+# -----------------------------
+# Caché de catálogos
+# -----------------------------
+# Las tablas pequeñas (tipos de suelo, hortalizas, climas, tipos de cultivo y la lista
+# de usuarios) se leen una vez y se sirven desde memoria. Las pantallas de ABM llaman
+# a invalidar(tabla) después de crear, modificar o eliminar filas; la próxima lectura
+# vuelve a la base. Cada invalidación incrementa la versión de la tabla, de modo que
+# los datos derivados (por ejemplo el calendario de cosechas) saben cuándo recalcular.
+
+CONSULTAS = {
+    "tipo_suelo": "SELECT codigo, nombre, descripcion, imagen FROM tipo_suelo ORDER BY codigo",
+    "tipo_hortaliza": "SELECT codigo, nombre, descripcion, imagen FROM tipo_hortaliza ORDER BY codigo",
+    "clima": "SELECT codigo, nombre, grados_temperatura, descripcion, imagen FROM clima ORDER BY codigo",
+    "tipo_cultivo": "SELECT id, nombre, meses_primera, meses_rutinaria FROM tipo_cultivo ORDER BY id",
+    "usuarios": "SELECT id, username FROM usuarios ORDER BY id",
+}
+
+# Clave y columnas que editan las pantallas de ABM (la lista de usuarios se edita en nucleo.py)
+EDITABLES = {
+    "tipo_suelo": ("codigo", ["nombre", "descripcion", "imagen"]),
+    "tipo_hortaliza": ("codigo", ["nombre", "descripcion", "imagen"]),
+    "clima": ("codigo", ["nombre", "grados_temperatura", "descripcion", "imagen"]),
+    "tipo_cultivo": ("id", ["nombre", "meses_primera", "meses_rutinaria"]),
+}
+
+_lock = threading.Lock()
+_filas = {}
+_versiones = {tabla: 0 for tabla in CONSULTAS}
+_estadisticas = {"aciertos": 0, "fallos": 0}
+
+
+def filas(tabla):
+    """Filas completas del catálogo (primera columna: clave, segunda: nombre)."""
+    with _lock:
+        resultado = _filas.get(tabla)
+        if resultado is not None:
+            _estadisticas["aciertos"] += 1
+            return resultado
+        _estadisticas["fallos"] += 1
+        version = _versiones[tabla]
+    resultado = datos.consultar(CONSULTAS[tabla])
+    with _lock:
+        # Si alguien invalidó la tabla mientras se leía, no se guarda el resultado viejo
+        if _versiones[tabla] == version:
+            _filas[tabla] = resultado
+    return resultado
+
+
+def pares(tabla):
+    """Lista de (clave, nombre), como la devolvían los obtener_* originales."""
+    return [(fila[0], fila[1]) for fila in filas(tabla)]
+
+
+def nombres(tabla):
+    return [fila[1] for fila in filas(tabla)]
+
+
+def nombres_por_id(tabla):
+    """Diccionario clave -> nombre, para resolver claves foráneas sin JOIN."""
+    return {fila[0]: fila[1] for fila in filas(tabla)}
+
+
+def invalidar(tabla):
+    with _lock:
+        _filas.pop(tabla, None)
+        _versiones[tabla] += 1
+
+
+def guardar(tabla, clave, valores):
+    """
+    Crea (clave None) o actualiza una fila del catálogo con 'valores' (en el orden de
+    EDITABLES) e invalida la caché. Devuelve la cantidad de filas escritas; un nombre
+    repetido lanza sqlite3.IntegrityError.
+    """
+    columna_clave, columnas = EDITABLES[tabla]
+    if clave is None:
+        sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+        parametros = tuple(valores)
+    else:
+        sql = f"UPDATE {tabla} SET {', '.join(c + ' = ?' for c in columnas)} WHERE {columna_clave} = ?"
+        parametros = (*valores, clave)
+    try:
+        return datos.ejecutar(sql, parametros).rowcount
+    finally:
+        invalidar(tabla)
+
+
+def eliminar(tabla, clave):
+    try:
+        return datos.ejecutar(f"DELETE FROM {tabla} WHERE {EDITABLES[tabla][0]} = ?", (clave,)).rowcount
+    finally:
+        invalidar(tabla)
+
+
+def version(tabla):
+    with _lock:
+        return _versiones[tabla]
+
+
+def estadisticas():
+    with _lock:
+        return dict(_estadisticas)
@@ -0,0 +1,184 @@
+import argparse
+import calendar
+import time
+from datetime import datetime, timedelta
+
+import catalogos
+
+# NumPy se importa recién en el primer cálculo por lotes: cargarlo tarda más que todo el
+# resto del arranque y los usos puntuales (registrar una hectárea) no lo necesitan.
+np = None
+_numpy_buscado = False
+
+# -----------------------------
+# Calendario de cosechas
+# -----------------------------
+# Las reglas salen de la tabla tipo_cultivo (meses hasta la primera cosecha y meses
+# entre la primera y la rutinaria) a través de la caché de catálogos; el calendario se
+# rearma cuando la pantalla de tipos de cultivo invalida ese catálogo. Los cultivos que no están en la
+# tabla usan las reglas fijas en días de siempre. Con NumPy, calcular_lote resuelve
+# lotes completos con aritmética de fechas sobre arreglos datetime64.
+
+DIAS_POR_CULTIVO = {
+    "maíz": (90, 30),
+    "trigo": (120, 30),
+    "tomate": (70, 15),
+}
+DIAS_POR_DEFECTO = (80, 20)
+FORMATO_FECHA = "%Y-%m-%d"
+# Regla de los limones cuando no figuran en tipo_cultivo: 5 años y luego 180 días
+REGLA_LIMONES = (60, 0, 0, 180)
+
+
+def _numpy():
+    """Devuelve el módulo numpy, o None si no está instalado (se usa el cálculo fila a fila)."""
+    global np, _numpy_buscado
+    if not _numpy_buscado:
+        _numpy_buscado = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+def _sumar_meses(fecha, meses):
+    """Suma meses a una fecha; si el día no existe en el mes destino se usa el último día."""
+    if not meses:
+        return fecha
+    total = fecha.month - 1 + meses
+    anio, mes = fecha.year + total // 12, total % 12 + 1
+    return fecha.replace(year=anio, month=mes, day=min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+class CalendarioCosechas:
+    """Reglas de cosecha por cultivo: (meses_primera, dias_primera, meses_rutinaria, dias_rutinaria)."""
+
+    def __init__(self, reglas_en_meses=None):
+        self.reglas_en_meses = {nombre.lower(): (primera or 0, rutinaria or 0)
+                                for nombre, (primera, rutinaria) in (reglas_en_meses or {}).items()}
+
+    @classmethod
+    def desde_bd(cls):
+        return cls({nombre: (primera, rutinaria)
+                    for _, nombre, primera, rutinaria in catalogos.filas("tipo_cultivo")})
+
+    def regla(self, tipo_de_cultivo):
+        tipo = tipo_de_cultivo.lower()
+        if tipo in self.reglas_en_meses:
+            meses_primera, meses_rutinaria = self.reglas_en_meses[tipo]
+            return meses_primera, 0, meses_rutinaria, 0
+        if tipo == "limones":
+            return REGLA_LIMONES
+        dias_primera, dias_rutinaria = DIAS_POR_CULTIVO.get(tipo, DIAS_POR_DEFECTO)
+        return 0, dias_primera, 0, dias_rutinaria
+
+    def calcular(self, tipo_de_cultivo, siembra, primera_cosecha=None, cosecha_rutinaria=None):
+        """
+        Devuelve (primera_cosecha, cosecha_rutinaria) como datetime para una siembra (datetime).
+        Las fechas indicadas explícitamente (texto 'YYYY-MM-DD') se respetan.
+        """
+        meses_primera, dias_primera, meses_rutinaria, dias_rutinaria = self.regla(tipo_de_cultivo)
+        if primera_cosecha:
+            primera = datetime.strptime(primera_cosecha, FORMATO_FECHA)
+        else:
+            primera = _sumar_meses(siembra, meses_primera) + timedelta(days=dias_primera)
+        if cosecha_rutinaria:
+            rutinaria = datetime.strptime(cosecha_rutinaria, FORMATO_FECHA)
+        else:
+            rutinaria = _sumar_meses(primera, meses_rutinaria) + timedelta(days=dias_rutinaria)
+        return primera, rutinaria
+
+    def calcular_lote(self, tipos, siembras):
+        """
+        Calcula las cosechas de listas paralelas de tipos de cultivo y siembras 'YYYY-MM-DD'.
+        Devuelve dos listas de texto 'YYYY-MM-DD': primeras cosechas y cosechas rutinarias.
+        """
+        if _numpy() is None:
+            return self._calcular_lote_por_filas(tipos, siembras)
+        indices = {}
+        codigos = np.fromiter((indices.setdefault(t.lower(), len(indices)) for t in tipos),
+                              dtype=np.int64, count=len(tipos))
+        reglas = np.array([self.regla(t) for t in indices], dtype=np.int64).reshape(-1, 4)
+        meses_primera, dias_primera, meses_rutinaria, dias_rutinaria = reglas[codigos].T
+        fechas = np.array(siembras, dtype="datetime64[D]")
+        primeras = _sumar_meses_arreglo(fechas, meses_primera) + dias_primera
+        rutinarias = _sumar_meses_arreglo(primeras, meses_rutinaria) + dias_rutinaria
+        return (np.datetime_as_string(primeras, unit="D").tolist(),
+                np.datetime_as_string(rutinarias, unit="D").tolist())
+
+    def _calcular_lote_por_filas(self, tipos, siembras):
+        resueltas = {}
+        primeras, rutinarias = [], []
+        for tipo, siembra in zip(tipos, siembras):
+            clave = (tipo.lower(), siembra)
+            if clave not in resueltas:
+                primera, rutinaria = self.calcular(tipo, datetime.strptime(siembra, FORMATO_FECHA))
+                resueltas[clave] = (primera.strftime(FORMATO_FECHA), rutinaria.strftime(FORMATO_FECHA))
+            primera, rutinaria = resueltas[clave]
+            primeras.append(primera)
+            rutinarias.append(rutinaria)
+        return primeras, rutinarias
+
+
+def _sumar_meses_arreglo(fechas, meses):
+    """Versión vectorizada de _sumar_meses para arreglos datetime64[D]."""
+    inicio_mes = fechas.astype("datetime64[M]")
+    dia = fechas - inicio_mes.astype("datetime64[D]")
+    mes_destino = inicio_mes + meses
+    ultimo_dia = (mes_destino + 1).astype("datetime64[D]") - 1
+    return np.minimum(mes_destino.astype("datetime64[D]") + dia, ultimo_dia)
+
+
+_calendario = (None, None)   # (versión del catálogo tipo_cultivo, calendario)
+
+
+def calendario():
+    """Calendario con las reglas de tipo_cultivo; se rearma si el catálogo fue invalidado."""
+    global _calendario
+    version = catalogos.version("tipo_cultivo")
+    if _calendario[0] != version:
+        _calendario = (version, CalendarioCosechas.desde_bd())
+    return _calendario[1]
+
+
+def calcular_cosechas(tipo_de_cultivo, siembra, primera_cosecha=None, cosecha_rutinaria=None):
+    return calendario().calcular(tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria)
+
+
+def calcular_lote(filas):
+    """Calcula las cosechas de filas (tipo_de_cultivo, siembra) y devuelve [(primera, rutinaria)]."""
+    tipos = [tipo for tipo, _ in filas]
+    siembras = [siembra for _, siembra in filas]
+    primeras, rutinarias = calendario().calcular_lote(tipos, siembras)
+    return list(zip(primeras, rutinarias))
+
+
+def comparar(cantidad):
+    """Mide el cálculo fila a fila (como Hectarea) contra el cálculo por lotes."""
+    _numpy()  # la importación de NumPy no entra en la medición
+    cal = CalendarioCosechas({"papas": (5, 5), "limones": (12, 6)})
+    nombres = ["papas", "limones", "maíz", "trigo", "tomate", "peras"]
+    tipos = [nombres[i % len(nombres)] for i in range(cantidad)]
+    siembras = [f"{2000 + i % 25}-{i % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(cantidad)]
+    inicio = time.perf_counter()
+    por_filas = []
+    for tipo, siembra in zip(tipos, siembras):
+        primera, rutinaria = cal.calcular(tipo, datetime.strptime(siembra, FORMATO_FECHA))
+        por_filas.append((primera.strftime(FORMATO_FECHA), rutinaria.strftime(FORMATO_FECHA)))
+    segundos_filas = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    primeras, rutinarias = cal.calcular_lote(tipos, siembras)
+    segundos_lote = time.perf_counter() - inicio
+    assert por_filas == list(zip(primeras, rutinarias)), "los dos cálculos no coinciden"
+    return segundos_filas, segundos_lote
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el cálculo de cosechas fila a fila y por lotes")
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    args = parser.parse_args()
+    segundos_filas, segundos_lote = comparar(args.filas)
+    print(f"{args.filas} filas: fila a fila {segundos_filas:.2f} s, por lotes {segundos_lote:.2f} s "
+          f"({segundos_filas / segundos_lote:.1f}x){'' if _numpy() is not None else ' [sin NumPy]'}")
@@ -0,0 +1,372 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+
+import trazas
+
+# -----------------------------
+# Capa de acceso a datos
+# -----------------------------
+# Todas las pantallas y la clase Hectarea pasan por este módulo en lugar de abrir
+# su propia conexión con sqlite3.connect en cada consulta. Cada hilo mantiene una
+# única conexión de larga duración (en modo autocommit, WAL y con busy timeout),
+# y sqlite3 reutiliza las sentencias preparadas a través de su caché interna.
+# Si trazas.py está activo, cada sentencia se mide y se registra con su origen.
+# Las conexiones siguen a RUTA_DB: si cambia (por ejemplo al elegir otra finca en
+# fincas.py), cada hilo cierra la suya y abre una nueva sobre la base nueva en su
+# próximo uso, salvo que esté en medio de una transacción.
+#
+# La base se configura en un solo lugar: la variable de entorno AGRARIO_DB o, si no
+# está, la clave 'ruta' de la sección [datos] de agrario.ini (junto a este módulo).
+# Las rutas relativas se toman desde la carpeta del módulo, no desde donde se lanzó el
+# proceso; sin configuración se usa cultivos.db en esa carpeta. También se aceptan URIs
+# de SQLite (file:...) y ':memory:', que se traduce a una base en memoria de caché
+# compartida para que todos los hilos vean la misma (pruebas y mediciones). Las opciones
+# --db y las fincas cambian la base con configurar(), que interpreta la ruta igual.
+#
+# Las consultas de informes piden lectura=True: usan una segunda conexión por hilo,
+# abierta con mode=ro, que nunca toma el bloqueo de escritura ni compite con quien
+# escribe. Dentro de una transacción se usa la conexión normal, que ve lo no confirmado.
+
+VARIABLE_ENTORNO = "AGRARIO_DB"
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+ARCHIVO_CONFIGURACION = os.path.join(CARPETA, "agrario.ini")
+MEMORIA = ":memory:"
+_URI_MEMORIA = "file:agrario?mode=memory&cache=shared"
+TIEMPO_ESPERA = 5.0          # segundos de espera si la base está bloqueada (busy timeout)
+SENTENCIAS_EN_CACHE = 256    # tamaño de la caché de sentencias preparadas por conexión
+
+# Estado por hilo: {id del hilo: [conexión, profundidad de transacción, ruta, conexión
+# de lectura o None, referencia débil al hilo]}. Se indexa por threading.get_ident() y no
+# con threading.local porque en los hilos creados por Qt (QThreadPool) el estado local de
+# Python se descarta al terminar cada tarea. Como un id puede reutilizarse, el estado
+# guarda también su hilo: al abrir una conexión se cierran las de los hilos que ya
+# terminaron, y un hilo nuevo con un id reciclado no hereda la conexión del anterior.
+# Los hilos de Qt cierran la suya al terminar (tareas.py).
+_hilos = {}
+_lock = threading.Lock()
+_estadisticas = {"conexiones_abiertas": 0, "sentencias_ejecutadas": 0}
+_memorias = {}     # {uri: conexión} que mantiene viva cada base en memoria
+
+
+# -----------------------------
+# Configuración
+# -----------------------------
+
+def ruta_configurada():
+    """La base indicada por AGRARIO_DB, por agrario.ini o, si no hay ninguna, cultivos.db."""
+    ruta = os.environ.get(VARIABLE_ENTORNO)
+    if not ruta and os.path.isfile(ARCHIVO_CONFIGURACION):
+        import configparser
+        configuracion = configparser.ConfigParser()
+        configuracion.read(ARCHIVO_CONFIGURACION, encoding="utf-8")
+        ruta = configuracion.get("datos", "ruta", fallback=None)
+    return normalizar(ruta or "cultivos.db")
+
+
+def normalizar(ruta):
+    """Ruta absoluta de la base (relativa a la carpeta del módulo, con ~ expandido); URIs y ':memory:' quedan igual."""
+    if ruta == MEMORIA or ruta.startswith("file:"):
+        return ruta
+    return os.path.normpath(os.path.join(CARPETA, os.path.expanduser(ruta)))
+
+
+def configurar(ruta):
+    """
+    Cambia la base de la aplicación a 'ruta', interpretada igual que AGRARIO_DB (para
+    --db y las fincas). Las conexiones de cada hilo la siguen en su próximo uso.
+    """
+    global RUTA_DB
+    RUTA_DB = normalizar(ruta)
+    return RUTA_DB
+
+
+RUTA_DB = ruta_configurada()
+
+
+def en_memoria(ruta=None):
+    ruta = RUTA_DB if ruta is None else ruta
+    return ruta == MEMORIA or (ruta.startswith("file:") and "mode=memory" in ruta)
+
+
+def archivo_db(ruta=None):
+    """El archivo de la base (también si es una URI file:), o None si está en memoria."""
+    ruta = RUTA_DB if ruta is None else ruta
+    if en_memoria(ruta):
+        return None
+    if ruta.startswith("file:"):
+        from urllib.parse import unquote, urlsplit
+        ruta = unquote(urlsplit(ruta).path)
+    return os.path.abspath(ruta)
+
+
+def carpeta_datos():
+    """Carpeta de la base configurada, donde van fincas.db y los respaldos (la del módulo si está en memoria)."""
+    archivo = archivo_db()
+    return os.path.dirname(archivo) if archivo else CARPETA
+
+
+def _uri(ruta, solo_lectura):
+    """(destino, uri) para sqlite3.connect."""
+    if ruta == MEMORIA:
+        return _URI_MEMORIA, True
+    if en_memoria(ruta):
+        return ruta, True
+    if ruta.startswith("file:"):
+        if solo_lectura and "mode=" not in ruta:
+            ruta += ("&" if "?" in ruta else "?") + "mode=ro"
+        return ruta, True
+    if solo_lectura:
+        from pathlib import Path
+        return Path(os.path.abspath(ruta)).as_uri() + "?mode=ro", True
+    return ruta, False
+
+
+def conectar(ruta=None, solo_lectura=False):
+    """
+    Conexión nueva en autocommit a 'ruta' (por defecto RUTA_DB), con su URI resuelta.
+    Con solo_lectura se abre con mode=ro (en memoria, con query_only). Es para quien
+    necesita una conexión propia, como respaldo.py; el resto usa las de cada hilo.
+    """
+    destino, uri = _uri(RUTA_DB if ruta is None else ruta, solo_lectura)
+    if uri and "mode=memory" in destino:
+        with _lock:
+            if destino not in _memorias:
+                _memorias[destino] = sqlite3.connect(destino, uri=True, check_same_thread=False)
+    # check_same_thread=False solo para poder cerrar desde otro hilo la conexión de uno que terminó
+    conn = sqlite3.connect(destino, uri=uri, timeout=TIEMPO_ESPERA, isolation_level=None,
+                           cached_statements=SENTENCIAS_EN_CACHE, check_same_thread=False)
+    if solo_lectura and "mode=memory" in destino:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+def cerrar_memoria():
+    """Descarta las bases en memoria (se pierden sus datos cuando se cierra la última conexión)."""
+    cerrar_conexion()
+    with _lock:
+        memorias = list(_memorias.values())
+        _memorias.clear()
+    for conn in memorias:
+        conn.close()
+
+
+# -----------------------------
+# Conexiones por hilo
+# -----------------------------
+
+
+def _contar(clave, cantidad=1):
+    with _lock:
+        _estadisticas[clave] += cantidad
+
+
+def _abrir_conexion(ruta, solo_lectura=False):
+    conn = conectar(ruta, solo_lectura)
+    if not solo_lectura:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    if trazas.activo():
+        conn.set_trace_callback(trazas.al_trazar)
+    _contar("conexiones_abiertas")
+    return conn
+
+
+def _estado_hilo():
+    hilo = threading.current_thread()
+    estado = _hilos.get(hilo.ident)
+    if estado is not None and estado[4]() is not hilo:
+        # Id reciclado: la conexión era de un hilo que ya terminó
+        _cerrar(estado)
+        estado = None
+    if estado is not None and estado[2] != RUTA_DB and not estado[1]:
+        _cerrar(estado)
+        estado = None
+    if estado is None:
+        _cerrar_terminados()
+        ruta = RUTA_DB
+        estado = [_abrir_conexion(ruta), 0, ruta, None, weakref.ref(hilo)]
+        with _lock:
+            _hilos[hilo.ident] = estado
+    return estado
+
+
+def _cerrar_terminados():
+    """Cierra las conexiones de los hilos que terminaron sin llamar a cerrar_conexion()."""
+    with _lock:
+        terminados = [ident for ident, estado in _hilos.items() if not _vivo(estado[4]())]
+        estados = [_hilos.pop(ident) for ident in terminados]
+    for estado in estados:
+        _cerrar(estado)
+
+
+def _vivo(hilo):
+    return hilo is not None and hilo.is_alive()
+
+
+def conexiones_por_hilo():
+    """Cantidad de hilos con una conexión abierta."""
+    with _lock:
+        return len(_hilos)
+
+
+def _cerrar(estado):
+    estado[0].close()
+    if estado[3] is not None:
+        estado[3].close()
+
+
+def obtener_conexion(lectura=False):
+    """
+    Devuelve la conexión del hilo actual, abriéndola la primera vez. Con lectura=True,
+    la conexión de solo lectura del hilo (o la normal si hay una transacción abierta).
+    """
+    estado = _estado_hilo()
+    if not lectura or estado[1]:
+        return estado[0]
+    if estado[3] is None:
+        estado[3] = _abrir_conexion(estado[2], solo_lectura=True)
+    return estado[3]
+
+
+def cerrar_conexion():
+    """Cierra la conexión del hilo actual (se vuelve a abrir si se la necesita)."""
+    with _lock:
+        estado = _hilos.pop(threading.get_ident(), None)
+    if estado is not None:
+        _cerrar(estado)
+
+
+@contextmanager
+def transaccion():
+    """
+    Agrupa varias escrituras en una sola transacción (BEGIN IMMEDIATE ... COMMIT).
+    Si ya hay una transacción abierta en el hilo, las sentencias se suman a ella.
+    """
+    estado = _estado_hilo()
+    conn = estado[0]
+    if estado[1]:
+        estado[1] += 1
+        try:
+            yield conn
+        finally:
+            estado[1] -= 1
+        return
+    _ejecutar_medido(conn, "BEGIN IMMEDIATE")
+    estado[1] = 1
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        # Con trazas, el COMMIT también se mide: en WAL es donde se espera la escritura a disco
+        if trazas.activo():
+            with trazas.sentencia(conn, "COMMIT"):
+                conn.commit()
+        else:
+            conn.commit()
+    finally:
+        estado[1] = 0
+
+
+def _ejecutar_medido(conn, sql, parametros=()):
+    if not trazas.activo():
+        return conn.execute(sql, parametros)
+    with trazas.sentencia(conn, sql, parametros) as medicion:
+        cursor = conn.execute(sql, parametros)
+        medicion.filas = cursor.rowcount if cursor.rowcount >= 0 else None
+    return cursor
+
+
+def ejecutar(sql, parametros=()):
+    """Ejecuta una sentencia y devuelve el cursor. Fuera de transaccion() se confirma sola."""
+    cursor = _ejecutar_medido(obtener_conexion(), sql, parametros)
+    _contar("sentencias_ejecutadas")
+    return cursor
+
+
+def ejecutar_muchos(sql, filas):
+    conn = obtener_conexion()
+    if not trazas.activo():
+        cursor = conn.executemany(sql, filas)
+    else:
+        with trazas.sentencia(conn, sql) as medicion:
+            cursor = conn.executemany(sql, filas)
+            medicion.filas = cursor.rowcount
+    _contar("sentencias_ejecutadas")
+    return cursor
+
+
+# Con 'conexion' la consulta usa esa conexión propia (de conectar()) y no la del hilo
+def consultar(sql, parametros=(), lectura=False, conexion=None):
+    conn = obtener_conexion(lectura) if conexion is None else conexion
+    if not trazas.activo():
+        filas = conn.execute(sql, parametros).fetchall()
+    else:
+        # La medición incluye la lectura de las filas, no solo el primer paso
+        with trazas.sentencia(conn, sql, parametros) as medicion:
+            filas = conn.execute(sql, parametros).fetchall()
+            medicion.filas = len(filas)
+    _contar("sentencias_ejecutadas")
+    return filas
+
+
+def consultar_por_bloques(sql, parametros=(), tamano=500, lectura=False):
+    """
+    Genera listas de hasta 'tamano' filas leídas del cursor, sin cargar todo el resultado.
+    Con trazas, se registra al final el tiempo de lectura (sin contar lo que tarde quien
+    consume los bloques) y la cantidad de filas.
+    """
+    conn = obtener_conexion(lectura)
+    medida = trazas.activo()
+    leidas, error = 0, None
+    inicio = time.perf_counter()
+    with trazas.sin_trazar() if medida else nullcontext():
+        cursor = conn.execute(sql, parametros)
+    segundos = time.perf_counter() - inicio
+    _contar("sentencias_ejecutadas")
+    try:
+        while True:
+            inicio = time.perf_counter()
+            with trazas.sin_trazar() if medida else nullcontext():
+                lote = cursor.fetchmany(tamano)
+            segundos += time.perf_counter() - inicio
+            if not lote:
+                break
+            leidas += len(lote)
+            yield lote
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        cursor.close()
+        if medida:
+            trazas.registrar_sentencia(conn, sql, parametros, segundos * 1000, leidas, error=error)
+
+
+def consultar_uno(sql, parametros=(), lectura=False, conexion=None):
+    conn = obtener_conexion(lectura) if conexion is None else conexion
+    if not trazas.activo():
+        fila = conn.execute(sql, parametros).fetchone()
+    else:
+        with trazas.sentencia(conn, sql, parametros) as medicion:
+            fila = conn.execute(sql, parametros).fetchone()
+            medicion.filas = 0 if fila is None else 1
+    _contar("sentencias_ejecutadas")
+    return fila
+
+
+def estadisticas():
+    """Conexiones abiertas y sentencias ejecutadas desde el inicio (o el último reinicio)."""
+    with _lock:
+        return dict(_estadisticas)
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        for clave in _estadisticas:
+            _estadisticas[clave] = 0
@@ -0,0 +1,356 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import catalogos
+import datos
+import informes
+import nucleo
+
+# -----------------------------
+# Fincas: una base por finca
+# -----------------------------
+# Cada finca tiene su propio archivo con el esquema completo de cultivos.db (usuarios,
+# catálogos, hectáreas, gestiones, sensores...), así las escrituras de una finca no
+# compiten con las de otra y ningún archivo crece con los datos de todas. Un directorio
+# pequeño (fincas.db) anota el nombre y el archivo de cada finca. La aplicación trabaja
+# sobre una finca a la vez: activar() apunta datos.RUTA_DB a su archivo y todas las
+# lecturas y escrituras, incluidas las de los hilos de consulta, van a esa base.
+#
+# Los resúmenes de todas las fincas se reparten: cada proceso de un pool calcula la parte
+# de una finca sobre su propio archivo y aquí solo se juntan los resultados, de modo que
+# el tiempo depende de la finca más grande y de los núcleos disponibles, no del total de
+# filas. El pool usa 'spawn': los procesos no heredan las conexiones abiertas del padre.
+# El informe de gestión de todas las fincas, en cambio, se pagina leyendo cada finca
+# directamente: cada página es una consulta por índice, más barata que mandarla a otro
+# proceso, y cada hilo conserva abierta su conexión de lectura a cada finca.
+# Sin fincas.db la aplicación sigue usando cultivos.db como siempre.
+#
+# Uso:
+#   python fincas.py --crear "La Esperanza"                   (nueva finca con base vacía)
+#   python fincas.py --crear Principal --archivo cultivos.db  (registra una base existente)
+#   python fincas.py --generar 4 --hectareas 250000 --gestiones 25000
+#   python fincas.py --cultivos                               (hectáreas por cultivo en todas las fincas)
+#   python fincas.py --medir                                  (informes repartidos contra uno por uno)
+
+NOMBRE_DIRECTORIO = "fincas.db"
+DIRECTORIO = None                  # ruta de fincas.db; None: junto a la base configurada (ver directorio())
+CARPETA = "fincas"                 # archivos de las fincas nuevas, junto al directorio
+PROCESOS = os.cpu_count() or 1     # procesos del pool de informes
+
+_ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS fincas (
+        codigo INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL UNIQUE,
+        archivo TEXT NOT NULL UNIQUE
+    )
+"""
+
+# Filtros del informe por nombre: los códigos de los catálogos no coinciden entre fincas
+_CODIGO_POR_NOMBRE = {
+    "usuario": "SELECT id FROM usuarios WHERE username = ?",
+    "hortaliza": "SELECT codigo FROM tipo_hortaliza WHERE nombre = ?",
+    "suelo": "SELECT codigo FROM tipo_suelo WHERE nombre = ?",
+    "clima": "SELECT codigo FROM clima WHERE nombre = ?",
+}
+
+COLUMNAS = ["Finca"] + informes.COLUMNAS
+
+_pools = {}
+_lectores = threading.local()      # por hilo: {ruta de la finca: conexión de solo lectura}
+
+
+# -----------------------------
+# Directorio
+# -----------------------------
+
+def directorio():
+    """
+    Ruta de fincas.db: DIRECTORIO si se indicó, si no junto a la base configurada en este
+    momento (se resuelve en cada uso, como respaldo.carpeta_respaldos, así sigue a
+    datos.configurar). activar() lo fija antes de pasar a la base de una finca.
+    """
+    return DIRECTORIO or os.path.join(datos.carpeta_datos(), NOMBRE_DIRECTORIO)
+
+
+def _directorio():
+    conn = sqlite3.connect(directorio(), timeout=datos.TIEMPO_ESPERA, isolation_level=None)
+    conn.execute(_ESQUEMA)
+    return closing(conn)
+
+
+def _carpeta():
+    return os.path.dirname(os.path.abspath(directorio()))
+
+
+def _ruta(archivo):
+    """Los archivos se guardan relativos a la carpeta del directorio."""
+    return os.path.join(_carpeta(), archivo)
+
+
+def existe_directorio():
+    return os.path.isfile(directorio())
+
+
+def listar():
+    """[(codigo, nombre, ruta)] de las fincas, por nombre. Vacía si no hay directorio."""
+    if not existe_directorio():
+        return []
+    with _directorio() as conn:
+        filas = conn.execute("SELECT codigo, nombre, archivo FROM fincas ORDER BY nombre").fetchall()
+    return [(codigo, nombre, _ruta(archivo)) for codigo, nombre, archivo in filas]
+
+
+def buscar(finca):
+    """(codigo, nombre, ruta) de la finca indicada por código o por nombre."""
+    for fila in listar():
+        if str(finca) in (str(fila[0]), fila[1]):
+            return fila
+    raise ValueError(f"No existe la finca '{finca}'")
+
+
+def crear(nombre, archivo=None):
+    """
+    Registra una finca. Sin 'archivo' se crea uno nuevo en CARPETA; con 'archivo' se
+    registra una base existente (por ejemplo cultivos.db). En ambos casos se aplican las
+    migraciones, en un proceso del pool para no tocar la base activa. Devuelve la finca.
+    """
+    nombre = nombre.strip()
+    if not nombre:
+        raise ValueError("El nombre de la finca no puede estar vacío")
+    if archivo is None:
+        archivo = os.path.join(CARPETA, re.sub(r"\W+", "_", nombre.lower()).strip("_") + ".db")
+    else:
+        archivo = os.path.relpath(os.path.abspath(archivo), _carpeta())
+    os.makedirs(os.path.dirname(_ruta(archivo)), exist_ok=True)
+    with _directorio() as conn:
+        try:
+            codigo = conn.execute("INSERT INTO fincas (nombre, archivo) VALUES (?, ?)", (nombre, archivo)).lastrowid
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Ya existe una finca con el nombre '{nombre}' o el archivo '{archivo}'") from None
+    finca = (codigo, nombre, _ruta(archivo))
+    _pool().submit(_en_finca, finca[2], nucleo.inicializar_db, ()).result()
+    return finca
+
+
+def activar(finca):
+    """
+    Hace de 'finca' la base de la aplicación: desde ahora todas las lecturas y escrituras
+    van a su archivo. Devuelve la finca.
+    """
+    global DIRECTORIO
+    finca = buscar(finca)
+    # La base configurada pasa a ser la de la finca: el directorio queda donde estaba
+    DIRECTORIO = directorio()
+    datos.configurar(finca[2])
+    for tabla in catalogos.CONSULTAS:
+        catalogos.invalidar(tabla)
+    nucleo.inicializar_db()
+    return finca
+
+
+def activa():
+    """La finca cuyo archivo es la base actual, o None."""
+    ruta = datos.archivo_db()
+    for fila in listar():
+        if os.path.abspath(fila[2]) == ruta:
+            return fila
+    return None
+
+
+# -----------------------------
+# Reparto entre procesos
+# -----------------------------
+
+def _pool(procesos=None):
+    procesos = procesos or PROCESOS
+    if procesos not in _pools:
+        _pools[procesos] = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+    return _pools[procesos]
+
+
+def cerrar():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def _en_finca(ruta, funcion, args):
+    """Corre en un proceso del pool: funcion(*args) sobre la base de una finca."""
+    datos.configurar(ruta)
+    try:
+        return funcion(*args)
+    finally:
+        datos.cerrar_conexion()
+
+
+def _repartir(tareas, procesos=None):
+    """tareas: [(finca, funcion, args)]. Devuelve [(finca, resultado)] en el mismo orden."""
+    pool = _pool(procesos)
+    futuros = [(finca, pool.submit(_en_finca, finca[2], funcion, args)) for finca, funcion, args in tareas]
+    return [(finca, futuro.result()) for finca, futuro in futuros]
+
+
+def repartir(funcion, *args, fincas=None, procesos=None):
+    """
+    [(finca, funcion(*args))] con funcion ejecutada sobre cada finca en paralelo. La
+    función tiene que poder importarse desde un módulo (no sirven lambdas).
+    """
+    fincas = listar() if fincas is None else fincas
+    return _repartir([(finca, funcion, args) for finca in fincas], procesos)
+
+
+# -----------------------------
+# Informes de todas las fincas
+# -----------------------------
+
+def _cultivos_de_finca():
+    return datos.consultar("SELECT tipo_de_cultivo, COUNT(*) FROM hectareas GROUP BY tipo_de_cultivo", lectura=True)
+
+
+def hectareas_por_cultivo(procesos=None):
+    """{cultivo: {nombre de finca: hectáreas}} sumando todas las fincas."""
+    resultado = {}
+    for finca, filas in repartir(_cultivos_de_finca, procesos=procesos):
+        for cultivo, cantidad in filas:
+            resultado.setdefault(cultivo, {})[finca[1]] = cantidad
+    return resultado
+
+
+def _lector(ruta):
+    """Conexión de solo lectura del hilo actual a la base de una finca; se abre una vez por hilo."""
+    conexiones = getattr(_lectores, "conexiones", None)
+    if conexiones is None:
+        conexiones = _lectores.conexiones = {}
+    if ruta not in conexiones:
+        conexiones[ruta] = datos.conectar(ruta, solo_lectura=True)
+    return conexiones[ruta]
+
+
+def _filtros_de_finca(filtros, conexion=None):
+    """Traduce {filtro: nombre} a los códigos de esta finca; None si algún nombre no existe en ella."""
+    codigos = {}
+    for clave, nombre in (filtros or {}).items():
+        if nombre is None:
+            continue
+        fila = datos.consultar_uno(_CODIGO_POR_NOMBRE[clave], (nombre,), lectura=True, conexion=conexion)
+        if fila is None:
+            return None
+        codigos[clave] = fila[0]
+    return codigos
+
+
+def _pagina_de_finca(filtros, desde, limite, conexion=None):
+    codigos = _filtros_de_finca(filtros, conexion)
+    return [] if codigos is None else informes.pagina(codigos, desde, limite, conexion)
+
+
+def pagina_informe(filtros=None, cursores=None, limite=informes.TAMANO_BLOQUE):
+    """
+    Una página del informe de gestión de todas las fincas: la página siguiente de cada
+    finca, leída con la conexión de lectura del hilo a esa finca. 'filtros' usa nombres
+    (de usuario, hortaliza, suelo y clima) en lugar de códigos. 'cursores' es {codigo de
+    finca: último código de gestión leído, o None si la finca ya terminó}; las fincas
+    ausentes empiezan desde el principio. Devuelve (filas, cursores, completo); cada fila
+    empieza con el nombre de la finca. Dentro de cada finca las filas siguen el orden por
+    código; entre fincas se intercalan de a una página.
+    """
+    cursores = dict(cursores or {})
+    filas = []
+    for finca in listar():
+        if finca[0] in cursores and cursores[finca[0]] is None:
+            continue
+        registros = _pagina_de_finca(filtros, cursores.get(finca[0]), limite, _lector(finca[2]))
+        filas.extend((finca[1],) + tuple(registro) for registro in registros)
+        cursores[finca[0]] = registros[-1][0] if len(registros) == limite else None
+    return filas, cursores, all(cursor is None for cursor in cursores.values())
+
+
+def filas_informe(filtros=None, limite=50000):
+    """Todas las filas del informe de todas las fincas, de a una página por finca y por vez."""
+    cursores, completo = None, False
+    while not completo:
+        filas, cursores, completo = pagina_informe(filtros, cursores, limite)
+        yield from filas
+
+
+def exportar_informe(ruta, filtros=None, formato=None):
+    """Exporta el informe de todas las fincas (con la columna Finca). Devuelve las filas escritas."""
+    return informes.exportar(ruta, formato=formato, filas_informe=filas_informe(filtros), columnas=COLUMNAS)
+
+
+# -----------------------------
+# Generación y medición
+# -----------------------------
+
+def generar(cantidad, hectareas=0, gestiones=0, usuarios=0, catalogos_extra=0, semilla=None):
+    """Crea 'cantidad' fincas nuevas y las llena con generador.py en paralelo (otra semilla por finca)."""
+    import generador
+    semilla = generador.SEMILLA if semilla is None else semilla
+    existentes = len(listar())
+    nuevas = [crear(f"Finca {existentes + i + 1}") for i in range(cantidad)]
+    return _repartir([(finca, generador.generar, (hectareas, gestiones, usuarios, catalogos_extra, semilla + i))
+                      for i, finca in enumerate(nuevas)])
+
+
+def medir(procesos=PROCESOS):
+    """
+    Segundos de hectáreas por cultivo de todas las fincas con un solo proceso y con
+    'procesos', y del informe de gestión de todas las fincas (que no usa el pool).
+    """
+    resultados = {}
+    for cantidad in sorted({1, procesos}):
+        # El primer uso de cada pool arranca los procesos; eso no se cuenta
+        repartir(_cultivos_de_finca, procesos=cantidad)
+        inicio = time.perf_counter()
+        conteo = hectareas_por_cultivo(cantidad)
+        resultados[cantidad] = {"hectareas_por_cultivo_s": round(time.perf_counter() - inicio, 3),
+                                "cultivos": len(conteo)}
+    inicio = time.perf_counter()
+    registros = sum(1 for _ in filas_informe())
+    resultados["informe"] = {"informe_s": round(time.perf_counter() - inicio, 3), "registros": registros}
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fincas: una base por finca e informes repartidos entre procesos")
+    parser.add_argument("--directorio", help="ruta de fincas.db (por defecto, junto a la base configurada)")
+    parser.add_argument("--crear", metavar="NOMBRE", help="registrar una finca nueva")
+    parser.add_argument("--archivo", help="con --crear, registrar esta base existente")
+    parser.add_argument("--generar", type=int, metavar="CANTIDAD", help="crear fincas con datos sintéticos")
+    parser.add_argument("--hectareas", type=int, default=10000, help="hectáreas por finca con --generar")
+    parser.add_argument("--gestiones", type=int, default=10000, help="gestiones por finca con --generar")
+    parser.add_argument("--cultivos", action="store_true", help="hectáreas por cultivo en todas las fincas")
+    parser.add_argument("--medir", action="store_true", help="informes con un proceso y con todos")
+    parser.add_argument("--procesos", type=int, default=PROCESOS)
+    args = parser.parse_args()
+    DIRECTORIO = args.directorio
+    try:
+        if args.crear:
+            print("Finca creada: {} {} ({})".format(*crear(args.crear, args.archivo)))
+        if args.generar:
+            for finca, resultado in generar(args.generar, args.hectareas, args.gestiones, usuarios=20,
+                                            catalogos_extra=10):
+                print(f"{finca[1]}: {resultado}")
+        if args.cultivos:
+            for cultivo, por_finca in sorted(hectareas_por_cultivo(args.procesos).items()):
+                detalle = ", ".join(f"{nombre}: {cantidad}" for nombre, cantidad in sorted(por_finca.items()))
+                print(f"{cultivo:20} {sum(por_finca.values()):9d}  ({detalle})")
+        if args.medir:
+            for procesos, resumen in medir(args.procesos).items():
+                titulo = f"{procesos:3d} procesos" if isinstance(procesos, int) else f"{procesos:>11}"
+                print(f"{titulo}  " + "  ".join(f"{clave}={valor}" for clave, valor in resumen.items()))
+        for codigo, nombre, ruta in listar():
+            print(f"{codigo:4d}  {nombre:30} {ruta}")
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        cerrar()
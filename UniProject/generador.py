@@ -0,0 +1,136 @@
+import argparse
+import random
+import time
+from datetime import date
+
+import catalogos
+import datos
+import importador
+import migraciones
+
+# -----------------------------
+# Generador de datos sintéticos
+# -----------------------------
+# Llena cultivos.db (o la base indicada) con usuarios, catálogos, hectáreas y gestiones
+# a la escala pedida, para medir la aplicación con 10 mil, un millón o diez millones de
+# filas. Todo sale de random.Random(semilla): sobre una base nueva, la misma semilla y
+# las mismas cantidades producen exactamente los mismos datos. Las filas se insertan
+# por lotes, una transacción por lote.
+
+TAMANO_LOTE = 50000
+SEMILLA = 42
+PALABRAS = ("riego abundante escaso plaga pulgón fertilización orgánica cosecha temprana tardía "
+            "helada suelo húmedo seco raíz podrida maleza control poda sequía semilla germinación "
+            "lenta rápida hojas amarillas manchas fruto tamaño color lluvia viento").split()
+# Palabra que aparece en una de cada FRECUENCIA_TERMINO_RARO observaciones (búsquedas selectivas)
+TERMINO_COMUN = "riego"
+TERMINO_RARO = "granizo"
+FRECUENCIA_TERMINO_RARO = 1000
+PRIMERA_SIEMBRA = date(2015, 1, 1).toordinal()
+ULTIMA_SIEMBRA = date(2025, 12, 31).toordinal()
+
+
+class ResultadoGeneracion:
+    def __init__(self):
+        self.cantidades = {}
+        self.segundos = 0.0
+
+    def __str__(self):
+        detalle = ", ".join(f"{cantidad} {tabla}" for tabla, cantidad in self.cantidades.items())
+        return f"Generación terminada en {self.segundos:.1f} s; la base tiene {detalle}"
+
+
+def _lotes(total, tamano):
+    while total > 0:
+        yield min(total, tamano)
+        total -= tamano
+
+
+def _generar_usuarios(azar, cantidad):
+    filas = [(f"usuario{i:06d}", f"clave{azar.randrange(10 ** 6):06d}", "usuario", f"usuario{i:06d}@ejemplo.com")
+             for i in range(1, cantidad + 1)]
+    with datos.transaccion():
+        datos.ejecutar_muchos("INSERT OR IGNORE INTO usuarios (username, password, role, email) VALUES (?, ?, ?, ?)", filas)
+    catalogos.invalidar("usuarios")
+
+
+def _generar_catalogos(azar, cantidad):
+    with datos.transaccion():
+        datos.ejecutar_muchos("INSERT OR IGNORE INTO tipo_suelo (nombre, descripcion, imagen) VALUES (?, ?, '')",
+                              [(f"Suelo {i:04d}", " ".join(azar.choices(PALABRAS, k=6))) for i in range(1, cantidad + 1)])
+        datos.ejecutar_muchos("INSERT OR IGNORE INTO tipo_hortaliza (nombre, descripcion, imagen) VALUES (?, ?, '')",
+                              [(f"Hortaliza {i:04d}", " ".join(azar.choices(PALABRAS, k=6))) for i in range(1, cantidad + 1)])
+        datos.ejecutar_muchos("""
+            INSERT OR IGNORE INTO clima (nombre, grados_temperatura, descripcion, imagen) VALUES (?, ?, ?, '')
+        """, [(f"Clima {i:04d}", round(azar.uniform(-5, 40), 1), " ".join(azar.choices(PALABRAS, k=6)))
+              for i in range(1, cantidad + 1)])
+        datos.ejecutar_muchos("INSERT OR IGNORE INTO tipo_cultivo (nombre, meses_primera, meses_rutinaria) VALUES (?, ?, ?)",
+                              [(f"cultivo {i:04d}", azar.randint(1, 24), azar.randint(1, 12)) for i in range(1, cantidad + 1)])
+    for tabla in ("tipo_suelo", "tipo_hortaliza", "clima", "tipo_cultivo"):
+        catalogos.invalidar(tabla)
+
+
+def _generar_hectareas(azar, cantidad, tamano_lote):
+    cultivos = [nombre.lower() for nombre in catalogos.nombres("tipo_cultivo")] or importador.CULTIVOS_POR_DEFECTO
+    suelos = catalogos.nombres("tipo_suelo") or [None]
+    for tamano in _lotes(cantidad, tamano_lote):
+        importador.insertar_lote([
+            (azar.choice(cultivos), date.fromordinal(azar.randint(PRIMERA_SIEMBRA, ULTIMA_SIEMBRA)).isoformat(),
+             azar.choice(suelos), round(azar.uniform(5, 35), 1))
+            for _ in range(tamano)])
+
+
+def _observacion(azar):
+    palabras = azar.choices(PALABRAS, k=azar.randint(5, 15))
+    if azar.randrange(FRECUENCIA_TERMINO_RARO) == 0:
+        palabras.append(TERMINO_RARO)
+    return " ".join(palabras)
+
+
+def _generar_gestiones(azar, cantidad, tamano_lote):
+    personas = [codigo for codigo, _ in catalogos.pares("usuarios")]
+    hortalizas = [codigo for codigo, _ in catalogos.pares("tipo_hortaliza")]
+    suelos = [codigo for codigo, _ in catalogos.pares("tipo_suelo")]
+    climas = [codigo for codigo, _ in catalogos.pares("clima")]
+    for tamano in _lotes(cantidad, tamano_lote):
+        filas = [(azar.choice(personas), azar.choice(hortalizas), azar.choice(suelos), azar.choice(climas),
+                  f"https://videos.ejemplo.com/{azar.randrange(10 ** 8)}" if azar.random() < 0.3 else None,
+                  _observacion(azar))
+                 for _ in range(tamano)]
+        with datos.transaccion():
+            datos.ejecutar_muchos("""
+                INSERT INTO gestion_cultivo (id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, filas)
+
+
+def generar(hectareas=0, gestiones=0, usuarios=0, catalogos_extra=0, semilla=SEMILLA, tamano_lote=TAMANO_LOTE):
+    """Agrega a la base las cantidades pedidas de cada tipo de fila. Devuelve un ResultadoGeneracion."""
+    resultado = ResultadoGeneracion()
+    azar = random.Random(semilla)
+    inicio = time.perf_counter()
+    # El orden importa para el determinismo: cada etapa consume el mismo generador
+    _generar_usuarios(azar, usuarios)
+    _generar_catalogos(azar, catalogos_extra)
+    _generar_hectareas(azar, hectareas, tamano_lote)
+    _generar_gestiones(azar, gestiones, tamano_lote)
+    resultado.segundos = time.perf_counter() - inicio
+    resultado.cantidades = {tabla: datos.consultar_uno(f"SELECT COUNT(*) FROM {tabla}")[0]
+                            for tabla in ("usuarios", "tipo_suelo", "tipo_hortaliza", "clima", "tipo_cultivo",
+                                          "hectareas", "gestion_cultivo")}
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos deterministas en cultivos.db")
+    parser.add_argument("--db", default=datos.RUTA_DB, help="base de datos a llenar (se crea si no existe)")
+    parser.add_argument("--hectareas", type=int, default=10000)
+    parser.add_argument("--gestiones", type=int, default=10000)
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--catalogos", type=int, default=10, help="filas extra por catálogo")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="filas por transacción")
+    args = parser.parse_args()
+    datos.configurar(args.db)
+    migraciones.migrar()
+    print(generar(args.hectareas, args.gestiones, args.usuarios, args.catalogos, args.semilla, args.lote))
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+import catalogos
+import cosechas
+import datos
+import migraciones
+import numeracion
+import pronostico
+
+# -----------------------------
+# Importación masiva de hectáreas (CSV / JSONL)
+# -----------------------------
+# El archivo se lee fila a fila y se procesa en lotes de tamaño fijo: cada lote se
+# valida contra los catálogos, se calculan sus cosechas, se reserva un bloque de
+# números y se inserta con executemany en una sola transacción. La memoria usada
+# depende del tamaño del lote, no del tamaño del archivo.
+#
+# Columnas reconocidas: tipo_de_cultivo, siembra (YYYY-MM-DD), tipo_suelo, temperatura.
+# Los números de hectárea siempre los asigna la secuencia; una columna 'numero' se ignora.
+
+TAMANO_LOTE = 5000
+MAX_RECHAZOS_EN_MEMORIA = 1000
+CULTIVOS_POR_DEFECTO = ["limones", "maíz", "trigo", "tomate"]
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.insertadas = 0
+        self.rechazadas = 0
+        self.rechazos = []      # primeros (linea, motivo) como muestra
+        self.segundos = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.insertadas / self.segundos if self.segundos else 0.0
+
+    def __str__(self):
+        return (f"{self.insertadas} hectáreas importadas, {self.rechazadas} rechazadas "
+                f"en {self.segundos:.2f} s ({self.filas_por_segundo:.0f} filas/s)")
+
+
+def leer_filas(ruta):
+    """Genera (linea, dict) desde un archivo CSV con encabezado o JSONL (un objeto por línea)."""
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        if ruta.lower().endswith((".jsonl", ".ndjson")):
+            for linea, texto in enumerate(archivo, start=1):
+                if texto.strip():
+                    try:
+                        fila = json.loads(texto)
+                    except ValueError as e:
+                        fila = {"_error": f"JSON inválido: {e}"}
+                    if not isinstance(fila, dict):
+                        fila = {"_error": "se esperaba un objeto JSON"}
+                    yield linea, fila
+        else:
+            for linea, fila in enumerate(csv.DictReader(archivo), start=2):
+                yield linea, fila
+
+
+def _catalogos():
+    cultivos = {nombre.lower() for nombre in catalogos.nombres("tipo_cultivo")}
+    suelos = {nombre.lower(): nombre for nombre in catalogos.nombres("tipo_suelo")}
+    return cultivos or set(CULTIVOS_POR_DEFECTO), suelos
+
+
+def _validar(fila, cultivos, suelos):
+    """Devuelve (tipo, siembra, suelo, temperatura) normalizados o lanza ValueError con el motivo."""
+    if "_error" in fila:
+        raise ValueError(fila["_error"])
+    tipo = str(fila.get("tipo_de_cultivo") or "").strip().lower()
+    if tipo not in cultivos:
+        raise ValueError(f"Tipo de cultivo desconocido: '{tipo}'")
+    siembra = str(fila.get("siembra") or "").strip()
+    try:
+        # strptime también acepta '2024-1-5': se guarda la forma canónica 'YYYY-MM-DD'
+        siembra = datetime.strptime(siembra, cosechas.FORMATO_FECHA).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Fecha de siembra inválida: '{siembra}'")
+    suelo = str(fila.get("tipo_suelo") or "").strip()
+    if suelo.lower() not in suelos:
+        raise ValueError(f"Tipo de suelo desconocido: '{suelo}'")
+    temperatura = fila.get("temperatura")
+    try:
+        temperatura = float(temperatura) if temperatura not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError(f"Temperatura inválida: '{temperatura}'")
+    return tipo, siembra, suelos[suelo.lower()], temperatura
+
+
+def insertar_lote(validas):
+    """Inserta filas ya validadas (tipo, siembra, suelo, temperatura) en una transacción, numeradas por la secuencia."""
+    fechas = cosechas.calcular_lote([(tipo, siembra) for tipo, siembra, _, _ in validas])
+    # El pronóstico se actualiza una vez por lote y no con el trigger de cada fila
+    with pronostico.carga_masiva():
+        numeros = numeracion.reservar_numeros(len(validas))
+        datos.ejecutar_muchos("""
+            INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, ((numero, tipo, siembra, primera, rutinaria, suelo, temperatura)
+              for numero, (tipo, siembra, suelo, temperatura), (primera, rutinaria)
+              in zip(numeros, validas, fechas)))
+
+
+def importar(ruta, tamano_lote=TAMANO_LOTE, archivo_rechazos=None):
+    """
+    Importa las hectáreas de 'ruta' en transacciones de 'tamano_lote' filas.
+    Si se indica 'archivo_rechazos', cada fila rechazada se escribe allí (CSV: linea, motivo).
+    """
+    resultado = ResultadoImportacion()
+    cultivos, suelos = _catalogos()
+    salida = open(archivo_rechazos, "w", encoding="utf-8", newline="") if archivo_rechazos else None
+    escritor = csv.writer(salida) if salida else None
+    if escritor:
+        escritor.writerow(["linea", "motivo"])
+    inicio = time.perf_counter()
+    try:
+        filas = leer_filas(ruta)
+        while True:
+            lote = list(islice(filas, tamano_lote))
+            if not lote:
+                break
+            validas = []
+            for linea, fila in lote:
+                try:
+                    validas.append(_validar(fila, cultivos, suelos))
+                except ValueError as e:
+                    resultado.rechazadas += 1
+                    if len(resultado.rechazos) < MAX_RECHAZOS_EN_MEMORIA:
+                        resultado.rechazos.append((linea, str(e)))
+                    if escritor:
+                        escritor.writerow([linea, str(e)])
+            if validas:
+                insertar_lote(validas)
+                resultado.insertadas += len(validas)
+    finally:
+        if salida:
+            salida.close()
+        resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa hectáreas desde un archivo CSV o JSONL")
+    parser.add_argument("archivo", help="ruta del archivo .csv o .jsonl")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="filas por transacción")
+    parser.add_argument("--rechazos", help="archivo CSV donde escribir las filas rechazadas")
+    args = parser.parse_args()
+    migraciones.migrar()
+    resultado = importar(args.archivo, args.lote, args.rechazos)
+    print(resultado)
+    for linea, motivo in resultado.rechazos[:20]:
+        print(f"  línea {linea}: {motivo}")
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import html
+import sys
+
+import datos
+import migraciones
+
+# -----------------------------
+# Informe de gestión de cultivo
+# -----------------------------
+# Los filtros (usuario, hortaliza, suelo, clima) se traducen a condiciones WHERE sobre las
+# claves foráneas de gestion_cultivo, que tienen índices (clave, codigo). Las filas se leen
+# del cursor por bloques con fetchmany, de modo que ni la pantalla ni la exportación
+# necesitan el resultado completo en memoria. La pantalla pide páginas por codigo
+# (desde / limite) y las agrega al texto a medida que llegan. Las lecturas van por la
+# conexión de solo lectura de datos.py, así un informe largo no frena a quien escribe.
+
+COLUMNAS = ["Código", "Usuario", "Tipo Hortaliza", "Tipo Suelo", "Clima", "Video", "Observaciones"]
+FILTROS = {
+    "usuario": "gc.id_persona",
+    "hortaliza": "gc.id_tipo_hortaliza",
+    "suelo": "gc.id_tipo_suelo",
+    "clima": "gc.id_clima",
+}
+TAMANO_BLOQUE = 500
+
+_CONSULTA = """
+    SELECT gc.codigo, u.username, th.nombre, ts.nombre, c.nombre, gc.video, gc.observaciones
+    FROM gestion_cultivo gc
+    JOIN usuarios u ON gc.id_persona = u.id
+    JOIN tipo_hortaliza th ON gc.id_tipo_hortaliza = th.codigo
+    JOIN tipo_suelo ts ON gc.id_tipo_suelo = ts.codigo
+    JOIN clima c ON gc.id_clima = c.codigo
+"""
+
+
+def construir_consulta(filtros=None, desde=None, limite=None):
+    """
+    Devuelve (sql, parametros) del informe. 'filtros' es un dict con claves de FILTROS;
+    los valores None se ignoran. 'desde' y 'limite' paginan por código de gestión.
+    """
+    condiciones, parametros = [], []
+    for clave, valor in (filtros or {}).items():
+        if clave not in FILTROS:
+            raise ValueError(f"Filtro desconocido: '{clave}'")
+        if valor is not None:
+            condiciones.append(f"{FILTROS[clave]} = ?")
+            parametros.append(valor)
+    if desde is not None:
+        condiciones.append("gc.codigo > ?")
+        parametros.append(desde)
+    sql = _CONSULTA
+    if condiciones:
+        sql += "    WHERE " + " AND ".join(condiciones) + "\n"
+    sql += "    ORDER BY gc.codigo\n"
+    if limite is not None:
+        sql += "    LIMIT ?\n"
+        parametros.append(limite)
+    return sql, tuple(parametros)
+
+
+def bloques(filtros=None, tamano=TAMANO_BLOQUE):
+    """Genera listas de hasta 'tamano' filas leídas del cursor."""
+    sql, parametros = construir_consulta(filtros)
+    return datos.consultar_por_bloques(sql, parametros, tamano, lectura=True)
+
+
+def filas(filtros=None):
+    for bloque in bloques(filtros):
+        yield from bloque
+
+
+def pagina(filtros=None, desde=None, limite=TAMANO_BLOQUE, conexion=None):
+    """
+    Una página de filas con código mayor que 'desde' (para cargar la pantalla por partes).
+    Con 'conexion' se lee de otra base (la de una finca) en lugar de la activa.
+    """
+    sql, parametros = construir_consulta(filtros, desde, limite)
+    return datos.consultar(sql, parametros, lectura=True, conexion=conexion)
+
+
+def formatear_texto(fila, columnas=COLUMNAS):
+    return "".join(f"{columna}: {valor}\n" for columna, valor in zip(columnas, fila)) + "-" * 40 + "\n"
+
+
+def escribir_csv(salida, filas_informe, columnas=COLUMNAS):
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    cantidad = 0
+    for fila in filas_informe:
+        escritor.writerow(fila)
+        cantidad += 1
+    return cantidad
+
+
+def escribir_html(salida, filas_informe, columnas=COLUMNAS):
+    salida.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+                 "<title>Informe de Gestión Cultivo</title></head><body>\n"
+                 "<h1>Informe de Gestión Cultivo</h1>\n<table border=\"1\">\n<tr>")
+    salida.write("".join(f"<th>{html.escape(columna)}</th>" for columna in columnas))
+    salida.write("</tr>\n")
+    cantidad = 0
+    for fila in filas_informe:
+        salida.write("<tr>" + "".join(f"<td>{html.escape('' if v is None else str(v))}</td>" for v in fila)
+                     + "</tr>\n")
+        cantidad += 1
+    salida.write("</table>\n</body></html>\n")
+    return cantidad
+
+
+def escribir_texto(salida, filas_informe, columnas=COLUMNAS):
+    cantidad = 0
+    for fila in filas_informe:
+        salida.write(formatear_texto(fila, columnas))
+        cantidad += 1
+    return cantidad
+
+
+ESCRITORES = {"csv": escribir_csv, "html": escribir_html, "txt": escribir_texto}
+FORMATOS = tuple(ESCRITORES)
+
+
+def exportar(ruta, filtros=None, formato=None, filas_informe=None, columnas=COLUMNAS):
+    """
+    Escribe el informe en 'ruta' (csv, html o txt; por defecto según la extensión).
+    Devuelve las filas escritas. Con 'filas_informe' se escriben esas filas (por ejemplo
+    las de todas las fincas, con sus columnas) en lugar de consultar la base actual.
+    """
+    formato = (formato or ruta.rsplit(".", 1)[-1]).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: '{formato}'")
+    if filas_informe is None:
+        filas_informe = filas(filtros)
+    with open(ruta, "w", encoding="utf-8", newline="" if formato == "csv" else None) as salida:
+        return ESCRITORES[formato](salida, filas_informe, columnas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el informe de gestión de cultivo")
+    parser.add_argument("archivo", help="archivo de salida (.csv, .html o .txt); '-' escribe CSV por la salida estándar")
+    parser.add_argument("--formato", choices=FORMATOS)
+    for clave in FILTROS:
+        parser.add_argument(f"--{clave}", type=int, help=f"código de {clave}")
+    args = parser.parse_args()
+    migraciones.migrar()
+    filtros = {clave: getattr(args, clave) for clave in FILTROS}
+    if args.archivo == "-":
+        ESCRITORES[args.formato or "csv"](sys.stdout, filas(filtros))
+    else:
+        cantidad = exportar(args.archivo, filtros, args.formato)
+        print(f"{cantidad} registros exportados a {args.archivo}")
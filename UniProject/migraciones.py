@@ -0,0 +1,565 @@
+import argparse
+import logging
+import time
+from contextlib import nullcontext
+
+import datos
+
+# -----------------------------
+# Migraciones del esquema (PRAGMA user_version)
+# -----------------------------
+# Cada migración es un paso numerado e idempotente. La versión aplicada se guarda
+# en PRAGMA user_version, de modo que una base ya actualizada se abre con una sola
+# lectura de ese pragma y sin repetir DDL ni comprobaciones de datos por defecto.
+
+log = logging.getLogger(__name__)
+
+
+def _esquema_inicial():
+    # Tabla: usuarios
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT CHECK(role IN ('admin', 'usuario')),
+            email TEXT
+        )
+    """)
+    # Tabla: hectareas
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS hectareas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            numero INTEGER,
+            tipo_de_cultivo TEXT,
+            siembra TEXT,
+            primera_cosecha TEXT,
+            cosecha_rutinaria TEXT,
+            tipo_suelo TEXT,
+            temperatura REAL
+        )
+    """)
+    # Tabla: tipo_suelo
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS tipo_suelo (
+            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE,
+            descripcion TEXT,
+            imagen TEXT
+        )
+    """)
+    if datos.consultar_uno("SELECT COUNT(*) FROM tipo_suelo")[0] == 0:
+        default_suelos = [
+            ("Arenoso", "Suelos con alta cantidad de arena.", "arenoso.jpg"),
+            ("Limoso", "Suelos con alta proporción de limo.", "limoso.jpg"),
+            ("Franco", "Suelos equilibrados.", "franco.jpg"),
+            ("Arcilloso", "Suelos con alta cantidad de arcilla.", "arcilloso.jpg")
+        ]
+        datos.ejecutar_muchos("INSERT INTO tipo_suelo (nombre, descripcion, imagen) VALUES (?, ?, ?)", default_suelos)
+    # Tabla: tipo_hortaliza
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS tipo_hortaliza (
+            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE,
+            descripcion TEXT,
+            imagen TEXT
+        )
+    """)
+    if datos.consultar_uno("SELECT COUNT(*) FROM tipo_hortaliza")[0] == 0:
+        default_hortalizas = [
+            ("Bulbos", "Vegetales de forma redonda que crecen bajo tierra.", "bulbos.jpg"),
+            ("Tallos comestibles", "Vegetales con tallos comestibles.", "tallos.jpg"),
+            ("Raíces comestibles", "Vegetales con raíces comestibles.", "raices.jpg"),
+            ("Frutos", "Vegetales de tipo fruto.", "frutos.jpg"),
+            ("Hojas", "Vegetales donde se consumen las hojas.", "hojas.jpg"),
+            ("Flores", "Vegetales en los que se consumen las flores.", "flores.jpg"),
+            ("Tubérculos", "Vegetales con tubérculos comestibles.", "tuberculos.jpg")
+        ]
+        datos.ejecutar_muchos("INSERT INTO tipo_hortaliza (nombre, descripcion, imagen) VALUES (?, ?, ?)", default_hortalizas)
+    # Tabla: clima
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS clima (
+            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE,
+            grados_temperatura REAL,
+            descripcion TEXT,
+            imagen TEXT
+        )
+    """)
+    if datos.consultar_uno("SELECT COUNT(*) FROM clima")[0] == 0:
+        default_climas = [
+            ("Tropical", 30, "Clima cálido y húmedo.", "tropical.jpg"),
+            ("Seco", 25, "Clima árido con poca humedad.", "seco.jpg"),
+            ("Templado", 20, "Clima moderado.", "templado.jpg"),
+            ("Continental", 15, "Clima con estaciones bien marcadas.", "continental.jpg"),
+            ("Polar", 0, "Clima muy frío.", "polar.jpg")
+        ]
+        datos.ejecutar_muchos("INSERT INTO clima (nombre, grados_temperatura, descripcion, imagen) VALUES (?, ?, ?, ?)", default_climas)
+    # Tabla: gestion_cultivo
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS gestion_cultivo (
+            codigo INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_persona INTEGER,
+            id_tipo_hortaliza INTEGER,
+            id_tipo_suelo INTEGER,
+            id_clima INTEGER,
+            video TEXT,
+            observaciones TEXT,
+            FOREIGN KEY(id_persona) REFERENCES usuarios(id),
+            FOREIGN KEY(id_tipo_hortaliza) REFERENCES tipo_hortaliza(codigo),
+            FOREIGN KEY(id_tipo_suelo) REFERENCES tipo_suelo(codigo),
+            FOREIGN KEY(id_clima) REFERENCES clima(codigo)
+        )
+    """)
+    # NUEVA TABLA: tipo_cultivo
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS tipo_cultivo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT UNIQUE,
+            meses_primera INTEGER,
+            meses_rutinaria INTEGER
+        )
+    """)
+    # Insertar usuario admin por defecto
+    datos.ejecutar("INSERT OR IGNORE INTO usuarios (username, password, role, email) VALUES ('admin', 'admin123', 'admin', NULL)")
+
+
+
+def _indices_busqueda():
+    # Las hectáreas con número repetido (posibles antes del índice único) se renumeran
+    # al final de la secuencia, conservando el número en la fila más antigua.
+    datos.ejecutar("""
+        UPDATE hectareas
+        SET numero = (SELECT MAX(numero) FROM hectareas) + id
+        WHERE numero IS NOT NULL AND id NOT IN (SELECT MIN(id) FROM hectareas GROUP BY numero)
+    """)
+    datos.ejecutar("CREATE UNIQUE INDEX IF NOT EXISTS idx_hectareas_numero ON hectareas(numero)")
+    # Claves foráneas de gestion_cultivo usadas por el informe; incluyen codigo para cubrir la consulta
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_gestion_persona ON gestion_cultivo(id_persona, codigo)")
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_gestion_hortaliza ON gestion_cultivo(id_tipo_hortaliza, codigo)")
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_gestion_suelo ON gestion_cultivo(id_tipo_suelo, codigo)")
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_gestion_clima ON gestion_cultivo(id_clima, codigo)")
+    # Recuperación de contraseña por correo
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios(email)")
+
+
+
+def _secuencia_hectareas():
+    # Contador de números de hectárea: se incrementa dentro de la misma transacción
+    # que la inserción, en lugar de calcular MAX(numero) en cada registro.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS secuencias (
+            nombre TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    """)
+    datos.ejecutar("""
+        INSERT OR IGNORE INTO secuencias (nombre, valor)
+        SELECT 'hectareas', COALESCE(MAX(numero), 0) FROM hectareas
+    """)
+    # Si una hectárea se inserta con un número explícito mayor, la secuencia lo alcanza
+    datos.ejecutar("""
+        CREATE TRIGGER IF NOT EXISTS trg_hectareas_secuencia
+        AFTER INSERT ON hectareas
+        WHEN NEW.numero > (SELECT valor FROM secuencias WHERE nombre = 'hectareas')
+        BEGIN
+            UPDATE secuencias SET valor = NEW.numero WHERE nombre = 'hectareas';
+        END
+    """)
+
+
+# Fuentes del índice de texto: (número de fuente, tabla, columna del título o None, columna del texto).
+# En el índice, rowid = codigo * 4 + fuente, así cada fila se ubica por rowid desde los triggers.
+FUENTES_BUSQUEDA = [
+    (0, "tipo_hortaliza", "nombre", "descripcion"),
+    (1, "tipo_suelo", "nombre", "descripcion"),
+    (2, "clima", "nombre", "descripcion"),
+    (3, "gestion_cultivo", None, "observaciones"),
+]
+
+
+def _indice_texto(opciones=""):
+    # Índice FTS5 único para catálogos y observaciones; remove_diacritics hace que
+    # "raices" encuentre "Raíces". El título pesa diez veces más que el texto en el ranking.
+    datos.ejecutar(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5(
+            titulo, texto, tokenize = 'unicode61 remove_diacritics 2'{opciones}
+        )
+    """)
+    datos.ejecutar("INSERT INTO busqueda (busqueda, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    # Se vacía antes de llenarlo: repetir el paso deja el mismo índice
+    datos.ejecutar("DELETE FROM busqueda")
+    for fuente, tabla, titulo, texto in FUENTES_BUSQUEDA:
+        valores = f"NEW.codigo * 4 + {fuente}, {'NEW.' + titulo if titulo else 'NULL'}, NEW.{texto}"
+        nuevo = f"INSERT INTO busqueda (rowid, titulo, texto) VALUES ({valores});"
+        borrar = f"DELETE FROM busqueda WHERE rowid = OLD.codigo * 4 + {fuente};"
+        columnas = ", ".join(c for c in ("codigo", titulo, texto) if c)
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_busqueda_alta AFTER INSERT ON {tabla} "
+                       f"BEGIN {nuevo} END")
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_busqueda_cambio AFTER UPDATE OF {columnas} ON {tabla} "
+                       f"BEGIN {borrar} {nuevo} END")
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_busqueda_baja AFTER DELETE ON {tabla} "
+                       f"BEGIN {borrar} END")
+        datos.ejecutar(f"INSERT INTO busqueda (rowid, titulo, texto) SELECT codigo * 4 + {fuente}, {titulo or 'NULL'}, {texto} "
+                       f"FROM {tabla}")
+
+
+# Cosechas de una hectárea ({h} es NEW, OLD o hectareas): una fila por cosecha (primera y
+# rutinaria) y por escala. El período de la escala 'mes' es 'YYYY-MM'; el de 'semana', la
+# fecha del lunes de esa semana. Las fechas vacías o inválidas no cuentan.
+_COSECHAS_POR_PERIODO = """
+    SELECT escala, CASE escala WHEN 'mes' THEN substr(fecha, 1, 7) ELSE date(fecha, 'weekday 0', '-6 days') END AS periodo,
+           tipo_de_cultivo, cosecha, temperatura
+    FROM (SELECT escalas.escala, cosechas.cosecha, coalesce(h.tipo_de_cultivo, '') AS tipo_de_cultivo, h.temperatura,
+                 date(CASE cosechas.cosecha WHEN 'primera' THEN h.primera_cosecha ELSE h.cosecha_rutinaria END) AS fecha
+          FROM {h} AS h, (SELECT 'mes' AS escala UNION ALL SELECT 'semana') AS escalas,
+               (SELECT 'primera' AS cosecha UNION ALL SELECT 'rutinaria') AS cosechas)
+    WHERE fecha IS NOT NULL
+"""
+
+
+def cosechas_por_periodo(fila):
+    """SELECT de _COSECHAS_POR_PERIODO para NEW/OLD (dentro de un trigger) o para la tabla hectareas."""
+    if fila in ("NEW", "OLD"):
+        fila = (f"(SELECT {fila}.tipo_de_cultivo AS tipo_de_cultivo, {fila}.temperatura AS temperatura, "
+                f"{fila}.primera_cosecha AS primera_cosecha, {fila}.cosecha_rutinaria AS cosecha_rutinaria)")
+    return _COSECHAS_POR_PERIODO.format(h=fila)
+
+
+def _pronostico_cosechas():
+    # Resumen de hectáreas a cosechar por cultivo y período, mantenido por triggers para
+    # que el pronóstico no tenga que leer toda la tabla hectareas. La temperatura se guarda
+    # como suma y cantidad, así el promedio se puede actualizar al dar de alta y de baja.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS pronostico_cosechas (
+            escala TEXT NOT NULL,
+            periodo TEXT NOT NULL,
+            tipo_de_cultivo TEXT NOT NULL,
+            cosecha TEXT NOT NULL,
+            hectareas INTEGER NOT NULL,
+            suma_temperatura REAL NOT NULL,
+            con_temperatura INTEGER NOT NULL,
+            PRIMARY KEY (escala, periodo, tipo_de_cultivo, cosecha)
+        ) WITHOUT ROWID
+    """)
+    # Mientras tenga una fila, el alta no actualiza el resumen fila por fila: las cargas
+    # masivas (pronostico.carga_masiva) lo actualizan al final con una sola sentencia
+    datos.ejecutar("CREATE TABLE IF NOT EXISTS pronostico_pausa (id INTEGER PRIMARY KEY CHECK (id = 1))")
+    alta = f"""
+        INSERT INTO pronostico_cosechas
+            (escala, periodo, tipo_de_cultivo, cosecha, hectareas, suma_temperatura, con_temperatura)
+        SELECT escala, periodo, tipo_de_cultivo, cosecha, 1, coalesce(temperatura, 0), temperatura IS NOT NULL
+        FROM ({cosechas_por_periodo("NEW")}) WHERE true
+        ON CONFLICT (escala, periodo, tipo_de_cultivo, cosecha) DO UPDATE SET
+            hectareas = hectareas + 1,
+            suma_temperatura = suma_temperatura + excluded.suma_temperatura,
+            con_temperatura = con_temperatura + excluded.con_temperatura;
+    """
+    claves_old = f"(escala, periodo, tipo_de_cultivo, cosecha) IN " \
+                 f"(SELECT escala, periodo, tipo_de_cultivo, cosecha FROM ({cosechas_por_periodo('OLD')}))"
+    baja = f"""
+        UPDATE pronostico_cosechas SET
+            hectareas = hectareas - 1,
+            suma_temperatura = suma_temperatura - coalesce(OLD.temperatura, 0),
+            con_temperatura = con_temperatura - (OLD.temperatura IS NOT NULL)
+        WHERE {claves_old};
+        DELETE FROM pronostico_cosechas WHERE hectareas <= 0 AND {claves_old};
+    """
+    datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_hectareas_pronostico_alta AFTER INSERT ON hectareas "
+                   f"WHEN NOT EXISTS (SELECT 1 FROM pronostico_pausa) BEGIN {alta} END")
+    datos.ejecutar(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_hectareas_pronostico_cambio
+        AFTER UPDATE OF tipo_de_cultivo, primera_cosecha, cosecha_rutinaria, temperatura ON hectareas
+        WHEN OLD.tipo_de_cultivo IS NOT NEW.tipo_de_cultivo OR OLD.primera_cosecha IS NOT NEW.primera_cosecha
+          OR OLD.cosecha_rutinaria IS NOT NEW.cosecha_rutinaria OR OLD.temperatura IS NOT NEW.temperatura
+        BEGIN {baja} {alta} END
+    """)
+    datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_hectareas_pronostico_baja AFTER DELETE ON hectareas "
+                   f"BEGIN {baja} END")
+    # OR REPLACE: repetir el paso vuelve a contar desde hectareas en lugar de duplicar
+    datos.ejecutar(f"""
+        INSERT OR REPLACE INTO pronostico_cosechas
+            (escala, periodo, tipo_de_cultivo, cosecha, hectareas, suma_temperatura, con_temperatura)
+        SELECT escala, periodo, tipo_de_cultivo, cosecha, COUNT(*), coalesce(SUM(temperatura), 0), COUNT(temperatura)
+        FROM ({cosechas_por_periodo("hectareas")})
+        GROUP BY escala, periodo, tipo_de_cultivo, cosecha
+    """)
+
+
+# Tablas cuyas altas, cambios y bajas quedan en el registro de cambios: (tabla, clave primaria)
+TABLAS_CAMBIOS = [
+    ("hectareas", "id"),
+    ("gestion_cultivo", "codigo"),
+    ("tipo_hortaliza", "codigo"),
+    ("tipo_suelo", "codigo"),
+    ("clima", "codigo"),
+    ("tipo_cultivo", "id"),
+    ("usuarios", "id"),
+]
+
+
+def _registro_cambios():
+    # Cada alta, cambio o baja agrega una fila con una versión creciente (AUTOINCREMENT
+    # nunca reutiliza números), así una pantalla pregunta "qué cambió desde la versión N"
+    # y vuelve a leer solo esas claves, aunque el cambio lo haya hecho otra instancia.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS cambios (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            clave INTEGER,
+            operacion TEXT NOT NULL CHECK (operacion IN ('alta', 'cambio', 'baja', 'recarga'))
+        )
+    """)
+    # Versión hasta la que se borró el registro (cambios.podar); más atrás no se puede seguir
+    datos.ejecutar("INSERT OR IGNORE INTO secuencias (nombre, valor) VALUES ('cambios_podados', 0)")
+    for tabla, clave in TABLAS_CAMBIOS:
+        registrar = "INSERT INTO cambios (tabla, clave, operacion) VALUES ('{tabla}', {fila}.{clave}, '{operacion}');"
+        alta = registrar.format(tabla=tabla, fila="NEW", clave=clave, operacion="alta")
+        baja = registrar.format(tabla=tabla, fila="OLD", clave=clave, operacion="baja")
+        cambio = registrar.format(tabla=tabla, fila="NEW", clave=clave, operacion="cambio")
+        condicion = ""
+        if tabla == "hectareas":
+            # Las cargas masivas (pronostico.carga_masiva) registran una sola 'recarga' al final
+            condicion = "WHEN NOT EXISTS (SELECT 1 FROM pronostico_pausa) "
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_cambios_alta AFTER INSERT ON {tabla} "
+                       f"{condicion}BEGIN {alta} END")
+        # Si cambia la clave primaria, la clave vieja desaparece de la lista
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_cambios_clave AFTER UPDATE ON {tabla} "
+                       f"WHEN OLD.{clave} IS NOT NEW.{clave} BEGIN {baja} END")
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_cambios_cambio AFTER UPDATE ON {tabla} "
+                       f"BEGIN {cambio} END")
+        datos.ejecutar(f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_cambios_baja AFTER DELETE ON {tabla} "
+                       f"BEGIN {baja} END")
+
+
+def _calendario_cosechas():
+    # Índice de cosechas recurrentes (calendario_cosechas.py). Cada hectárea guarda su
+    # primera cosecha y la serie de las rutinarias: unidad ('dia' o 'mes'), periodo,
+    # inicio (la cosecha rutinaria, como día ordinal o número de mes) y fase (inicio
+    # módulo periodo). Las hectáreas con cosecha en un rango salen por rango de fase, sin
+    # generar los eventos de toda la tabla. Se llena la primera vez que se consulta.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS calendario_cosechas (
+            id INTEGER PRIMARY KEY,
+            primera INTEGER,
+            unidad TEXT,
+            periodo INTEGER,
+            inicio INTEGER,
+            fase INTEGER,
+            dia INTEGER
+        )
+    """)
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_calendario_primera ON calendario_cosechas(primera)")
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_calendario_fase ON calendario_cosechas(unidad, periodo, fase, inicio)")
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS calendario_periodos (
+            unidad TEXT NOT NULL,
+            periodo INTEGER NOT NULL,
+            PRIMARY KEY (unidad, periodo)
+        ) WITHOUT ROWID
+    """)
+    # Versión del registro de cambios hasta la que está al día; -1: nunca se construyó
+    datos.ejecutar("INSERT OR IGNORE INTO secuencias (nombre, valor) VALUES ('calendario_cosechas', -1)")
+
+
+def _lecturas_sensores():
+    # Lecturas de temperatura de los sensores de campo (sensores.py). La tabla de lecturas
+    # solo recibe inserciones al final (AUTOINCREMENT: los id nunca se reutilizan, así el
+    # resumen avanza por rango de id) y no tiene índices secundarios que mantener. Los
+    # resúmenes por hora y por día guardan mínimo, máximo, suma y cantidad por hectárea.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS lecturas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hectarea INTEGER NOT NULL,
+            instante INTEGER NOT NULL,
+            temperatura REAL NOT NULL
+        )
+    """)
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS lecturas_resumen (
+            hectarea INTEGER NOT NULL,
+            escala TEXT NOT NULL CHECK (escala IN ('hora', 'dia')),
+            inicio INTEGER NOT NULL,
+            minimo REAL NOT NULL,
+            maximo REAL NOT NULL,
+            suma REAL NOT NULL,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY (hectarea, escala, inicio)
+        ) WITHOUT ROWID
+    """)
+    # Último id de lecturas ya sumado a los resúmenes
+    datos.ejecutar("INSERT OR IGNORE INTO secuencias (nombre, valor) VALUES ('lecturas_resumidas', 0)")
+    datos.ejecutar("""
+        CREATE TRIGGER IF NOT EXISTS trg_hectareas_lecturas_baja AFTER DELETE ON hectareas
+        BEGIN
+            DELETE FROM lecturas_resumen WHERE hectarea = OLD.numero;
+        END
+    """)
+
+
+# Temperatura de una hectárea ({h} es hectareas o su alias) para las listas: el promedio de
+# su última hora con lecturas, o la columna temperatura si no tiene sensor. La columna solo
+# se pone al día cuando sensores.resumir() corre; el resumen es lo último que se sabe.
+TEMPERATURA_ACTUAL = """coalesce((SELECT round(r.suma / r.cantidad, 1) FROM lecturas_resumen r
+    WHERE r.hectarea = {h}.numero AND r.escala = 'hora' ORDER BY r.inicio DESC LIMIT 1), {h}.temperatura)"""
+
+
+def _lecturas_por_hectarea():
+    # La baja de una hectárea borra también sus lecturas crudas: si no, las que todavía no
+    # se resumieron volverían a crear resúmenes de una hectárea que ya no existe. El índice
+    # por hectárea evita que cada baja recorra toda la tabla de lecturas.
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_lecturas_hectarea ON lecturas(hectarea)")
+    datos.ejecutar("DROP TRIGGER IF EXISTS trg_hectareas_lecturas_baja")
+    datos.ejecutar("""
+        CREATE TRIGGER trg_hectareas_lecturas_baja AFTER DELETE ON hectareas
+        BEGIN
+            DELETE FROM lecturas_resumen WHERE hectarea = OLD.numero;
+            DELETE FROM lecturas WHERE hectarea = OLD.numero;
+        END
+    """)
+
+
+# Reglas iniciales de aptitud para los catálogos por defecto: rango de temperatura
+# (mínima, óptima, máxima en °C) y afinidad con Arenoso, Limoso, Franco y Arcilloso
+REGLAS_APTITUD = {
+    "Bulbos": ((5, 18, 30), (0.8, 0.7, 1.0, 0.3)),
+    "Tallos comestibles": ((7, 20, 30), (0.5, 0.8, 1.0, 0.5)),
+    "Raíces comestibles": ((5, 18, 28), (1.0, 0.7, 0.9, 0.2)),
+    "Frutos": ((12, 25, 35), (0.6, 0.8, 1.0, 0.5)),
+    "Hojas": ((4, 16, 26), (0.4, 0.9, 1.0, 0.6)),
+    "Flores": ((5, 17, 27), (0.4, 0.8, 1.0, 0.7)),
+    "Tubérculos": ((7, 18, 28), (0.9, 0.7, 1.0, 0.3)),
+}
+SUELOS_APTITUD = ("Arenoso", "Limoso", "Franco", "Arcilloso")
+
+
+def _aptitud():
+    # Motor de aptitud (aptitud.py): reglas por hortaliza y la matriz precalculada con el
+    # puntaje de cada combinación hortaliza × suelo × clima. La matriz se llena la primera
+    # vez que se consulta y después se recalcula solo para las filas de catálogo que cambian.
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS aptitud_temperatura (
+            hortaliza INTEGER PRIMARY KEY REFERENCES tipo_hortaliza(codigo),
+            minima REAL NOT NULL,
+            optima REAL NOT NULL,
+            maxima REAL NOT NULL,
+            CHECK (minima <= optima AND optima <= maxima)
+        )
+    """)
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS aptitud_suelo (
+            hortaliza INTEGER NOT NULL REFERENCES tipo_hortaliza(codigo),
+            suelo INTEGER NOT NULL REFERENCES tipo_suelo(codigo),
+            afinidad REAL NOT NULL CHECK (afinidad BETWEEN 0 AND 1),
+            PRIMARY KEY (hortaliza, suelo)
+        ) WITHOUT ROWID
+    """)
+    datos.ejecutar("""
+        CREATE TABLE IF NOT EXISTS aptitud (
+            hortaliza INTEGER NOT NULL,
+            suelo INTEGER NOT NULL,
+            clima INTEGER NOT NULL,
+            puntaje REAL NOT NULL,
+            PRIMARY KEY (hortaliza, suelo, clima)
+        ) WITHOUT ROWID
+    """)
+    # Recomendaciones para un suelo y un clima, de mayor a menor puntaje
+    datos.ejecutar("CREATE INDEX IF NOT EXISTS idx_aptitud_combinacion ON aptitud(suelo, clima, puntaje)")
+    for nombre, (rango, afinidades) in REGLAS_APTITUD.items():
+        datos.ejecutar("""
+            INSERT OR IGNORE INTO aptitud_temperatura (hortaliza, minima, optima, maxima)
+            SELECT codigo, ?, ?, ? FROM tipo_hortaliza WHERE nombre = ?
+        """, (*rango, nombre))
+        datos.ejecutar_muchos("""
+            INSERT OR IGNORE INTO aptitud_suelo (hortaliza, suelo, afinidad)
+            SELECT h.codigo, s.codigo, ? FROM tipo_hortaliza h, tipo_suelo s WHERE h.nombre = ? AND s.nombre = ?
+        """, [(afinidad, nombre, suelo) for suelo, afinidad in zip(SUELOS_APTITUD, afinidades)])
+    # Versión del registro de cambios hasta la que está al día la matriz; -1: nunca se calculó
+    datos.ejecutar("INSERT OR IGNORE INTO secuencias (nombre, valor) VALUES ('aptitud', -1)")
+
+
+def _busqueda_por_prefijo():
+    # buscador.expresion busca cada palabra como prefijo; los índices de prefijos de 2 y 3
+    # letras resuelven las palabras cortas sin recorrer todos los términos del índice.
+    # FTS5 no permite agregarlos a una tabla existente: se vuelve a crear y a llenar.
+    datos.ejecutar("DROP TABLE IF EXISTS busqueda")
+    _indice_texto(", prefix = '2 3'")
+
+
+MIGRACIONES = [
+    (1, "Esquema inicial y datos por defecto", _esquema_inicial),
+    (2, "Índices de búsqueda en hectareas, gestion_cultivo y usuarios", _indices_busqueda),
+    (3, "Secuencia de números de hectárea", _secuencia_hectareas),
+    (4, "Índice de texto completo (FTS5) de catálogos y observaciones", _indice_texto),
+    (5, "Resumen de cosechas por cultivo y período (pronóstico)", _pronostico_cosechas),
+    (6, "Registro de cambios para actualizar las listas por diferencias", _registro_cambios),
+    (7, "Índice de cosechas recurrentes para consultas por rango de fechas", _calendario_cosechas),
+    (8, "Lecturas de temperatura de sensores y resúmenes por hora y día", _lecturas_sensores),
+    (9, "Reglas de aptitud y matriz hortaliza × suelo × clima", _aptitud),
+    (10, "Índices de prefijos en el índice de texto completo", _busqueda_por_prefijo),
+    (11, "La baja de una hectárea borra también sus lecturas de sensores", _lecturas_por_hectarea),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+class _Simulacion(Exception):
+    """Se lanza para deshacer la transacción de una simulación."""
+
+
+def version_actual():
+    return datos.consultar_uno("PRAGMA user_version")[0]
+
+
+def _objetos_esquema():
+    filas = datos.consultar("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")
+    return {(tipo, nombre): sql for tipo, nombre, sql in filas}
+
+
+def migrar(simular=False):
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia transacción.
+    Devuelve una lista de (version, descripcion, segundos, cambios). Con simular=True
+    todos los pasos corren dentro de una sola transacción que se deshace al final (cada
+    paso necesita lo que dejaron los anteriores), y 'cambios' describe los objetos del
+    esquema que cada paso crearía o modificaría.
+    """
+    version = version_actual()
+    pendientes = [m for m in MIGRACIONES if m[0] > version]
+    resultados = []
+    try:
+        with datos.transaccion() if simular else nullcontext():
+            for numero, descripcion, paso in pendientes:
+                antes = _objetos_esquema() if simular else None
+                inicio = time.perf_counter()
+                with datos.transaccion():
+                    paso()
+                    if simular:
+                        despues = _objetos_esquema()
+                        cambios = [f"{'crear' if clave not in antes else 'modificar'} {clave[0]} {clave[1]}"
+                                   for clave, sql in despues.items() if antes.get(clave) != sql]
+                        cambios += [f"eliminar {clave[0]} {clave[1]}" for clave in antes if clave not in despues]
+                    else:
+                        datos.ejecutar(f"PRAGMA user_version = {numero}")
+                        cambios = None
+                segundos = time.perf_counter() - inicio
+                log.info("Migración %s (%s): %.3f s%s", numero, descripcion, segundos, " [simulada]" if simular else "")
+                resultados.append((numero, descripcion, segundos, cambios))
+            if simular:
+                raise _Simulacion()
+    except _Simulacion:
+        pass
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes de cultivos.db")
+    parser.add_argument("--simular", action="store_true", help="muestra lo que cambiaría sin aplicarlo")
+    args = parser.parse_args()
+    print(f"Versión actual del esquema: {version_actual()} (última: {VERSION_ESQUEMA})")
+    resultados = migrar(simular=args.simular)
+    if not resultados:
+        print("La base de datos ya está actualizada.")
+    for numero, descripcion, segundos, cambios in resultados:
+        print(f"{'[simulación] ' if args.simular else ''}{numero}: {descripcion} ({segundos * 1000:.1f} ms)")
+        for cambio in cambios or []:
+            print(f"    {cambio}")
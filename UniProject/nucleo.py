@@ -0,0 +1,277 @@
+import json
+from datetime import datetime
+
+import cambios
+import catalogos
+import cosechas
+import datos
+import migraciones
+import numeracion
+
+# -----------------------------
+# Funciones Auxiliares y Inicialización de la DB
+# -----------------------------
+# Lógica de dominio sin interfaz: la usan la aplicación (ContabilidadAgricola.py) y la
+# línea de comandos (agrario.py). Este módulo no debe importar PyQt5.
+def inicializar_db():
+    # Una base al día solo lee PRAGMA user_version. El registro de cambios se poda aquí
+    # solo si hubo migraciones; la aplicación lo poda después en segundo plano.
+    if migraciones.migrar():
+        cambios.podar()
+
+# Los catálogos se sirven desde la caché de catalogos.py; las pantallas de ABM la invalidan
+def obtener_personas():
+    return catalogos.pares("usuarios")
+
+def obtener_tipo_hortaliza():
+    return catalogos.pares("tipo_hortaliza")
+
+def obtener_tipo_suelo():
+    return catalogos.pares("tipo_suelo")
+
+def obtener_climas():
+    return catalogos.pares("clima")
+
+# -----------------------------
+# Clase Hectarea
+# -----------------------------
+class Hectarea:
+    COLUMNAS = ["numero", "tipo_de_cultivo", "siembra", "primera_cosecha", "cosecha_rutinaria", "tipo_suelo", "temperatura"]
+
+    def __init__(self, numero, tipo_de_cultivo, siembra, primera_cosecha=None, cosecha_rutinaria=None, tipo_suelo=None, temperatura=None):
+        self.numero = numero
+        self.tipo_de_cultivo = tipo_de_cultivo.lower()
+        self.siembra = datetime.strptime(siembra, "%Y-%m-%d")
+        # Las fechas de cosecha no indicadas se calculan según el tipo de cultivo
+        self.primeracosecha, rutinaria = cosechas.calcular_cosechas(
+            self.tipo_de_cultivo, self.siembra, primera_cosecha, cosecha_rutinaria)
+        self.cosecha_rutinaria = rutinaria.strftime("%Y-%m-%d")
+        self.tipo_suelo = tipo_suelo
+        try:
+            self.temperatura = float(temperatura) if temperatura not in (None, "") else None
+        except ValueError:
+            self.temperatura = None
+
+    def guardar_en_bd(self):
+        # Si no tiene número, se reserva en la misma transacción que la inserción
+        with datos.transaccion():
+            if self.numero is None:
+                self.numero = numeracion.siguiente_numero()
+            datos.ejecutar("""
+                INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (self.numero, self.tipo_de_cultivo, self.siembra.strftime("%Y-%m-%d"),
+                  self.primeracosecha.strftime("%Y-%m-%d"), self.cosecha_rutinaria, self.tipo_suelo, self.temperatura))
+
+    @staticmethod
+    def eliminar(numero):
+        datos.ejecutar("DELETE FROM hectareas WHERE numero = ?", (numero,))
+
+    @staticmethod
+    def leer(id_hectarea):
+        """Datos editables de una hectárea (con el número al final), o None."""
+        return datos.consultar_uno(f"""
+            SELECT tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo,
+                   {migraciones.TEMPERATURA_ACTUAL.format(h="hectareas")}, numero
+            FROM hectareas WHERE id = ?
+        """, (id_hectarea,))
+
+    @staticmethod
+    def actualizar(numero, tipo, siembra, primera, rutinaria, tipo_suelo, temperatura):
+        datos.ejecutar("""
+            UPDATE hectareas
+            SET tipo_de_cultivo = ?, siembra = ?, primera_cosecha = ?, cosecha_rutinaria = ?, tipo_suelo = ?, temperatura = ?
+            WHERE numero = ?
+        """, (tipo.lower(), siembra, primera, rutinaria, tipo_suelo, temperatura, numero))
+
+    # Operaciones en bloque sobre hectáreas identificadas por id: cada una es una sola
+    # sentencia en una sola transacción (los id viajan como arreglo JSON, sin límite de
+    # parámetros), así limpiar una temporada de miles de hectáreas es un solo commit.
+    @staticmethod
+    def eliminar_varias(ids):
+        """Elimina las hectáreas con esos id. Devuelve cuántas eliminó."""
+        with datos.transaccion():
+            return datos.ejecutar("DELETE FROM hectareas WHERE id IN (SELECT value FROM json_each(?))",
+                                  (_arreglo(ids),)).rowcount
+
+    @staticmethod
+    def cambiar_suelo(ids, tipo_suelo):
+        with datos.transaccion():
+            return datos.ejecutar("UPDATE hectareas SET tipo_suelo = ? WHERE id IN (SELECT value FROM json_each(?))",
+                                  (tipo_suelo, _arreglo(ids))).rowcount
+
+    @staticmethod
+    def cambiar_cultivo(ids, tipo):
+        """
+        Cambia el tipo de cultivo y recalcula las cosechas con las reglas del nuevo cultivo
+        (las hectáreas sin siembra válida conservan sus fechas).
+        """
+        tipo = tipo.lower()
+        with datos.transaccion():
+            siembras = datos.consultar("""
+                SELECT id, siembra FROM hectareas
+                WHERE id IN (SELECT value FROM json_each(?)) AND date(siembra) = siembra
+            """, (_arreglo(ids),))
+            fechas = cosechas.calcular_lote([(tipo, siembra) for _, siembra in siembras])
+            nuevas = {id_: [primera, rutinaria] for (id_, _), (primera, rutinaria) in zip(siembras, fechas)}
+            return datos.ejecutar("""
+                UPDATE hectareas SET tipo_de_cultivo = ?,
+                    primera_cosecha = coalesce(json_extract(nuevas.value, '$[0]'), primera_cosecha),
+                    cosecha_rutinaria = coalesce(json_extract(nuevas.value, '$[1]'), cosecha_rutinaria)
+                FROM json_each(?) AS nuevas WHERE hectareas.id = CAST(nuevas.key AS INTEGER)
+            """, (tipo, json.dumps({str(int(id_)): nuevas.get(int(id_)) for id_ in ids}))).rowcount
+
+    @staticmethod
+    def correr_siembra(ids, dias):
+        """Corre 'dias' días (negativo: hacia atrás) la siembra y las dos cosechas."""
+        modificador = f"{int(dias):+d} days"
+        with datos.transaccion():
+            return datos.ejecutar("""
+                UPDATE hectareas SET
+                    siembra = coalesce(date(siembra, ?1), siembra),
+                    primera_cosecha = coalesce(date(primera_cosecha, ?1), primera_cosecha),
+                    cosecha_rutinaria = coalesce(date(cosecha_rutinaria, ?1), cosecha_rutinaria)
+                WHERE id IN (SELECT value FROM json_each(?2))
+            """, (modificador, _arreglo(ids))).rowcount
+
+    @staticmethod
+    def buscar(numero):
+        """Fila completa (SELECT *) de la hectárea con ese número, o None."""
+        return datos.consultar_uno("SELECT * FROM hectareas WHERE numero = ?", (numero,))
+
+    @staticmethod
+    def pagina(desde=None, limite=200):
+        """
+        Hasta 'limite' hectáreas (columnas de COLUMNAS) con número mayor que 'desde', ordenadas
+        por número; la temperatura es la de sus sensores cuando los tiene.
+        """
+        return datos.consultar(f"""
+            SELECT numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo,
+                   {migraciones.TEMPERATURA_ACTUAL.format(h="hectareas")}
+            FROM hectareas WHERE numero > ? ORDER BY numero LIMIT ?
+        """, (-2 ** 63 if desde is None else desde, limite))
+
+
+def _arreglo(claves):
+    """Claves enteras como arreglo JSON, para usarlas con json_each(?) en una sola sentencia."""
+    return json.dumps([int(clave) for clave in claves])
+
+
+# -----------------------------
+# Gestiones de cultivo
+# -----------------------------
+# Columnas que se pueden cambiar a la vez en varias gestiones, con el catálogo de sus valores
+COLUMNAS_GESTION_EN_BLOQUE = {
+    "id_tipo_hortaliza": "tipo_hortaliza",
+    "id_tipo_suelo": "tipo_suelo",
+    "id_clima": "clima",
+    "id_persona": "usuarios",
+}
+
+
+def leer_gestion(codigo):
+    return datos.consultar_uno("""
+        SELECT id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones
+        FROM gestion_cultivo WHERE codigo = ?
+    """, (codigo,))
+
+
+def guardar_gestion(codigo, id_persona, id_hortaliza, id_suelo, id_clima, video, observaciones):
+    """Registra una gestión (codigo None) o actualiza la indicada. Devuelve las filas escritas."""
+    valores = (id_persona, id_hortaliza, id_suelo, id_clima, video, observaciones)
+    if codigo is None:
+        return datos.ejecutar("""
+            INSERT INTO gestion_cultivo (id_persona, id_tipo_hortaliza, id_tipo_suelo, id_clima, video, observaciones)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, valores).rowcount
+    return datos.ejecutar("""
+        UPDATE gestion_cultivo
+        SET id_persona = ?, id_tipo_hortaliza = ?, id_tipo_suelo = ?, id_clima = ?, video = ?, observaciones = ?
+        WHERE codigo = ?
+    """, (*valores, codigo)).rowcount
+
+
+def eliminar_gestiones(codigos):
+    with datos.transaccion():
+        return datos.ejecutar("DELETE FROM gestion_cultivo WHERE codigo IN (SELECT value FROM json_each(?))",
+                              (_arreglo(codigos),)).rowcount
+
+
+def cambiar_gestiones(codigos, columna, valor):
+    """Pone 'valor' en 'columna' (de COLUMNAS_GESTION_EN_BLOQUE) de todas las gestiones indicadas."""
+    if columna not in COLUMNAS_GESTION_EN_BLOQUE:
+        raise ValueError(f"No se puede cambiar en bloque la columna {columna}")
+    with datos.transaccion():
+        return datos.ejecutar(f"UPDATE gestion_cultivo SET {columna} = ? WHERE codigo IN (SELECT value FROM json_each(?))",
+                              (valor, _arreglo(codigos))).rowcount
+
+
+def recalcular_cosechas(tamano_lote=5000):
+    """
+    Recalcula primera_cosecha y cosecha_rutinaria de todas las hectáreas con las reglas
+    actuales de tipo_cultivo, por lotes de 'tamano_lote' filas (una transacción por lote).
+    Las siembras que no son una fecha 'YYYY-MM-DD' válida se saltean. Devuelve la
+    cantidad de hectáreas actualizadas.
+    """
+    actualizadas, ultimo_id = 0, 0
+    while True:
+        filas = datos.consultar("""
+            SELECT id, tipo_de_cultivo, siembra FROM hectareas
+            WHERE id > ? AND date(siembra) = siembra ORDER BY id LIMIT ?
+        """, (ultimo_id, tamano_lote))
+        if not filas:
+            return actualizadas
+        fechas = cosechas.calcular_lote([(tipo or "", siembra) for _, tipo, siembra in filas])
+        with datos.transaccion():
+            datos.ejecutar_muchos("UPDATE hectareas SET primera_cosecha = ?, cosecha_rutinaria = ? WHERE id = ?",
+                                  ((primera, rutinaria, fila[0]) for fila, (primera, rutinaria) in zip(filas, fechas)))
+        actualizadas += len(filas)
+        ultimo_id = filas[-1][0]
+
+
+# -----------------------------
+# Usuarios
+# -----------------------------
+# Cada escritura invalida la lista de usuarios de catalogos.py; un username repetido
+# lanza sqlite3.IntegrityError.
+def nombres_de_usuario():
+    return datos.consultar("SELECT username FROM usuarios")
+
+
+def credenciales(username):
+    """(password, role, email) del usuario, o None si no existe."""
+    return datos.consultar_uno("SELECT password, role, email FROM usuarios WHERE username = ?", (username,))
+
+
+def leer_usuario(username):
+    return datos.consultar_uno("SELECT username, password, email FROM usuarios WHERE username = ?", (username,))
+
+
+def buscar_usuario_por_email(email):
+    return datos.consultar_uno("SELECT username, password FROM usuarios WHERE email = ?", (email,))
+
+
+def crear_usuario(username, password, email):
+    try:
+        return datos.ejecutar("INSERT INTO usuarios (username, password, role, email) VALUES (?, ?, 'usuario', ?)",
+                              (username, password, email)).rowcount
+    finally:
+        catalogos.invalidar("usuarios")
+
+
+def actualizar_usuario(username, nuevo_username, password, email):
+    try:
+        return datos.ejecutar("""
+            UPDATE usuarios
+            SET username = ?, password = ?, email = ?
+            WHERE username = ?
+        """, (nuevo_username, password, email, username)).rowcount
+    finally:
+        catalogos.invalidar("usuarios")
+
+
+def eliminar_usuario(username):
+    try:
+        return datos.ejecutar("DELETE FROM usuarios WHERE username = ?", (username,)).rowcount
+    finally:
+        catalogos.invalidar("usuarios")
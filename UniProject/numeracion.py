@@ -0,0 +1,24 @@
+import datos
+
+# -----------------------------
+# Numeración de hectáreas
+# -----------------------------
+# Los números se toman de la tabla secuencias dentro de una transacción de escritura
+# (BEGIN IMMEDIATE), así dos operadores que registran a la vez nunca obtienen el mismo
+# número. Si la llamada ocurre dentro de datos.transaccion(), la reserva forma parte
+# de esa misma transacción y se deshace junto con la inserción si esta falla.
+
+
+def reservar_numeros(cantidad=1):
+    """Reserva un bloque de 'cantidad' números consecutivos y lo devuelve como range."""
+    if cantidad < 1:
+        raise ValueError("La cantidad de números a reservar debe ser positiva.")
+    with datos.transaccion():
+        ultimo = datos.consultar(
+            "UPDATE secuencias SET valor = valor + ? WHERE nombre = 'hectareas' RETURNING valor",
+            (cantidad,))[0][0]
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def siguiente_numero():
+    return reservar_numeros(1)[0]
@@ -0,0 +1,268 @@
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import almacen_hectareas
+import aptitud
+import buscador
+import calendario_cosechas
+import cambios
+import catalogos
+import datos
+import fincas
+import generador
+import importador
+import informes
+import migraciones
+import numeracion
+import pronostico
+import sensores
+import trazas
+from nucleo import (
+    Hectarea, recalcular_cosechas, leer_gestion, guardar_gestion, cambiar_gestiones, eliminar_gestiones,
+    nombres_de_usuario, credenciales, leer_usuario, buscar_usuario_por_email, crear_usuario, actualizar_usuario,
+    eliminar_usuario
+)
+
+# -----------------------------
+# Verificación de planes de consulta
+# -----------------------------
+# Corre las operaciones de la aplicación (sin interfaz) sobre una base con datos
+# generados y junta con trazas.capturar() cada sentencia que pasa por datos.py, con la
+# función que la emitió. Cada sentencia distinta se explica con EXPLAIN QUERY PLAN: las
+# que por diseño leen toda una tabla la declaran en RECORRIDOS_PERMITIDOS (por función);
+# cualquier otro SCAN es un fallo. Como las sentencias salen del código que las ejecuta,
+# la lista no hay que mantenerla a mano: una consulta nueva queda verificada si su
+# operación está en ejercitar().
+# Uso: python planes_consulta.py [base]  (termina con código 1 si hay fallos)
+# Sin 'base' se verifica sobre una base en memoria; con 'base', sobre una copia en memoria
+# de ella (con sus estadísticas), así que el archivo no se modifica.
+# Lo corre también tests/test_planes_consulta.py.
+
+# Función emisora -> tablas (o alias) que puede recorrer completas
+RECORRIDOS_PERMITIDOS = {
+    # Catálogos: se leen completos una vez y luego se sirven desde la caché
+    "catalogos.filas": {"tipo_suelo", "tipo_hortaliza", "clima", "tipo_cultivo", "usuarios"},
+    "cambios.leer_todo": {"tipo_suelo", "tipo_hortaliza", "clima", "tipo_cultivo", "usuarios", "hectareas",
+                          "gestion_cultivo"},
+    "nucleo.nombres_de_usuario": {"usuarios"},
+    # Reglas de aptitud: catálogos y rangos completos para recalcular la matriz
+    "aptitud.Reglas.__init__": {"tipo_suelo", "tipo_hortaliza", "clima", "aptitud_temperatura", "aptitud_suelo"},
+    "aptitud.sincronizar": {"aptitud", "aptitud_temperatura", "aptitud_suelo"},
+    "aptitud.mejores_por_hectarea": {"hectareas"},
+    # Informe sin filtros: recorre gestion_cultivo por código (la página corta con LIMIT)
+    "informes.filas": {"gestion_cultivo"},
+    "informes.pagina": {"gestion_cultivo"},
+    "almacen_hectareas.AlmacenHectareas.cargar": {"hectareas"},
+    "fincas._cultivos_de_finca": {"hectareas"},
+    # 'busqueda' es la tabla FTS5, que siempre figura como SCAN ... VIRTUAL TABLE
+    "buscador.buscar": {"busqueda"},
+    # Recálculos completos de los resúmenes (mantenimiento y cargas masivas)
+    "pronostico.reconstruir": {"hectareas", "cosechas", "escalas"},
+    "pronostico.carga_masiva": {"cosechas", "escalas"},
+    "calendario_cosechas.eventos": {"calendario_periodos"},
+    "calendario_cosechas.por_dia": {"calendario_periodos"},
+    "sensores.resumir": {"tocadas"},
+    # Busca el corte por id; se detiene en la primera lectura dentro del plazo
+    "sensores.podar": {"lecturas", "lecturas_resumen"},
+}
+# Recorridos que nunca son un problema: el arreglo JSON de los parámetros, filas constantes
+# y resultados intermedios ya filtrados ("(subquery-N)")
+SIEMPRE_PERMITIDOS = {"json_each", "CONSTANT"}
+# Emisores que no se verifican: el esquema y los datos de prueba se crean antes de capturar
+EXCLUIDOS = ("migraciones.", "generador.")
+
+_EXPLICABLES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\([^)]*\))?\s+(?:AS\s+)?(\w+)", re.IGNORECASE)
+_NO_ALIAS = {"where", "join", "on", "order", "group", "limit", "left", "inner", "cross", "using", "window",
+             "set", "as", "natural", "union", "except", "intersect", "returning"}
+
+
+def ejercitar(carpeta):
+    """
+    Corre sobre la base actual (que ya debe tener datos) las operaciones que usan las
+    pantallas y la línea de comandos. 'carpeta' es un directorio para archivos temporales.
+    """
+    hoy = date.today()
+    for tabla in catalogos.CONSULTAS:
+        catalogos.invalidar(tabla)
+        catalogos.filas(tabla)
+    for tabla in cambios.CLAVES:
+        cambios.leer_todo(tabla)
+    version = cambios.version_actual()
+    aptitud.reconstruir()
+    calendario_cosechas.reconstruir()
+    pronostico.reconstruir()
+
+    # Catálogos: alta, aptitud de la fila nueva, modificación y baja
+    nuevos = {
+        "tipo_suelo": ("Suelo de verificación", "Arcilloso", None),
+        "tipo_hortaliza": ("Hortaliza de verificación", "De hoja", None),
+        "clima": ("Clima de verificación", 18.0, "Templado", None),
+        "tipo_cultivo": ("cultivo de verificación", 3, 1),
+    }
+    claves = {}
+    for tabla, valores in nuevos.items():
+        catalogos.guardar(tabla, None, valores)
+        claves[tabla] = max(catalogos.nombres_por_id(tabla))
+    aptitud.sincronizar()
+    aptitud.definir_rango(claves["tipo_hortaliza"], 10, 20, 30)
+    aptitud.definir_afinidad(claves["tipo_hortaliza"], claves["tipo_suelo"], 0.5)
+    aptitud.ranking(claves["tipo_suelo"], claves["clima"], 10)
+    aptitud.puntaje_de(claves["tipo_hortaliza"], claves["tipo_suelo"], claves["clima"])
+    for tabla, valores in nuevos.items():
+        catalogos.guardar(tabla, claves[tabla], valores)
+        catalogos.eliminar(tabla, claves[tabla])
+    aptitud.sincronizar()
+    list(aptitud.mejores_por_hectarea())
+    list(aptitud.mejores_por_hectarea(por_filas=True))
+
+    # Usuarios
+    crear_usuario("verificacion", "clave", "verificacion@ejemplo.com")
+    nombres_de_usuario()
+    credenciales("verificacion")
+    leer_usuario("verificacion")
+    buscar_usuario_por_email("verificacion@ejemplo.com")
+    actualizar_usuario("verificacion", "verificacion2", "clave2", "verificacion@ejemplo.com")
+    eliminar_usuario("verificacion2")
+
+    # Hectáreas: una por una, en bloque e importadas
+    cultivo = catalogos.nombres("tipo_cultivo")[0]
+    suelo = catalogos.nombres("tipo_suelo")[0]
+    hectarea = Hectarea(None, cultivo, hoy.isoformat(), tipo_suelo=suelo, temperatura=20)
+    hectarea.guardar_en_bd()
+    fila = Hectarea.buscar(hectarea.numero)
+    Hectarea.leer(fila[0])
+    Hectarea.actualizar(hectarea.numero, cultivo, hoy.isoformat(), fila[4], fila[5], suelo, 21.0)
+    Hectarea.pagina()
+    Hectarea.pagina(hectarea.numero - 100, 50)
+    Hectarea.eliminar(hectarea.numero)
+    ids = list(range(1, 51))
+    Hectarea.cambiar_suelo(ids, suelo)
+    Hectarea.cambiar_cultivo(ids, cultivo)
+    Hectarea.correr_siembra(ids, 7)
+    numeracion.reservar_numeros(3)
+    recalcular_cosechas()
+    archivo = Path(carpeta) / "hectareas.csv"
+    archivo.write_text(f"tipo_de_cultivo,siembra,tipo_suelo,temperatura\n{cultivo},{hoy},{suelo},19\n",
+                       encoding="utf-8")
+    importador.importar(str(archivo))
+    Hectarea.eliminar_varias(ids[:5])
+
+    # Gestiones e informe
+    persona = min(catalogos.nombres_por_id("usuarios"))
+    codigos = [min(catalogos.nombres_por_id(tabla)) for tabla in ("tipo_hortaliza", "tipo_suelo", "clima")]
+    guardar_gestion(None, persona, *codigos, "", "observación de verificación")
+    codigo = max(fila[0] for fila in informes.filas())
+    leer_gestion(codigo)
+    guardar_gestion(codigo, persona, *codigos, "", "observación corregida")
+    cambiar_gestiones([codigo], "id_clima", codigos[2])
+    eliminar_gestiones([codigo])
+    informes.pagina()
+    for clave in informes.FILTROS:
+        informes.pagina({clave: 1})
+    nombres = {"usuario": catalogos.nombres("usuarios")[0], "hortaliza": catalogos.nombres("tipo_hortaliza")[0],
+               "suelo": catalogos.nombres("tipo_suelo")[0], "clima": catalogos.nombres("clima")[0]}
+    fincas._pagina_de_finca(nombres, None, 50)
+    fincas._cultivos_de_finca()
+    buscador.buscar("verificación")
+    buscador.buscar("observación", tablas=["gestion_cultivo"])
+
+    # Pronóstico y calendario
+    pronostico.tabla("mes", *pronostico.rango(hoy, escala="mes"))
+    pronostico.resumen("semana", *pronostico.rango(hoy, escala="semana"), cosecha="primera")
+    list(calendario_cosechas.eventos(hoy - timedelta(days=30), hoy + timedelta(days=400)))
+    calendario_cosechas.por_dia(hoy, hoy + timedelta(days=31))
+    calendario_cosechas.hectareas_del_dia(hoy)
+    almacen_hectareas.AlmacenHectareas.cargar()
+
+    # Sensores
+    ahora = int(time.time())
+    numeros = [fila[0] for fila in Hectarea.pagina(limite=3)]
+    sensores.registrar([sensores.interpretar(linea) for linea in sensores.simular(numeros, horas=3, hasta=ahora)])
+    sensores.resumir()
+    sensores.serie(numeros[0])
+    sensores.promedio_movil(numeros[0])
+    sensores.ultima(numeros[0])
+    sensores.podar(ahora=ahora)
+
+    # Registro de cambios (al final, así ya tiene de todo)
+    cambios.tablas_cambiadas(version)
+    for tabla in cambios.CLAVES:
+        cambios.leer_cambios(tabla, version)
+    cambios.podar(conservar=0)
+
+
+def recorridos(sql, parametros=()):
+    """Devuelve las tablas (o alias) que el plan de la sentencia recorre completas (SCAN)."""
+    if parametros is None:
+        # executemany: para el plan alcanza con parámetros nulos
+        parametros = (None,) * sql.count("?")
+    plan = datos.consultar("EXPLAIN QUERY PLAN " + sql, parametros)
+    return {detalle.split()[1] for _, _, _, detalle in plan if detalle.startswith("SCAN ")}
+
+
+def _alias(sql):
+    return {alias: tabla for tabla, alias in _ALIAS.findall(sql) if alias.lower() not in _NO_ALIAS}
+
+
+def sentencias(capturadas):
+    """{(emisor, sql normalizado): parámetros} de las sentencias explicables, sin repetir."""
+    distintas = {}
+    for emisor, sql, parametros in capturadas:
+        normalizado = " ".join(sql.split())
+        if emisor is None or emisor.startswith(EXCLUIDOS):
+            continue
+        if normalizado.split(None, 1)[0].upper() in _EXPLICABLES:
+            distintas.setdefault((emisor, normalizado), parametros)
+    return distintas
+
+
+def verificar(ruta_origen=None):
+    """
+    Devuelve (cantidad de sentencias verificadas, [(emisor, problema)]); la lista vacía
+    significa que todo está bien. Trabaja sobre la base actual de datos.py; si se indica
+    'ruta_origen', antes la reemplaza por una copia de ese archivo.
+    """
+    if ruta_origen is not None:
+        origen = sqlite3.connect(Path(ruta_origen).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            origen.backup(datos.obtener_conexion())
+        finally:
+            origen.close()
+    migraciones.migrar()
+    generador.generar(hectareas=300, gestiones=300, usuarios=5, catalogos_extra=3)
+    with tempfile.TemporaryDirectory() as carpeta, trazas.capturar() as capturadas:
+        ejercitar(carpeta)
+    distintas = sentencias(capturadas)
+    fallos, usados = [], {}
+    for (emisor, sql), parametros in distintas.items():
+        try:
+            tablas = {_alias(sql).get(t, t) for t in recorridos(sql, parametros) if not t.startswith("(")}
+        except sqlite3.Error as e:
+            fallos.append((emisor, f"sin plan ({e}): {sql[:120]}"))
+            continue
+        permitidas = RECORRIDOS_PERMITIDOS.get(emisor, set())
+        usados.setdefault(emisor, set()).update(tablas & permitidas)
+        no_previstos = tablas - permitidas - SIEMPRE_PERMITIDOS
+        if no_previstos:
+            fallos.append((emisor, f"recorre completa(s) {', '.join(sorted(no_previstos))}: {sql[:120]}"))
+    # Un permiso que ya no se usa quedó viejo (o la operación salió de ejercitar())
+    for emisor, permitidas in RECORRIDOS_PERMITIDOS.items():
+        sobrantes = permitidas - usados.get(emisor, set())
+        if sobrantes:
+            fallos.append((emisor, f"tiene permitido recorrer {', '.join(sorted(sobrantes))} y no lo hace"))
+    return len(distintas), fallos
+
+
+if __name__ == "__main__":
+    datos.configurar(datos.MEMORIA)
+    cantidad, fallos = verificar(sys.argv[1] if len(sys.argv) > 1 else None)
+    for emisor, problema in fallos:
+        print(f"{emisor}: {problema}")
+    print(f"{cantidad} sentencias verificadas, {len(fallos)} con problemas.")
+    sys.exit(1 if fallos else 0)
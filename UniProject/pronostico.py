@@ -0,0 +1,165 @@
+import argparse
+import sys
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import cambios
+import datos
+import migraciones
+
+# -----------------------------
+# Pronóstico de cosechas
+# -----------------------------
+# Cuántas hectáreas de cada cultivo llegan a cosecha en cada mes o semana. Se lee de la
+# tabla pronostico_cosechas (migración 5), que los triggers de hectareas mantienen al
+# día, así un año de pronóstico son unos cientos de filas en lugar de toda la tabla.
+# Uso: python pronostico.py [--escala semana] [--desde 2025-01-01] [--periodos 26]
+#      python pronostico.py --verificar   (compara el resumen con un recálculo completo)
+
+ESCALAS = {"mes": "Mes", "semana": "Semana"}
+COSECHAS = {"primera": "Primera cosecha", "rutinaria": "Cosecha rutinaria"}
+PERIODOS = {"mes": 12, "semana": 26}   # cantidad de períodos a mostrar por defecto
+
+
+def periodo(fecha, escala="mes"):
+    """Período de una fecha (date) con el mismo formato que pronostico_cosechas."""
+    if escala == "mes":
+        return f"{fecha.year:04d}-{fecha.month:02d}"
+    return (fecha - timedelta(days=fecha.weekday())).isoformat()
+
+
+def rango(desde=None, periodos=None, escala="mes"):
+    """(primer período, período siguiente al último) para 'periodos' períodos desde la fecha 'desde'."""
+    desde = desde or date.today()
+    periodos = periodos or PERIODOS[escala]
+    if escala == "mes":
+        meses = desde.year * 12 + desde.month - 1 + periodos
+        return periodo(desde, escala), periodo(date(meses // 12, meses % 12 + 1, 1), escala)
+    return periodo(desde, escala), periodo(desde + timedelta(weeks=periodos), escala)
+
+
+def construir_consulta(escala="mes", desde=None, hasta=None, cosecha=None):
+    """Devuelve (sql, parametros) del resumen; todas las condiciones usan la clave primaria."""
+    condiciones, parametros = ["escala = ?"], [escala]
+    if desde is not None:
+        condiciones.append("periodo >= ?")
+        parametros.append(desde)
+    if hasta is not None:
+        condiciones.append("periodo < ?")
+        parametros.append(hasta)
+    if cosecha is not None:
+        condiciones.append("cosecha = ?")
+        parametros.append(cosecha)
+    sql = f"""
+        SELECT periodo, tipo_de_cultivo, SUM(hectareas),
+               SUM(suma_temperatura) / NULLIF(SUM(con_temperatura), 0)
+        FROM pronostico_cosechas WHERE {" AND ".join(condiciones)}
+        GROUP BY periodo, tipo_de_cultivo ORDER BY periodo, tipo_de_cultivo
+    """
+    return sql, parametros
+
+
+def resumen(escala="mes", desde=None, hasta=None, cosecha=None):
+    """
+    Filas (periodo, tipo_de_cultivo, hectareas, temperatura promedio o None) con periodo
+    en [desde, hasta), sumando ambas cosechas salvo que se indique una.
+    """
+    return datos.consultar(*construir_consulta(escala, desde, hasta, cosecha))
+
+
+def tabla(escala="mes", desde=None, hasta=None, cosecha=None):
+    """
+    Pronóstico en forma de grilla para el tablero: (periodos, cultivos, celdas), donde
+    celdas[(periodo, cultivo)] = (hectareas, temperatura promedio).
+    """
+    filas = resumen(escala, desde, hasta, cosecha)
+    periodos = sorted({fila[0] for fila in filas})
+    cultivos = sorted({fila[1] for fila in filas})
+    celdas = {(p, cultivo): (hectareas, temperatura) for p, cultivo, hectareas, temperatura in filas}
+    return periodos, cultivos, celdas
+
+
+# -----------------------------
+# Mantenimiento
+# -----------------------------
+_COLUMNAS = "escala, periodo, tipo_de_cultivo, cosecha, hectareas, suma_temperatura, con_temperatura"
+
+
+def recalculo(hectareas="hectareas"):
+    """Resumen calculado directamente desde 'hectareas' (tabla o subconsulta)."""
+    return f"""
+        SELECT escala, periodo, tipo_de_cultivo, cosecha, COUNT(*) AS hectareas,
+               coalesce(SUM(temperatura), 0) AS suma_temperatura, COUNT(temperatura) AS con_temperatura
+        FROM ({migraciones.cosechas_por_periodo(hectareas)}) WHERE true
+        GROUP BY escala, periodo, tipo_de_cultivo, cosecha
+    """
+
+
+@contextmanager
+def carga_masiva():
+    """
+    Transacción para insertar muchas hectáreas: los triggers de alta quedan en pausa y al
+    final las filas nuevas (id mayor al máximo inicial) se suman al resumen de una vez. En
+    el registro de cambios queda una sola 'recarga' en lugar de un alta por fila.
+    """
+    with datos.transaccion():
+        ultimo_id = datos.consultar_uno("SELECT coalesce(MAX(id), 0) FROM hectareas")[0]
+        datos.ejecutar("INSERT OR IGNORE INTO pronostico_pausa (id) VALUES (1)")
+        yield
+        datos.ejecutar("DELETE FROM pronostico_pausa")
+        datos.ejecutar(f"""
+            INSERT INTO pronostico_cosechas ({_COLUMNAS})
+            {recalculo("(SELECT * FROM hectareas WHERE id > ?)")}
+            ON CONFLICT (escala, periodo, tipo_de_cultivo, cosecha) DO UPDATE SET
+                hectareas = hectareas + excluded.hectareas,
+                suma_temperatura = suma_temperatura + excluded.suma_temperatura,
+                con_temperatura = con_temperatura + excluded.con_temperatura
+        """, (ultimo_id,))
+        if datos.consultar_uno("SELECT 1 FROM hectareas WHERE id > ? LIMIT 1", (ultimo_id,)):
+            cambios.registrar_recarga("hectareas")
+
+
+def reconstruir():
+    """Vuelve a calcular el resumen completo desde hectareas (por si se cargaron datos sin triggers)."""
+    with datos.transaccion():
+        datos.ejecutar("DELETE FROM pronostico_cosechas")
+        datos.ejecutar(f"INSERT INTO pronostico_cosechas ({_COLUMNAS}) {recalculo()}")
+
+
+def diferencias():
+    """Claves cuyo resumen no coincide con un recálculo completo; vacía si los triggers están al día."""
+    columnas = "escala, periodo, tipo_de_cultivo, cosecha, hectareas, round(suma_temperatura, 3), con_temperatura"
+    filas = datos.consultar(f"SELECT {columnas} FROM pronostico_cosechas")
+    recalculadas = datos.consultar(f"SELECT {columnas} FROM ({recalculo()})")
+    return sorted({fila[:4] for fila in set(filas) ^ set(recalculadas)})
+
+
+def formatear(periodos, cultivos, celdas):
+    """Grilla de texto (períodos en filas, cultivos en columnas) para la línea de comandos."""
+    ancho = max([len(c) for c in cultivos] + [9])
+    lineas = [f"{'Período':12}" + "".join(f"{c:>{ancho + 2}}" for c in cultivos) + f"{'Total':>9}"]
+    for p in periodos:
+        cantidades = [celdas.get((p, c), (0, None))[0] for c in cultivos]
+        lineas.append(f"{p:12}" + "".join(f"{n:>{ancho + 2}}" for n in cantidades) + f"{sum(cantidades):>9}")
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hectáreas a cosechar por cultivo y período")
+    parser.add_argument("--escala", choices=ESCALAS, default="mes")
+    parser.add_argument("--desde", type=date.fromisoformat, help="fecha YYYY-MM-DD (por defecto, hoy)")
+    parser.add_argument("--periodos", type=int, help="cantidad de meses o semanas")
+    parser.add_argument("--cosecha", choices=COSECHAS)
+    parser.add_argument("--verificar", action="store_true", help="compara el resumen con un recálculo completo")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcula el resumen completo")
+    args = parser.parse_args()
+    migraciones.migrar()
+    if args.reconstruir:
+        reconstruir()
+    if args.verificar:
+        distintas = diferencias()
+        for clave in distintas[:20]:
+            print(f"Difiere: {' | '.join(clave)}")
+        print(f"{len(distintas)} claves del resumen difieren del recálculo.")
+        sys.exit(1 if distintas else 0)
+    print(formatear(*tabla(args.escala, *rango(args.desde, args.periodos, args.escala), args.cosecha)))
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import buscador
+import calendario_cosechas
+import datos
+import generador
+import informes
+import migraciones
+import trazas
+from nucleo import Hectarea
+
+# -----------------------------
+# Mediciones de rendimiento
+# -----------------------------
+# Mide los caminos de datos que usan las pantallas (listar, buscar por número, informe,
+# consulta de texto, registrar, editar, eliminar) sobre una base generada con generador.py
+# o una existente. Con --gui también mide las pantallas reales en la plataforma
+# 'offscreen' de Qt, sin necesidad de pantalla. Los resultados se escriben en JSON y
+# pueden compararse con una línea base guardada: una medición cuya mediana supere la de
+# la base en más de la tolerancia cuenta como regresión y el proceso termina con código 1.
+#
+# Uso:
+#   python rendimiento.py --hectareas 1000000 --gestiones 100000 --salida base.json
+#   python rendimiento.py --hectareas 1000000 --gestiones 100000 --base base.json
+# Registrar/editar/eliminar operan sobre hectáreas creadas por la propia medición, que al
+# final se eliminan; aun así conviene usar --db solo con copias de bases reales.
+
+REPETICIONES = 20
+TOLERANCIA = 0.5        # 50 % más lenta que la base es regresión
+PISO_MS = 1.0           # diferencias menores a esto se consideran ruido
+
+
+def _resumen(tiempos):
+    ordenados = sorted(tiempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {
+        "repeticiones": len(tiempos),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "p95_ms": round(p95, 3),
+        "min_ms": round(ordenados[0], 3),
+        "max_ms": round(ordenados[-1], 3),
+    }
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta funcion() 'repeticiones' veces y devuelve el resumen de los tiempos en ms."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return _resumen(tiempos)
+
+
+def casos_datos(repeticiones, semilla=generador.SEMILLA):
+    """
+    Lista de (nombre, función, repeticiones) con los caminos de datos de las pantallas.
+    Un cuarto elemento opcional es una preparación que se ejecuta una vez, sin medir.
+    """
+    azar = random.Random(semilla)
+    ultimo_numero = datos.consultar_uno("SELECT valor FROM secuencias WHERE nombre = 'hectareas'")[0] or 1
+    mitad = ultimo_numero // 2
+    registradas = []
+
+    def buscar_numero():
+        Hectarea.buscar(azar.randint(1, ultimo_numero))
+
+    def registrar():
+        hectarea = Hectarea(None, "tomate", "2024-03-15", tipo_suelo="Arcilloso", temperatura=22)
+        hectarea.guardar_en_bd()
+        registradas.append(hectarea.numero)
+
+    def editar():
+        if not registradas:  # solo si se filtró 'registrar' con --solo
+            registrar()
+        numero = registradas[azar.randrange(len(registradas))]
+        Hectarea.actualizar(numero, "trigo", "2024-04-01", "2024-07-30", "2024-08-29", "Limoso", 18.5)
+
+    def eliminar():
+        if not registradas:
+            registrar()
+        Hectarea.eliminar(registradas.pop())
+
+    def exportar_informe():
+        with open(os.devnull, "w", encoding="utf-8", newline="") as salida:
+            informes.escribir_csv(salida, informes.filas())
+
+    return [
+        ("listar.primera_pagina", lambda: Hectarea.pagina(None, 200), repeticiones),
+        ("listar.pagina_intermedia", lambda: Hectarea.pagina(mitad, 200), repeticiones),
+        ("listar.gestionar_completo", lambda: datos.consultar(
+            "SELECT numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, tipo_suelo, temperatura "
+            "FROM hectareas"), max(1, repeticiones // 10)),
+        ("buscar.numero", buscar_numero, repeticiones),
+        ("informe.primera_pagina", lambda: informes.pagina({}, None), repeticiones),
+        ("informe.filtrado", lambda: informes.pagina({"hortaliza": 1, "clima": 1}, None), repeticiones),
+        ("informe.exportar_csv", exportar_informe, max(1, repeticiones // 10)),
+        ("consulta.termino_raro", lambda: buscador.buscar(generador.TERMINO_RARO), repeticiones),
+        ("consulta.termino_comun", lambda: buscador.buscar(generador.TERMINO_COMUN), repeticiones),
+        # La preparación construye el índice del calendario si todavía no existe
+        ("calendario.mes", lambda: calendario_cosechas.por_dia(date(2025, 3, 1), date(2025, 3, 31)), repeticiones,
+         calendario_cosechas.sincronizar),
+        ("calendario.dia", lambda: calendario_cosechas.hectareas_del_dia(date(2025, 3, 10)), repeticiones,
+         calendario_cosechas.sincronizar),
+        ("registrar", registrar, repeticiones),
+        ("editar", editar, repeticiones),
+        ("eliminar", eliminar, repeticiones),
+    ]
+
+
+def casos_pantallas(repeticiones):
+    """
+    Mide las pantallas reales (plataforma offscreen): desde que se pide la carga hasta que
+    llegan los datos. Cada pantalla se abre una vez antes de medir (preparación, sin medir).
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    import ContabilidadAgricola
+
+    app = QApplication.instance() or QApplication([])
+    ventana = ContabilidadAgricola.MainWindow()
+    ventana.user_role, ventana.current_user = "admin", "admin"
+    ventana.show()
+
+    def esperar(condicion=None):
+        while not (condicion() if condicion else ventana.consultas.inactivo()):
+            app.processEvents()
+            time.sleep(0.0005)
+
+    def caso(nombre, pantalla, cargar, veces=repeticiones, condicion=None):
+        def preparar():
+            ventana.show_screen(pantalla)
+            esperar(condicion)
+
+        def medir_carga():
+            cargar(ventana.screens[pantalla])
+            esperar(condicion)
+        return (nombre, medir_carga, veces, preparar)
+
+    def lista_al_dia(pantalla):
+        # La lista termina de llenarse después de la lectura, de a partes en el ciclo de eventos
+        return lambda: ventana.consultas.inactivo() and not ventana.screens[pantalla].sincronizada.ocupada()
+
+    def buscar_texto(pantalla):
+        pantalla.entry_consulta.setText(generador.TERMINO_RARO)
+        pantalla.buscar_tipo()
+
+    def editar_y_actualizar(pantalla):
+        # Un cambio en una fila y la actualización por diferencias de la lista
+        datos.ejecutar("UPDATE hectareas SET temperatura = temperatura WHERE id = (SELECT MIN(id) FROM hectareas)")
+        pantalla.refresh_hectareas()
+
+    def primera_pagina_informe():
+        # El informe sigue pidiendo páginas; para la medición alcanza con la primera
+        pantalla = ventana.screens["informe"]
+        return pantalla.ultimo_codigo is not None or pantalla.resumen_label.text() != ""
+
+    casos = [
+        caso("pantalla.login", "login", lambda p: p.refresh_users()),
+        caso("pantalla.hectareas", "main", lambda p: p.show_hectareas()),
+        caso("pantalla.gestionar_hectareas", "gestionar_hectareas", lambda p: p.sincronizada.recargar(),
+             max(1, repeticiones // 10), lista_al_dia("gestionar_hectareas")),
+        caso("pantalla.gestionar_hectareas.diferencias", "gestionar_hectareas", editar_y_actualizar,
+             condicion=lista_al_dia("gestionar_hectareas")),
+        caso("pantalla.gestion_cultivo", "gestion_cultivo", lambda p: p.sincronizada.recargar(),
+             max(1, repeticiones // 10), lista_al_dia("gestion_cultivo")),
+        caso("pantalla.informe_primera_pagina", "informe", lambda p: p.cargar_informe(),
+             condicion=primera_pagina_informe),
+        caso("pantalla.consulta", "consulta", buscar_texto),
+        caso("pantalla.registrar", "registrar", lambda p: p.cargar_opciones()),
+        caso("pantalla.calendario", "calendario", lambda p: p.cargar_mes()),
+    ]
+    return casos, lambda: (ventana.show_screen("login"), ventana.consultas.esperar())
+
+
+def ejecutar(repeticiones=REPETICIONES, gui=False, solo=None):
+    """Corre las mediciones y devuelve el diccionario de resultados (el que se guarda en JSON)."""
+    casos, terminar = casos_datos(repeticiones), None
+    if gui:
+        casos_gui, terminar = casos_pantallas(repeticiones)
+        casos += casos_gui
+    mediciones = {}
+    for nombre, funcion, veces, *preparar in casos:
+        if solo and not any(patron in nombre for patron in solo):
+            continue
+        for paso in preparar:
+            paso()
+        mediciones[nombre] = medir(funcion, veces)
+        print(f"{nombre:34} mediana {mediciones[nombre]['mediana_ms']:9.3f} ms   p95 {mediciones[nombre]['p95_ms']:9.3f} ms",
+              file=sys.stderr)
+    if terminar:
+        terminar()
+    escala = {tabla: datos.consultar_uno(f"SELECT COUNT(*) FROM {tabla}")[0]
+              for tabla in ("hectareas", "gestion_cultivo", "usuarios")}
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "sistema": platform.platform()},
+        "escala": escala,
+        "mediciones": mediciones,
+    }
+
+
+def comparar(resultados, base, tolerancia=TOLERANCIA, piso_ms=PISO_MS):
+    """Devuelve [(nombre, mediana base, mediana actual)] de las mediciones que empeoraron más de lo tolerado."""
+    regresiones = []
+    for nombre, actual in resultados["mediciones"].items():
+        anterior = base.get("mediciones", {}).get(nombre)
+        if anterior is None:
+            continue
+        if actual["mediana_ms"] > anterior["mediana_ms"] * (1 + tolerancia) + piso_ms:
+            regresiones.append((nombre, anterior["mediana_ms"], actual["mediana_ms"]))
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide los caminos de datos de la aplicación")
+    parser.add_argument("--db", help="base a medir (o :memory:); si no se indica se genera una temporal con generador.py")
+    parser.add_argument("--hectareas", type=int, default=10000, help="escala de la base generada")
+    parser.add_argument("--gestiones", type=int, default=10000, help="escala de la base generada")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--gui", action="store_true", help="medir también las pantallas (Qt offscreen)")
+    parser.add_argument("--solo", nargs="+", help="medir solo los casos cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, la salida estándar)")
+    parser.add_argument("--base", help="JSON de una corrida anterior con el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="fracción de empeoramiento permitida")
+    parser.add_argument("--metricas", metavar="ARCHIVO", help="medir con trazas.py activo (para ver su costo)")
+    args = parser.parse_args()
+
+    if args.metricas:
+        trazas.activar(args.metricas)
+    if args.db:
+        datos.configurar(args.db)
+        migraciones.migrar()
+    else:
+        datos.configurar(os.path.join(tempfile.mkdtemp(prefix="rendimiento_"), "cultivos.db"))
+        migraciones.migrar()
+        print(generador.generar(args.hectareas, args.gestiones, usuarios=20, catalogos_extra=10), file=sys.stderr)
+    resultados = ejecutar(args.repeticiones, args.gui, args.solo)
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+    regresiones = []
+    if args.base:
+        with open(args.base, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        if base.get("escala") != resultados["escala"]:
+            print(f"Aviso: la base se midió con otra escala ({base.get('escala')})", file=sys.stderr)
+        regresiones = comparar(resultados, base, args.tolerancia)
+        for nombre, anterior, actual in regresiones:
+            print(f"REGRESIÓN {nombre}: {anterior:.3f} ms -> {actual:.3f} ms", file=sys.stderr)
+        print(f"{len(resultados['mediciones'])} mediciones comparadas, {len(regresiones)} regresiones", file=sys.stderr)
+    datos.cerrar_conexion()
+    sys.exit(1 if regresiones else 0)
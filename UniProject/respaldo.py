@@ -0,0 +1,291 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import datos
+import migraciones
+
+# -----------------------------
+# Respaldo en línea de la base
+# -----------------------------
+# Copia cultivos.db con la API de respaldo de SQLite mientras la aplicación sigue
+# abierta. La copia avanza de a PAGINAS_POR_PASO páginas con una pausa entre pasos, así
+# no acapara el disco, y se hace sobre una transacción de lectura abierta durante todo el
+# respaldo: en modo WAL las escrituras de la interfaz, la ingesta de sensores o agrario
+# siguen sin esperar y la copia refleja la base tal como estaba al empezar (sin eso, cada
+# escritura ajena obligaría a SQLite a reiniciar la copia). La copia se escribe en un
+# archivo temporal, se verifica con PRAGMA integrity_check y solo entonces toma su nombre
+# definitivo, de modo que en la carpeta de respaldos no queda nada a medio copiar. Después
+# se borran los respaldos más viejos y se conservan los últimos CONSERVAR.
+#
+# Uso:
+#   python respaldo.py                             (respalda y rota)
+#   python respaldo.py --listar
+#   python respaldo.py --verificar respaldos/cultivos-20250310-140500.db
+#   python respaldo.py --restaurar respaldos/cultivos-20250310-140500.db
+#   python respaldo.py --medir --segundos 5        (latencia de escritura con y sin respaldo)
+
+CARPETA = "respaldos"           # junto a la base, salvo que se indique otra
+CONSERVAR = 7                   # respaldos que quedan al rotar
+PAGINAS_POR_PASO = 256          # páginas copiadas por paso (1 MB con páginas de 4 KB)
+PAUSA = 0.002                   # segundos entre pasos
+HORAS_ENTRE_RESPALDOS = 24      # antigüedad a partir de la cual respaldar_si_vencido() respalda
+FORMATO_FECHA = "%Y%m%d-%H%M%S"
+
+
+class RespaldoInvalido(ValueError):
+    pass
+
+
+# -----------------------------
+# Nombres y carpetas
+# -----------------------------
+
+def _base():
+    archivo = datos.archivo_db()
+    return os.path.splitext(os.path.basename(archivo))[0] if archivo else "memoria"
+
+
+def carpeta_respaldos(carpeta=None):
+    if carpeta is None:
+        carpeta = os.path.join(datos.carpeta_datos(), CARPETA)
+    return carpeta
+
+
+def _nuevo_nombre(carpeta):
+    nombre = f"{_base()}-{datetime.now().strftime(FORMATO_FECHA)}"
+    ruta, sufijo = os.path.join(carpeta, nombre + ".db"), 1
+    while os.path.exists(ruta):
+        ruta = os.path.join(carpeta, f"{nombre}-{sufijo}.db")
+        sufijo += 1
+    return ruta
+
+
+def listar(carpeta=None):
+    """[(ruta, bytes, fecha de modificación)] de los respaldos de la base, del más viejo al más nuevo."""
+    carpeta = carpeta_respaldos(carpeta)
+    if not os.path.isdir(carpeta):
+        return []
+    prefijo = _base() + "-"
+    respaldos = []
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith(prefijo) and nombre.endswith(".db"):
+            ruta = os.path.join(carpeta, nombre)
+            estado = os.stat(ruta)
+            respaldos.append((ruta, estado.st_size, datetime.fromtimestamp(estado.st_mtime)))
+    respaldos.sort(key=lambda respaldo: (respaldo[2], respaldo[0]))
+    return respaldos
+
+
+def rotar(conservar=CONSERVAR, carpeta=None):
+    """Borra los respaldos más viejos y deja los últimos 'conservar'. Devuelve las rutas borradas."""
+    respaldos = listar(carpeta)
+    borrados = [ruta for ruta, _, _ in respaldos[:max(0, len(respaldos) - conservar)]]
+    for ruta in borrados:
+        os.remove(ruta)
+    return borrados
+
+
+# -----------------------------
+# Copia y verificación
+# -----------------------------
+
+def _copiar(origen, destino, paginas, pausa, progreso=None, diario="DELETE"):
+    """
+    Copia la base 'origen' en 'destino' (rutas o URIs) por pasos de 'paginas' páginas. La
+    transacción de lectura sobre el origen se abre antes del primer paso y se cierra al
+    final, para que la copia sea una foto coherente aunque otros escriban en el medio.
+    """
+    fuente = datos.conectar(origen)
+    copia = datos.conectar(destino)
+
+    def al_avanzar(estado, restantes, total):
+        if progreso is not None:
+            progreso(total - restantes, total)
+        if restantes and pausa:
+            time.sleep(pausa)
+
+    try:
+        fuente.execute("BEGIN")
+        fuente.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        fuente.backup(copia, pages=paginas, progress=al_avanzar)
+        fuente.execute("COMMIT")
+        # Con DELETE el respaldo queda en un solo archivo, sin -wal ni -shm
+        copia.execute(f"PRAGMA journal_mode={diario}")
+    finally:
+        copia.close()
+        fuente.close()
+
+
+def verificar(ruta):
+    """Abre el respaldo solo para lectura y corre PRAGMA integrity_check; lanza RespaldoInvalido si falla."""
+    if not os.path.isfile(ruta):
+        raise RespaldoInvalido(f"No existe el respaldo {ruta}")
+    try:
+        conn = datos.conectar(ruta, solo_lectura=True)
+        try:
+            problemas = [fila[0] for fila in conn.execute("PRAGMA integrity_check")]
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise RespaldoInvalido(f"{ruta}: {e}") from e
+    if problemas != ["ok"]:
+        raise RespaldoInvalido(f"{ruta}: " + "; ".join(problemas[:5]))
+    return version
+
+
+def respaldar(carpeta=None, conservar=CONSERVAR, paginas=PAGINAS_POR_PASO, pausa=PAUSA, progreso=None):
+    """
+    Respalda la base en la carpeta de respaldos, verifica la copia y rota los viejos.
+    Devuelve la ruta del respaldo. Se puede llamar desde cualquier hilo: usa conexiones
+    propias y no las de datos.py.
+    """
+    carpeta = carpeta_respaldos(carpeta)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = _nuevo_nombre(carpeta)
+    temporal = ruta + ".parcial"
+    try:
+        _copiar(datos.RUTA_DB, temporal, paginas, pausa, progreso)
+        verificar(temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    if conservar:
+        rotar(conservar, carpeta)
+    return ruta
+
+
+def ultimo(carpeta=None):
+    respaldos = listar(carpeta)
+    return respaldos[-1] if respaldos else None
+
+
+def respaldar_si_vencido(horas=HORAS_ENTRE_RESPALDOS, carpeta=None, conservar=CONSERVAR):
+    """Respalda solo si el último respaldo tiene más de 'horas'. Devuelve la ruta nueva o None."""
+    anterior = ultimo(carpeta)
+    if anterior is not None and (datetime.now() - anterior[2]).total_seconds() < horas * 3600:
+        return None
+    return respaldar(carpeta, conservar)
+
+
+def restaurar(origen, carpeta=None):
+    """
+    Reemplaza el contenido de la base por el del respaldo 'origen'. Antes verifica el
+    respaldo y guarda un respaldo de la base actual (devuelve su ruta), para poder volver
+    atrás. La copia se hace con la misma API, así las otras conexiones abiertas ven la
+    base restaurada en su próxima consulta; si el respaldo es de una versión anterior
+    del esquema, se aplican las migraciones pendientes.
+    """
+    verificar(origen)
+    previo = respaldar(carpeta, conservar=0)
+    datos.cerrar_conexion()
+    _copiar(origen, datos.RUTA_DB, -1, 0, diario="WAL")
+    migraciones.migrar()
+    return previo
+
+
+# -----------------------------
+# Medición: latencia de escritura durante un respaldo
+# -----------------------------
+
+def _resumen(tiempos):
+    ordenados = sorted(tiempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {
+        "escrituras": len(tiempos),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "p95_ms": round(p95, 3),
+        "max_ms": round(ordenados[-1], 3),
+    }
+
+
+def _escribir_hasta(detener, tiempos):
+    """Inserta una fila por transacción en la tabla de medición y anota cuánto tardó cada una."""
+    try:
+        while not detener.is_set():
+            inicio = time.perf_counter()
+            datos.ejecutar("INSERT INTO _medicion_respaldo (valor) VALUES (?)", (inicio,))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        datos.cerrar_conexion()
+
+
+def medir(segundos=3.0, paginas=PAGINAS_POR_PASO, pausa=PAUSA):
+    """
+    Mide la latencia de escrituras sueltas durante 'segundos' sin respaldo y otros tantos
+    con respaldos sucesivos en curso (en una carpeta temporal). Las escrituras van a una
+    tabla propia que se borra al terminar.
+    """
+    datos.ejecutar("CREATE TABLE IF NOT EXISTS _medicion_respaldo (id INTEGER PRIMARY KEY, valor REAL)")
+    resultados = {}
+    try:
+        for fase in ("sin_respaldo", "con_respaldo"):
+            detener, tiempos = threading.Event(), []
+            escritor = threading.Thread(target=_escribir_hasta, args=(detener, tiempos))
+            escritor.start()
+            fin, respaldos, duraciones = time.perf_counter() + segundos, 0, []
+            try:
+                if fase == "con_respaldo":
+                    with tempfile.TemporaryDirectory() as carpeta:
+                        while not respaldos or time.perf_counter() < fin:
+                            inicio = time.perf_counter()
+                            respaldar(carpeta, conservar=1, paginas=paginas, pausa=pausa)
+                            duraciones.append(time.perf_counter() - inicio)
+                            respaldos += 1
+                else:
+                    time.sleep(segundos)
+            finally:
+                detener.set()
+                escritor.join()
+            resultados[fase] = _resumen(tiempos)
+            if duraciones:
+                resultados[fase]["respaldos"] = respaldos
+                resultados[fase]["respaldo_s"] = round(statistics.median(duraciones), 3)
+    finally:
+        datos.ejecutar("DROP TABLE IF EXISTS _medicion_respaldo")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Respaldo en línea de la base de cultivos")
+    parser.add_argument("--db", default=datos.RUTA_DB)
+    parser.add_argument("--carpeta", help=f"carpeta de respaldos (por defecto '{CARPETA}' junto a la base)")
+    parser.add_argument("--conservar", type=int, default=CONSERVAR, help="respaldos que quedan al rotar")
+    parser.add_argument("--paginas", type=int, default=PAGINAS_POR_PASO, help="páginas copiadas por paso")
+    parser.add_argument("--pausa", type=float, default=PAUSA, help="segundos de pausa entre pasos")
+    parser.add_argument("--listar", action="store_true")
+    parser.add_argument("--verificar", metavar="RESPALDO")
+    parser.add_argument("--restaurar", metavar="RESPALDO")
+    parser.add_argument("--medir", action="store_true", help="latencia de escritura con y sin respaldo en curso")
+    parser.add_argument("--segundos", type=float, default=3.0, help="duración de cada fase de --medir")
+    args = parser.parse_args()
+    datos.configurar(args.db)
+    try:
+        if args.listar:
+            for ruta, tamano, fecha in listar(args.carpeta):
+                print(f"{fecha:%Y-%m-%d %H:%M:%S}  {tamano / 1e6:9.1f} MB  {ruta}")
+        elif args.verificar:
+            print(f"{args.verificar}: íntegro (esquema versión {verificar(args.verificar)}).")
+        elif args.restaurar:
+            previo = restaurar(args.restaurar, args.carpeta)
+            print(f"Base restaurada desde {args.restaurar}; la anterior quedó en {previo}.")
+        elif args.medir:
+            migraciones.migrar()
+            for fase, resumen in medir(args.segundos, args.paginas, args.pausa).items():
+                print(f"{fase:13} " + "  ".join(f"{clave}={valor}" for clave, valor in resumen.items()))
+        else:
+            migraciones.migrar()
+            inicio = time.perf_counter()
+            ruta = respaldar(args.carpeta, args.conservar, args.paginas, args.pausa)
+            print(f"Respaldo verificado en {ruta} ({time.perf_counter() - inicio:.2f} s).")
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,372 @@
+import argparse
+import math
+import random
+import selectors
+import socket
+import sys
+import time
+from datetime import datetime, timezone
+
+import datos
+import migraciones
+
+# -----------------------------
+# Lecturas de sensores de temperatura
+# -----------------------------
+# Los sensores de campo informan la temperatura de cada hectárea cada pocos minutos. Las
+# lecturas (número de hectárea, instante en segundos Unix, °C) se agregan por lotes a la
+# tabla lecturas, una transacción por lote, y resumir() suma las nuevas a los resúmenes
+# por hora y por día (mínimo, máximo, suma y cantidad). La temperatura de hectareas pasa
+# a ser el promedio de la última hora con lecturas: las pantallas, el informe y el
+# pronóstico la siguen leyendo de esa columna y el registro de cambios avisa a las listas
+# abiertas. Las hectáreas sin sensor conservan la temperatura cargada a mano.
+# Las horas y los días se cuentan en UTC.
+#
+# Formato de cada lectura, una por línea: numero,instante,temperatura
+# (instante en segundos Unix o como fecha ISO, por ejemplo 2025-03-10T14:05:00).
+#
+# Uso:
+#   python sensores.py --simular lecturas.csv --hectareas 100 --horas 48
+#   python sensores.py --archivo lecturas.csv            (ingesta desde un archivo)
+#   python sensores.py --escuchar 127.0.0.1:9100         (ingesta por TCP, varios sensores a la vez)
+#   python sensores.py --simular - --enviar 127.0.0.1:9100 --horas 1
+#   python sensores.py --hectarea 12 --horas 24          (promedio móvil de las últimas 24 h)
+
+TAMANO_LOTE = 5000
+INTERVALO_VACIADO = 1.0      # segundos que una lectura recibida por socket puede esperar en memoria
+INTERVALO_RESUMEN = 10.0     # segundos mínimos entre resúmenes durante una ingesta
+BLOQUE_RESUMEN = 200000      # lecturas por transacción al resumir
+MAX_RECHAZOS_EN_MEMORIA = 1000
+ESCALAS = {"hora": 3600, "dia": 86400}
+CONSERVAR_DIAS = {"lecturas": 7, "hora": 90}    # los resúmenes diarios no se podan
+VENTANA_HORAS = 24
+SEMILLA = 42
+
+_INSERTAR = "INSERT INTO lecturas (hectarea, instante, temperatura) VALUES (?, ?, ?)"
+_RESUMIR = """
+    INSERT INTO lecturas_resumen (hectarea, escala, inicio, minimo, maximo, suma, cantidad)
+    SELECT hectarea, :escala, instante - instante % :segundos,
+           MIN(temperatura), MAX(temperatura), SUM(temperatura), COUNT(*)
+    FROM lecturas WHERE id > :desde AND id <= :hasta
+    GROUP BY hectarea, instante - instante % :segundos
+    ON CONFLICT (hectarea, escala, inicio) DO UPDATE SET
+        minimo = min(minimo, excluded.minimo),
+        maximo = max(maximo, excluded.maximo),
+        suma = suma + excluded.suma,
+        cantidad = cantidad + excluded.cantidad
+"""
+# Temperatura de las hectáreas que recibieron lecturas: promedio de su última hora
+_ACTUALIZAR_TEMPERATURA = """
+    UPDATE hectareas SET temperatura = ultima.promedio
+    FROM (SELECT tocadas.hectarea,
+                 (SELECT round(r.suma / r.cantidad, 1) FROM lecturas_resumen r
+                  WHERE r.hectarea = tocadas.hectarea AND r.escala = 'hora'
+                  ORDER BY r.inicio DESC LIMIT 1) AS promedio
+          FROM (SELECT DISTINCT hectarea FROM lecturas WHERE id > ? AND id <= ?) AS tocadas) AS ultima
+    WHERE hectareas.numero = ultima.hectarea AND hectareas.temperatura IS NOT ultima.promedio
+"""
+
+
+def interpretar(linea):
+    """(hectarea, instante, temperatura) de una línea de lectura, o ValueError con el motivo."""
+    partes = [parte.strip() for parte in linea.strip().split(",")]
+    if len(partes) != 3:
+        raise ValueError(f"Se esperaban 3 campos (numero,instante,temperatura): '{linea.strip()}'")
+    numero, instante, temperatura = partes
+    if not numero.isdigit():
+        raise ValueError(f"Número de hectárea inválido: '{numero}'")
+    if instante.isdigit():
+        instante = int(instante)
+    else:
+        try:
+            fecha = datetime.fromisoformat(instante)
+        except ValueError:
+            raise ValueError(f"Instante inválido: '{instante}'") from None
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        instante = int(fecha.timestamp())
+    try:
+        temperatura = float(temperatura)
+    except ValueError:
+        raise ValueError(f"Temperatura inválida: '{temperatura}'") from None
+    if not math.isfinite(temperatura):
+        raise ValueError(f"Temperatura inválida: '{temperatura}'")
+    return int(numero), instante, temperatura
+
+
+# -----------------------------
+# Escritura y resúmenes
+# -----------------------------
+def registrar(lecturas):
+    """Agrega un lote de lecturas (hectarea, instante, temperatura) en una sola transacción."""
+    with datos.transaccion():
+        datos.ejecutar_muchos(_INSERTAR, lecturas)
+
+
+def _resumidas():
+    return datos.consultar_uno("SELECT valor FROM secuencias WHERE nombre = 'lecturas_resumidas'")[0]
+
+
+def resumir(bloque=BLOQUE_RESUMEN):
+    """
+    Suma a los resúmenes las lecturas que todavía no se contaron y actualiza la
+    temperatura de esas hectáreas. Devuelve cuántas lecturas resumió.
+    """
+    total = 0
+    while True:
+        with datos.transaccion():
+            desde = _resumidas()
+            cantidad, hasta = datos.consultar_uno("""
+                SELECT COUNT(*), MAX(id) FROM (SELECT id FROM lecturas WHERE id > ? ORDER BY id LIMIT ?)
+            """, (desde, bloque))
+            if not cantidad:
+                return total
+            for escala, segundos in ESCALAS.items():
+                datos.ejecutar(_RESUMIR, {"escala": escala, "segundos": segundos, "desde": desde, "hasta": hasta})
+            datos.ejecutar(_ACTUALIZAR_TEMPERATURA, (desde, hasta))
+            datos.ejecutar("UPDATE secuencias SET valor = ? WHERE nombre = 'lecturas_resumidas'", (hasta,))
+        total += cantidad
+
+
+def podar(conservar=CONSERVAR_DIAS, ahora=None):
+    """
+    Borra las lecturas ya resumidas que llegaron antes del plazo de conservar['lecturas']
+    días y los resúmenes por hora más viejos que conservar['hora'] días. Las lecturas se
+    borran por orden de llegada (rango de id): recorrer la tabla cuesta lo que se borra.
+    Devuelve (lecturas borradas, resúmenes por hora borrados).
+    """
+    ahora = int(time.time()) if ahora is None else ahora
+    with datos.transaccion():
+        corte = datos.consultar_uno("SELECT id FROM lecturas WHERE instante >= ? ORDER BY id LIMIT 1",
+                                    (ahora - conservar["lecturas"] * 86400,))
+        limite = min(corte[0] - 1 if corte else _resumidas(), _resumidas())
+        lecturas = datos.ejecutar("DELETE FROM lecturas WHERE id <= ?", (limite,)).rowcount
+        horas = datos.ejecutar("DELETE FROM lecturas_resumen WHERE escala = 'hora' AND inicio < ?",
+                               (ahora - conservar["hora"] * 86400,)).rowcount
+    return lecturas, horas
+
+
+# -----------------------------
+# Consultas
+# -----------------------------
+def serie(hectarea, escala="hora", desde=0, hasta=None):
+    """Filas (inicio, minimo, maximo, promedio) de los resúmenes de una hectárea en [desde, hasta]."""
+    return datos.consultar("""
+        SELECT inicio, minimo, maximo, suma / cantidad FROM lecturas_resumen
+        WHERE hectarea = ? AND escala = ? AND inicio BETWEEN ? AND ? ORDER BY inicio
+    """, (hectarea, escala, desde, int(time.time()) if hasta is None else hasta))
+
+
+def promedio_movil(hectarea, horas=VENTANA_HORAS, desde=None, hasta=None):
+    """
+    Filas (inicio, promedio de la hora, promedio móvil) desde los resúmenes por hora. El
+    promedio móvil abarca la hora y las 'horas' - 1 anteriores, ponderadas por cantidad de
+    lecturas. Por defecto cubre las últimas 'horas' horas.
+    """
+    hasta = int(time.time()) if hasta is None else hasta
+    desde = hasta - horas * 3600 if desde is None else desde
+    ancho = (horas - 1) * ESCALAS["hora"]
+    return datos.consultar(f"""
+        SELECT inicio, promedio, movil FROM (
+            SELECT inicio, suma / cantidad AS promedio,
+                   SUM(suma) OVER ventana / SUM(cantidad) OVER ventana AS movil
+            FROM lecturas_resumen
+            WHERE hectarea = :hectarea AND escala = 'hora' AND inicio BETWEEN :antes AND :hasta
+            WINDOW ventana AS (ORDER BY inicio RANGE BETWEEN {ancho} PRECEDING AND CURRENT ROW)
+        ) WHERE inicio >= :desde ORDER BY inicio
+    """, {"hectarea": hectarea, "antes": desde - ancho, "desde": desde, "hasta": hasta})
+
+
+def ultima(hectarea):
+    """(inicio, minimo, maximo, promedio) de la última hora con lecturas de la hectárea, o None."""
+    return datos.consultar_uno("""
+        SELECT inicio, minimo, maximo, suma / cantidad FROM lecturas_resumen
+        WHERE hectarea = ? AND escala = 'hora' ORDER BY inicio DESC LIMIT 1
+    """, (hectarea,))
+
+
+# -----------------------------
+# Fuentes de lecturas (archivo, socket y simulación)
+# -----------------------------
+class Ingesta:
+    """
+    Junta lecturas en memoria y las guarda de a 'tamano_lote'. Los resúmenes (y con ellos
+    la temperatura de hectareas, que dispara los triggers del pronóstico y del registro de
+    cambios) se ponen al día a lo sumo cada 'intervalo_resumen' segundos y al terminar.
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, intervalo_resumen=INTERVALO_RESUMEN):
+        self.tamano_lote = tamano_lote
+        self.intervalo_resumen = intervalo_resumen
+        self.resumido = time.monotonic()
+        self.pendientes = []
+        self.guardadas = 0
+        self.rechazadas = 0
+        self.rechazos = []      # primeros (linea, motivo) como muestra
+
+    def agregar(self, linea):
+        if not linea.strip():
+            return
+        try:
+            self.pendientes.append(interpretar(linea))
+        except ValueError as error:
+            self.rechazadas += 1
+            if len(self.rechazos) < MAX_RECHAZOS_EN_MEMORIA:
+                self.rechazos.append((linea.strip(), str(error)))
+            return
+        if len(self.pendientes) >= self.tamano_lote:
+            self.vaciar()
+
+    def vaciar(self, terminar=False):
+        if self.pendientes:
+            registrar(self.pendientes)
+            self.guardadas += len(self.pendientes)
+            self.pendientes = []
+        if terminar or time.monotonic() - self.resumido >= self.intervalo_resumen:
+            resumir()
+            self.resumido = time.monotonic()
+
+    def __str__(self):
+        return f"{self.guardadas} lecturas guardadas, {self.rechazadas} rechazadas"
+
+
+def ingerir_archivo(ruta, tamano_lote=TAMANO_LOTE):
+    ingesta = Ingesta(tamano_lote)
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            ingesta.agregar(linea)
+    ingesta.vaciar(terminar=True)
+    return ingesta
+
+
+def escuchar(host, puerto, tamano_lote=TAMANO_LOTE, intervalo=INTERVALO_VACIADO, duracion=None):
+    """
+    Recibe lecturas por TCP, una por línea, de varios sensores conectados a la vez (un solo
+    hilo con selectors). El lote se guarda al llenarse o cada 'intervalo' segundos; con
+    'duracion' deja de escuchar pasados esos segundos (Ctrl+C también termina).
+    """
+    ingesta = Ingesta(tamano_lote)
+    selector = selectors.DefaultSelector()
+    servidor = socket.create_server((host, puerto))
+    servidor.setblocking(False)
+    selector.register(servidor, selectors.EVENT_READ)
+    fin = time.monotonic() + duracion if duracion else None
+    vaciado = time.monotonic()
+    try:
+        while fin is None or time.monotonic() < fin:
+            for clave, _ in selector.select(timeout=intervalo):
+                if clave.fileobj is servidor:
+                    conexion, _ = servidor.accept()
+                    conexion.setblocking(False)
+                    selector.register(conexion, selectors.EVENT_READ, bytearray())
+                    continue
+                try:
+                    recibido = clave.fileobj.recv(65536)
+                except ConnectionError:
+                    recibido = b""
+                if not recibido:
+                    ingesta.agregar(clave.data.decode("utf-8", "replace"))    # última línea sin salto
+                    selector.unregister(clave.fileobj)
+                    clave.fileobj.close()
+                    continue
+                clave.data.extend(recibido)
+                *lineas, resto = clave.data.split(b"\n")
+                clave.data[:] = resto
+                for linea in lineas:
+                    ingesta.agregar(linea.decode("utf-8", "replace"))
+            if time.monotonic() - vaciado >= intervalo:
+                ingesta.vaciar()
+                vaciado = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for clave in list(selector.get_map().values()):
+            clave.fileobj.close()
+        selector.close()
+        ingesta.vaciar(terminar=True)
+    return ingesta
+
+
+def simular(numeros, horas=VENTANA_HORAS, intervalo=300, hasta=None, semilla=SEMILLA):
+    """
+    Genera líneas de lectura sintéticas para las hectáreas 'numeros': una cada 'intervalo'
+    segundos durante las 'horas' horas anteriores a 'hasta', con un ciclo diario y ruido.
+    La misma semilla produce las mismas lecturas.
+    """
+    azar = random.Random(semilla)
+    hasta = int(time.time()) if hasta is None else hasta
+    hasta -= hasta % intervalo
+    bases = {numero: azar.uniform(8, 26) for numero in numeros}
+    for instante in range(hasta - horas * 3600, hasta, intervalo):
+        # Mínimo a las 4 de la mañana y máximo a las 16 (hora UTC)
+        ciclo = 6 * math.sin(2 * math.pi * ((instante % 86400) / 86400 - 10 / 24))
+        for numero, base in bases.items():
+            yield f"{numero},{instante},{base + ciclo + azar.gauss(0, 0.5):.2f}\n"
+
+
+def enviar(lineas, host, puerto):
+    """Envía lecturas a un servidor escuchar() como lo haría un sensor. Devuelve cuántas envió."""
+    enviadas = 0
+    with socket.create_connection((host, puerto)) as conexion:
+        bloque = []
+        for linea in lineas:
+            bloque.append(linea)
+            if len(bloque) >= 1000:
+                conexion.sendall("".join(bloque).encode("utf-8"))
+                enviadas += len(bloque)
+                bloque = []
+        conexion.sendall("".join(bloque).encode("utf-8"))
+    return enviadas + len(bloque)
+
+
+def _direccion(texto):
+    host, _, puerto = texto.rpartition(":")
+    return host or "127.0.0.1", int(puerto)
+
+
+def hora_utc(instante):
+    return datetime.fromtimestamp(instante, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lecturas de temperatura de los sensores de campo")
+    parser.add_argument("--simular", metavar="ARCHIVO", help="escribir lecturas sintéticas ('-' para la salida estándar)")
+    parser.add_argument("--enviar", metavar="HOST:PUERTO", help="con --simular, enviarlas por TCP en lugar de escribirlas")
+    parser.add_argument("--hectareas", type=int, default=100, help="cantidad de hectáreas a simular")
+    parser.add_argument("--intervalo", type=int, default=300, help="segundos entre lecturas simuladas")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--archivo", help="guardar las lecturas de un archivo")
+    parser.add_argument("--escuchar", metavar="HOST:PUERTO", help="recibir lecturas por TCP")
+    parser.add_argument("--duracion", type=float, help="segundos que se escucha (por defecto, hasta Ctrl+C)")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="lecturas por transacción")
+    parser.add_argument("--hectarea", type=int, metavar="NUMERO", help="mostrar el promedio móvil de una hectárea")
+    parser.add_argument("--horas", type=int, default=VENTANA_HORAS, help="horas simuladas o ventana del promedio")
+    parser.add_argument("--podar", action="store_true", help="borrar lecturas y resúmenes por hora vencidos")
+    args = parser.parse_args()
+    migraciones.migrar()
+    if args.simular:
+        numeros = [fila[0] for fila in datos.consultar("SELECT numero FROM hectareas ORDER BY numero LIMIT ?",
+                                                       (args.hectareas,))]
+        lineas = simular(numeros, args.horas, args.intervalo, semilla=args.semilla)
+        if args.enviar:
+            print(f"{enviar(lineas, *_direccion(args.enviar))} lecturas enviadas.")
+        elif args.simular == "-":
+            sys.stdout.writelines(lineas)
+        else:
+            with open(args.simular, "w", encoding="utf-8") as salida:
+                salida.writelines(lineas)
+    if args.archivo:
+        inicio = time.perf_counter()
+        ingesta = ingerir_archivo(args.archivo, args.lote)
+        print(f"{ingesta} en {time.perf_counter() - inicio:.1f} s.")
+        for linea, motivo in ingesta.rechazos[:10]:
+            print(f"  rechazada: {motivo}")
+    if args.escuchar:
+        print(f"Escuchando en {args.escuchar}...", file=sys.stderr)
+        print(f"{escuchar(*_direccion(args.escuchar), args.lote, duracion=args.duracion)}.")
+    if args.podar:
+        lecturas, horas = podar()
+        print(f"{lecturas} lecturas y {horas} resúmenes por hora borrados.")
+    if args.hectarea is not None:
+        for inicio, promedio, movil in promedio_movil(args.hectarea, args.horas):
+            print(f"{hora_utc(inicio)}  {promedio:6.2f} °C  promedio {args.horas} h: {movil:6.2f} °C")
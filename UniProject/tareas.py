@@ -0,0 +1,150 @@
+import itertools
+import logging
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThread, QThreadPool, Qt, pyqtSignal
+
+import datos
+import trazas
+
+# -----------------------------
+# Ejecución de consultas en segundo plano
+# -----------------------------
+# Las consultas y escrituras se ejecutan en un QThreadPool; cada hilo del pool usa su
+# propia conexión de datos.py. El resultado vuelve al hilo de la interfaz mediante
+# señales y se entrega a la función al_terminar (o al_fallar si hubo un error).
+# Cada tarea pertenece a un grupo (normalmente la pantalla que la pidió); cancelar(grupo)
+# descarta los resultados pendientes del grupo e interrumpe la consulta en curso.
+# Con trazas activas, cada tarea se mide y sus sentencias llevan el origen de quien la pidió.
+# Cada hilo del pool conserva su conexión entre tareas y la cierra cuando el hilo termina.
+
+log = logging.getLogger(__name__)
+
+
+class _Senales(QObject):
+    terminada = pyqtSignal(int, object)
+    fallida = pyqtSignal(int, object)
+
+
+def _cerrar_conexion_al_terminar_hilo():
+    hilo = QThread.currentThread()
+    if not hilo.property("cierra_conexion"):
+        hilo.setProperty("cierra_conexion", True)
+        # finished se emite en el propio hilo, así cerrar_conexion() encuentra su estado
+        hilo.finished.connect(datos.cerrar_conexion, Qt.DirectConnection)
+
+
+class _Tarea(QRunnable):
+    def __init__(self, id_tarea, funcion, args, senales, origen=None):
+        super().__init__()
+        self.id_tarea = id_tarea
+        self.funcion = funcion
+        self.args = args
+        self.senales = senales
+        self.origen = origen
+        self.cancelada = False
+        self._conexion = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        if self.cancelada:
+            return
+        _cerrar_conexion_al_terminar_hilo()
+        with self._lock:
+            self._conexion = datos.obtener_conexion()
+        try:
+            with trazas.medir("tarea", self.origen):
+                resultado = self.funcion(*self.args)
+        except Exception as e:
+            self.senales.fallida.emit(self.id_tarea, e)
+        else:
+            self.senales.terminada.emit(self.id_tarea, resultado)
+        finally:
+            with self._lock:
+                self._conexion = None
+
+    def interrumpir(self):
+        self.cancelada = True
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.interrupt()
+
+
+class EjecutorConsultas(QObject):
+    """Pool de hilos para consultas; emite ocupado(True/False) al empezar y terminar el trabajo pendiente."""
+    ocupado = pyqtSignal(bool)
+
+    def __init__(self, parent=None, max_hilos=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_hilos)
+        # Los hilos no expiran, así cada uno conserva su conexión mientras dure la aplicación
+        self.pool.setExpiryTimeout(-1)
+        self._ids = itertools.count(1)
+        self._pendientes = {}   # id -> (grupo, tarea, al_terminar, al_fallar)
+        self._senales = _Senales()
+        self._senales.terminada.connect(self._al_terminar)
+        self._senales.fallida.connect(self._al_fallar)
+
+    def ejecutar(self, grupo, funcion, *args, al_terminar=None, al_fallar=None):
+        """Ejecuta funcion(*args) en segundo plano y devuelve el id de la tarea."""
+        id_tarea = next(self._ids)
+        origen = trazas.origen_llamador() if trazas.activo() else None
+        tarea = _Tarea(id_tarea, funcion, args, self._senales, origen)
+        self._pendientes[id_tarea] = (grupo, tarea, al_terminar, al_fallar)
+        if len(self._pendientes) == 1:
+            self.ocupado.emit(True)
+        self.pool.start(tarea)
+        return id_tarea
+
+    def pendiente(self, id_tarea):
+        return id_tarea in self._pendientes
+
+    def grupo_pendiente(self, grupo):
+        """True si el grupo tiene alguna tarea cuyo resultado todavía se espera."""
+        return any(entrada[0] == grupo for entrada in self._pendientes.values())
+
+    def inactivo(self):
+        """True si no queda ninguna tarea cuyo resultado se espere."""
+        return not self._pendientes
+
+    def cancelar(self, grupo):
+        """Descarta las tareas pendientes del grupo; sus resultados ya no se entregan."""
+        for id_tarea, (grupo_tarea, tarea, _, _) in list(self._pendientes.items()):
+            if grupo_tarea == grupo:
+                del self._pendientes[id_tarea]
+                tarea.interrumpir()
+        self._actualizar_ocupado()
+
+    def cancelar_todo(self, excepto=()):
+        """Descarta las tareas pendientes de todos los grupos, salvo los de 'excepto'."""
+        for grupo in {entrada[0] for entrada in self._pendientes.values()} - set(excepto):
+            self.cancelar(grupo)
+
+    def esperar(self, milisegundos=-1):
+        """Espera a que terminen los hilos del pool (para uso sin interfaz y al cerrar)."""
+        return self.pool.waitForDone(milisegundos)
+
+    def _actualizar_ocupado(self):
+        if not self._pendientes:
+            self.ocupado.emit(False)
+
+    def _al_terminar(self, id_tarea, resultado):
+        entrada = self._pendientes.pop(id_tarea, None)
+        if entrada is None:
+            return
+        self._actualizar_ocupado()
+        al_terminar = entrada[2]
+        if al_terminar is not None:
+            al_terminar(resultado)
+
+    def _al_fallar(self, id_tarea, error):
+        entrada = self._pendientes.pop(id_tarea, None)
+        if entrada is None:
+            return
+        self._actualizar_ocupado()
+        al_fallar = entrada[3]
+        if al_fallar is not None:
+            al_fallar(error)
+        else:
+            log.error("Falló una tarea del grupo %s: %s", entrada[0], error)
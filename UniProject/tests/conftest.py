@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA)
+
+import catalogos  # noqa: E402
+import datos  # noqa: E402
+
+# -----------------------------
+# Bases de prueba
+# -----------------------------
+# Cada prueba trabaja sobre su propio archivo en tmp_path; nunca sobre el cultivos.db
+# que viene con el programa.
+
+BASE_INCLUIDA = os.path.join(CARPETA, "cultivos.db")
+
+
+def _usar(ruta):
+    datos.cerrar_conexion()
+    datos.configurar(ruta)
+    for tabla in catalogos.CONSULTAS:
+        catalogos.invalidar(tabla)
+
+
+@pytest.fixture
+def base_vacia(tmp_path):
+    """Ruta de una base que todavía no existe (versión 0 del esquema)."""
+    anterior = datos.RUTA_DB
+    ruta = str(tmp_path / "cultivos.db")
+    _usar(ruta)
+    yield ruta
+    _usar(anterior)
+
+
+@pytest.fixture
+def base_incluida(tmp_path):
+    """Copia del cultivos.db que viene con el programa."""
+    anterior = datos.RUTA_DB
+    ruta = str(tmp_path / "cultivos.db")
+    shutil.copy(BASE_INCLUIDA, ruta)
+    _usar(ruta)
+    yield ruta
+    _usar(anterior)
+
+
+@pytest.fixture
+def base(base_vacia):
+    """Base nueva con todas las migraciones aplicadas."""
+    import migraciones
+    migraciones.migrar()
+    return base_vacia
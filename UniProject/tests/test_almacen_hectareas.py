@@ -0,0 +1,93 @@
+import random
+from datetime import date
+
+import pytest
+
+import almacen_hectareas
+import datos
+from almacen_hectareas import AlmacenHectareas
+
+CULTIVOS = ("papas", "maiz", "trigo", "zanahoria")
+SUELOS = ("Arcilloso", "Arenoso", "Limoso")
+FILTROS = (
+    {},
+    {"cultivo": "papas"},
+    {"cultivo": "no existe"},
+    {"suelo": "Arenoso", "temperatura_minima": 15.0},
+    {"siembra_desde": date(2022, 3, 1), "siembra_hasta": date(2023, 6, 30)},
+    {"siembra_hasta": date(2022, 12, 31), "temperatura_maxima": 20.0},
+)
+
+
+def _cargar(cantidad=3000):
+    azar = random.Random(7)
+    filas = []
+    for numero in range(1, cantidad + 1):
+        siembra = date(2021, 1, 1).toordinal() + azar.randrange(1000)
+        siembra = azar.choice([date.fromordinal(siembra).isoformat()] * 8 + [None, "no es fecha"])
+        temperatura = azar.choice([None, round(azar.uniform(5, 30), 2), round(azar.uniform(5, 30), 2)])
+        filas.append((numero, azar.choice(CULTIVOS), siembra, azar.choice(SUELOS), temperatura))
+    datos.ejecutar_muchos("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, tipo_suelo, temperatura) "
+                          "VALUES (?, ?, ?, ?, ?)", filas)
+    return AlmacenHectareas.cargar(tamano_bloque=256)
+
+
+def _por_filas(almacen, **filtros):
+    """filtrar() sin NumPy sobre el mismo almacén."""
+    anterior = almacen_hectareas._numpy
+    almacen_hectareas._numpy = lambda: None
+    try:
+        return almacen.filtrar(**filtros)
+    finally:
+        almacen_hectareas._numpy = anterior
+
+
+def _iguales(a, b):
+    assert a.keys() == b.keys()
+    for clave, (cantidad, promedio) in a.items():
+        assert b[clave][0] == cantidad
+        assert (promedio is None) == (b[clave][1] is None)
+        assert promedio is None or b[clave][1] == pytest.approx(promedio)
+
+
+def test_almacen_coincide_con_la_base(base):
+    almacen = _cargar()
+    assert len(almacen) == 3000
+    assert almacen_hectareas.verificar(almacen) == []
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_filtrar_vectorizado_igual_que_por_filas(base, filtros):
+    almacen = _cargar()
+    assert almacen_hectareas._numpy() is not None
+    vectorizado, por_filas = almacen.filtrar(**filtros), _por_filas(almacen, **filtros)
+    assert [h.fila() for h in vectorizado] == [h.fila() for h in por_filas]
+    condiciones, parametros = ["1"], []
+    for clave, columna, operador in (("cultivo", "tipo_de_cultivo", "="), ("suelo", "tipo_suelo", "="),
+                                     ("siembra_desde", "date(siembra)", ">="), ("siembra_hasta", "date(siembra)", "<="),
+                                     ("temperatura_minima", "temperatura", ">="),
+                                     ("temperatura_maxima", "temperatura", "<=")):
+        if clave in filtros:
+            condiciones.append(f"{columna} {operador} ?")
+            valor = filtros[clave]
+            parametros.append(valor.isoformat() if isinstance(valor, date) else valor)
+    numeros = [n for n, in datos.consultar(f"SELECT numero FROM hectareas WHERE {' AND '.join(condiciones)} "
+                                           "ORDER BY numero", parametros)]
+    assert list(vectorizado.numero) == numeros
+
+
+@pytest.mark.parametrize("por", almacen_hectareas.AGRUPACIONES)
+def test_agrupar_vectorizado_igual_que_por_filas(base, por):
+    almacen = _cargar()
+    for filtros in FILTROS:
+        subconjunto = almacen.filtrar(**filtros)
+        _iguales(subconjunto.agrupar(por), subconjunto._agrupar_por_filas(por))
+
+
+def test_agrupar_por_anio_contra_group_by(base):
+    almacen = _cargar()
+    base_agrupada = {(int(anio) if anio else None): (cantidad, promedio) for anio, cantidad, promedio in datos.consultar(
+        "SELECT strftime('%Y', siembra), COUNT(*), AVG(temperatura) FROM hectareas GROUP BY 1")}
+    _iguales(almacen.agrupar("anio_siembra"), base_agrupada)
+    with pytest.raises(ValueError):
+        almacen.agrupar("temperatura")
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+from conftest import CARPETA
+
+# -----------------------------
+# Presupuesto de tiempo de arranque de la línea de comandos
+# -----------------------------
+# Importa agrario.py en un intérprete nuevo con -X importtime: la importación no debe
+# superar PRESUPUESTO_MS ni cargar PyQt5 (ni NumPy, que se importa recién en el primer
+# cálculo por lotes). Se toma el mejor de REPETICIONES para no medir ruido del sistema.
+
+PRESUPUESTO_MS = 100
+MODULO = "agrario"
+PROHIBIDOS = ("PyQt5", "numpy")
+REPETICIONES = 5
+
+
+def medir_importacion(modulo=MODULO):
+    """Devuelve (milisegundos de la importación, módulos de nivel superior cargados) en un proceso nuevo."""
+    salida = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                            capture_output=True, text=True, check=True, cwd=CARPETA).stderr
+    milisegundos, cargados = None, set()
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        nombre = nombre.strip()
+        cargados.add(nombre.split(".")[0])
+        if nombre == modulo and acumulado.strip().isdigit():
+            milisegundos = int(acumulado) / 1000
+    return milisegundos, cargados
+
+
+def test_importar_la_linea_de_comandos_entra_en_el_presupuesto():
+    mejor = min(medir_importacion()[0] for _ in range(REPETICIONES))
+    assert mejor <= PRESUPUESTO_MS, f"importar {MODULO} tarda {mejor:.1f} ms (presupuesto {PRESUPUESTO_MS} ms)"
+
+
+def test_importar_la_linea_de_comandos_no_carga_modulos_pesados():
+    cargados = medir_importacion()[1]
+    assert MODULO in cargados
+    assert not cargados & set(PROHIBIDOS)
+
+
+def test_ayuda_de_punta_a_punta():
+    salida = subprocess.run([sys.executable, "-m", MODULO, "--help"], capture_output=True, text=True, check=True,
+                            cwd=CARPETA).stdout
+    assert "usage" in salida
@@ -0,0 +1,26 @@
+import buscador
+import datos
+
+
+def _codigo(tabla, nombre):
+    return datos.consultar_uno(f"SELECT codigo FROM {tabla} WHERE nombre = ?", (nombre,))[0]
+
+
+def _encontradas(texto):
+    return {(tabla, codigo) for tabla, codigo, _, _ in buscador.buscar(texto)}
+
+
+def test_palabras_como_prefijo_y_sin_acentos(base):
+    raices = ("tipo_hortaliza", _codigo("tipo_hortaliza", "Raíces comestibles"))
+    assert raices in _encontradas("raices")
+    assert raices in _encontradas("RAIC comest")
+    assert raices in _encontradas("ra")
+    assert raices not in _encontradas("raices hojas")
+
+
+def test_prefijo_en_filas_nuevas(base):
+    datos.ejecutar("INSERT INTO tipo_suelo (nombre, descripcion) VALUES ('Volcánico', 'Bueno para tomates')")
+    volcanico = ("tipo_suelo", _codigo("tipo_suelo", "Volcánico"))
+    assert volcanico in _encontradas("tomat")
+    assert volcanico in _encontradas("volca*")
+    assert buscador.expresion('to"m* *') == '"to""m"*'
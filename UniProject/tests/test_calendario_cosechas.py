@@ -0,0 +1,49 @@
+from datetime import date
+
+import calendario_cosechas
+import datos
+import nucleo
+
+CULTIVOS = ["papas", "limones", "maíz", "trigo", "tomate"]
+RANGOS = [
+    (date(2024, 1, 1), date(2024, 1, 1)),
+    (date(2024, 2, 20), date(2024, 3, 10)),
+    (date(2024, 12, 25), date(2025, 1, 5)),
+    (date(2024, 1, 1), date(2026, 12, 31)),
+]
+
+
+def _hectareas(cantidad):
+    for numero in range(1, cantidad + 1):
+        siembra = date(2023, 1 + numero % 12, 1 + numero % 28)
+        nucleo.Hectarea(numero, CULTIVOS[numero % len(CULTIVOS)], siembra.isoformat()).guardar_en_bd()
+
+
+def _sin_diferencias():
+    for desde, hasta in RANGOS:
+        assert calendario_cosechas.diferencias(desde, hasta) == [], (desde, hasta)
+
+
+def test_consulta_por_rango_coincide_con_la_expansion(base):
+    _hectareas(60)
+    _sin_diferencias()
+    desde, hasta = RANGOS[-1]
+    eventos = list(calendario_cosechas.eventos(desde, hasta))
+    assert eventos
+    assert sum(calendario_cosechas.por_dia(desde, hasta).values()) == len(eventos)
+    assert {cosecha for _, _, cosecha in eventos} <= {"primera", "rutinaria"}
+
+
+def test_indice_sigue_a_las_hectareas_y_a_las_reglas(base):
+    _hectareas(40)
+    _sin_diferencias()
+    datos.ejecutar("UPDATE hectareas SET cosecha_rutinaria = '2024-02-29' WHERE numero = 3")
+    datos.ejecutar("UPDATE hectareas SET primera_cosecha = 'sin fecha' WHERE numero = 4")
+    nucleo.Hectarea.eliminar(5)
+    nucleo.Hectarea(100, "papas", "2024-02-29").guardar_en_bd()
+    _sin_diferencias()
+    # Con reglas propias en tipo_cultivo el índice se reconstruye
+    datos.ejecutar("INSERT INTO tipo_cultivo (nombre, meses_primera, meses_rutinaria) VALUES ('papas', 4, 3)")
+    _sin_diferencias()
+    datos.ejecutar("UPDATE tipo_cultivo SET meses_rutinaria = 5 WHERE nombre = 'papas'")
+    _sin_diferencias()
@@ -0,0 +1,24 @@
+import cambios
+import datos
+
+
+def _suelos(cantidad):
+    datos.ejecutar_muchos("INSERT INTO tipo_suelo (nombre, descripcion, imagen) VALUES (?, '', '')",
+                          [(f"Suelo {i}",) for i in range(cantidad)])
+
+
+def test_leer_cambios_sin_maximo(base):
+    version = cambios.version_actual()
+    _suelos(5)
+    assert cambios.leer_cambios("tipo_suelo", version, maximo=3) is None
+    nueva, cambiadas = cambios.leer_cambios("tipo_suelo", version, maximo=None)
+    assert nueva == cambios.version_actual()
+    assert sorted(fila[1] for fila in cambiadas.values()) == [f"Suelo {i}" for i in range(5)]
+
+
+def test_leer_cambios_despues_de_podar(base):
+    version = cambios.version_actual()
+    _suelos(5)
+    cambios.podar(conservar=1)
+    assert cambios.leer_cambios("tipo_suelo", version, maximo=None) is None
+    assert cambios.leer_cambios("tipo_suelo", cambios.podado_hasta(), maximo=None) is not None
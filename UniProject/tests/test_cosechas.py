@@ -0,0 +1,34 @@
+import datos
+import nucleo
+
+
+def _hectarea(numero, siembra):
+    datos.ejecutar("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra) VALUES (?, 'papas', ?)", (numero, siembra))
+
+
+def _cosechas(numero):
+    return datos.consultar_uno("SELECT primera_cosecha, cosecha_rutinaria FROM hectareas WHERE numero = ?", (numero,))
+
+
+def test_recalcular_saltea_siembras_invalidas(base):
+    validas = datos.consultar_uno("SELECT COUNT(*) FROM hectareas WHERE date(siembra) IS siembra")[0]
+    _hectarea(1, "2024-01-10")
+    _hectarea(2, "2024-2-3")
+    _hectarea(3, "sin fecha")
+    _hectarea(4, None)
+    _hectarea(5, "2024-03-05")
+    assert nucleo.recalcular_cosechas(tamano_lote=2) == validas + 2
+    assert None not in _cosechas(1) and None not in _cosechas(5)
+    for numero in (2, 3, 4):
+        assert _cosechas(numero) == (None, None)
+
+
+def test_cambiar_cultivo_conserva_fechas_sin_siembra_valida(base):
+    _hectarea(1, "2024-01-10")
+    _hectarea(2, None)
+    _hectarea(3, "2024-2-3")
+    ids = [fila[0] for fila in datos.consultar("SELECT id FROM hectareas WHERE numero IN (1, 2, 3) ORDER BY numero")]
+    nucleo.Hectarea.cambiar_cultivo(ids, "limones")
+    assert None not in _cosechas(1)
+    assert _cosechas(2) == (None, None) and _cosechas(3) == (None, None)
+    assert datos.consultar_uno("SELECT COUNT(*) FROM hectareas WHERE numero IN (1, 2, 3) AND tipo_de_cultivo = 'limones'")[0] == 3
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import catalogos
+import datos
+
+
+def _en_hilo(funcion):
+    hilo = threading.Thread(target=funcion)
+    hilo.start()
+    hilo.join()
+
+
+def test_las_conexiones_de_hilos_terminados_se_cierran(base):
+    datos.consultar_uno("SELECT 1")
+    for _ in range(10):
+        _en_hilo(lambda: datos.consultar_uno("SELECT 1"))
+    # Queda la del hilo principal y, a lo sumo, la del último hilo (se cierra en la próxima apertura)
+    assert datos.conexiones_por_hilo() <= 2
+
+
+def test_un_id_reciclado_no_hereda_la_conexion(base):
+    vistos = []
+    for _ in range(4):
+        _en_hilo(lambda: vistos.append((threading.get_ident(), datos.obtener_conexion())))
+    reciclados = [(a, b) for i, a in enumerate(vistos) for b in vistos[i + 1:] if a[0] == b[0]]
+    if not reciclados:
+        pytest.skip("el sistema no reutilizó ningún id de hilo")
+    for (_, anterior), (_, nueva) in reciclados:
+        assert anterior is not nueva
+        with pytest.raises(sqlite3.ProgrammingError):
+            anterior.execute("SELECT 1")
+
+
+def test_guardar_y_eliminar_en_catalogo(base):
+    assert catalogos.guardar("tipo_suelo", None, ("Volcánico", "", "")) == 1
+    assert "Volcánico" in catalogos.nombres("tipo_suelo")
+    with pytest.raises(sqlite3.IntegrityError):
+        catalogos.guardar("tipo_suelo", None, ("Volcánico", "", ""))
+    codigo = dict((nombre, clave) for clave, nombre in catalogos.pares("tipo_suelo"))["Volcánico"]
+    assert catalogos.eliminar("tipo_suelo", codigo) == 1
+    assert "Volcánico" not in catalogos.nombres("tipo_suelo")
+
+
+def test_configurar_interpreta_la_ruta_como_agrario_db(base, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert datos.configurar("~/otra.db") == str(tmp_path / "otra.db")
+    assert datos.configurar("datos/otra.db") == os.path.join(datos.CARPETA, "datos", "otra.db")
+    assert datos.configurar(datos.MEMORIA) == datos.MEMORIA and datos.en_memoria()
+    monkeypatch.setenv(datos.VARIABLE_ENTORNO, "~/otra.db")
+    assert datos.configurar("~/otra.db") == datos.ruta_configurada()
+
+
+def test_opcion_db_de_la_linea_de_comandos(base, tmp_path, monkeypatch):
+    import agrario
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert agrario.main(["--db", "~/nueva.db", "migrar"]) == 0
+    assert datos.RUTA_DB == str(tmp_path / "nueva.db")
+    assert (tmp_path / "nueva.db").is_file()
@@ -0,0 +1,71 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import datos
+import fincas
+import informes
+import migraciones
+
+
+@pytest.fixture
+def sin_fincas(base, monkeypatch):
+    """Base migrada sin fincas.db; el directorio se busca junto a ella."""
+    monkeypatch.setattr(fincas, "DIRECTORIO", None)
+    yield base
+    fincas.cerrar()
+
+
+def _version(ruta):
+    with closing(sqlite3.connect(ruta)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_crear_y_activar(sin_fincas, tmp_path):
+    assert fincas.listar() == [] and fincas.activa() is None
+    central = fincas.crear("Central", sin_fincas)
+    sur = fincas.crear("La Sur")
+    assert fincas.directorio() == str(tmp_path / fincas.NOMBRE_DIRECTORIO)
+    assert sur[2] == str(tmp_path / fincas.CARPETA / "la_sur.db")
+    assert _version(sur[2]) == migraciones.VERSION_ESQUEMA
+    with pytest.raises(ValueError):
+        fincas.crear("La Sur")
+    assert fincas.activa() == central
+    assert fincas.activar("La Sur") == sur
+    # Con la base de la finca activa, fincas.db sigue siendo el de la base original
+    assert datos.archivo_db() == sur[2] and fincas.activa() == sur
+    assert [finca[1] for finca in fincas.listar()] == ["Central", "La Sur"]
+    assert fincas.activar(central[0]) == central
+    with pytest.raises(ValueError):
+        fincas.buscar("Norte")
+
+
+def test_directorio_sigue_a_la_base_configurada(sin_fincas, tmp_path):
+    fincas.crear("Central", sin_fincas)
+    otra = tmp_path / "otra"
+    otra.mkdir()
+    datos.configurar(str(otra / "cultivos.db"))
+    assert fincas.directorio() == str(otra / fincas.NOMBRE_DIRECTORIO)
+    assert fincas.listar() == []
+
+
+def test_informes_de_todas_las_fincas(sin_fincas):
+    fincas.generar(2, hectareas=60, gestiones=45, usuarios=4)
+    propias, cultivos = {}, {}
+    for finca in fincas.listar():
+        fincas.activar(finca[0])
+        propias[finca[1]] = [(finca[1],) + tuple(fila) for fila in informes.filas()]
+        for cultivo, cantidad in datos.consultar("SELECT tipo_de_cultivo, COUNT(*) FROM hectareas GROUP BY 1"):
+            cultivos.setdefault(cultivo, {})[finca[1]] = cantidad
+    assert fincas.hectareas_por_cultivo() == cultivos
+    todas = list(fincas.filas_informe(limite=10))
+    assert len(todas) == sum(len(filas) for filas in propias.values()) > 0
+    for nombre, filas in propias.items():
+        assert [fila for fila in todas if fila[0] == nombre] == filas
+    fila = todas[0]
+    filtros = {"usuario": fila[2], "hortaliza": None, "suelo": fila[4], "clima": None}
+    assert sorted(fincas.filas_informe(filtros)) == sorted(f for f in todas if f[2] == fila[2] and f[4] == fila[4])
+    assert list(fincas.filas_informe({"usuario": "nadie"})) == []
+    filas, cursores, completo = fincas.pagina_informe(limite=5)
+    assert len(filas) == 10 and not completo and all(cursor is not None for cursor in cursores.values())
@@ -0,0 +1,52 @@
+import json
+
+import datos
+import importador
+
+
+def _escribir(ruta, lineas):
+    ruta.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+    return str(ruta)
+
+
+def _siembras():
+    return [fila[0] for fila in datos.consultar("SELECT siembra FROM hectareas WHERE temperatura = 21.5 ORDER BY siembra")]
+
+
+def test_importa_csv_y_normaliza_fechas(base, tmp_path):
+    ruta = _escribir(tmp_path / "hectareas.csv", [
+        "tipo_de_cultivo,siembra,tipo_suelo,temperatura",
+        "Tomate,2024-03-10,franco,21.5",
+        "trigo,2024-1-5,Arenoso,21.5",
+    ])
+    resultado = importador.importar(ruta, tamano_lote=1)
+    assert (resultado.insertadas, resultado.rechazadas) == (2, 0)
+    assert _siembras() == ["2024-01-05", "2024-03-10"]
+    assert datos.consultar_uno(
+        "SELECT COUNT(*) FROM hectareas WHERE temperatura = 21.5 AND primera_cosecha IS NOT NULL")[0] == 2
+
+
+def test_rechaza_filas_invalidas(base, tmp_path):
+    buena = {"tipo_de_cultivo": "maíz", "siembra": "2024-02-01", "tipo_suelo": "Limoso", "temperatura": 21.5}
+    ruta = _escribir(tmp_path / "hectareas.jsonl", [
+        json.dumps(buena),
+        json.dumps(dict(buena, tipo_de_cultivo="cactus")),
+        json.dumps(dict(buena, tipo_suelo="Rocoso")),
+        json.dumps(dict(buena, temperatura="abc")),
+        json.dumps(dict(buena, siembra="2024-13-01")),
+        "{sin cerrar",
+        "[1, 2]",
+        "5",
+    ])
+    rechazos = tmp_path / "rechazos.csv"
+    resultado = importador.importar(ruta, archivo_rechazos=str(rechazos))
+    assert (resultado.insertadas, resultado.rechazadas) == (1, 7)
+    assert _siembras() == ["2024-02-01"]
+    motivos = dict(resultado.rechazos)
+    assert motivos[2].startswith("Tipo de cultivo desconocido")
+    assert motivos[3].startswith("Tipo de suelo desconocido")
+    assert motivos[4].startswith("Temperatura inválida")
+    assert motivos[5].startswith("Fecha de siembra inválida")
+    assert motivos[6].startswith("JSON inválido")
+    assert motivos[7] == motivos[8] == "se esperaba un objeto JSON"
+    assert len(rechazos.read_text(encoding="utf-8").splitlines()) == 8
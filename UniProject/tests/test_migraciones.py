@@ -0,0 +1,55 @@
+import cambios
+import datos
+import migraciones
+import nucleo
+
+
+def _objetos():
+    return datos.consultar("SELECT type, name, sql FROM sqlite_master ORDER BY type, name")
+
+
+def _simular_sin_cambios():
+    antes = (migraciones.version_actual(), _objetos())
+    resultados = migraciones.migrar(simular=True)
+    assert [r[0] for r in resultados] == [m[0] for m in migraciones.MIGRACIONES if m[0] > antes[0]]
+    assert (migraciones.version_actual(), _objetos()) == antes
+    return resultados
+
+
+def test_simular_desde_version_0(base_vacia):
+    resultados = _simular_sin_cambios()
+    cambios = {numero: cambios for numero, _, _, cambios in resultados}
+    assert "crear table hectareas" in cambios[1]
+    assert "crear table secuencias" in cambios[3]
+
+
+def test_simular_sobre_la_base_incluida(base_incluida):
+    assert migraciones.version_actual() == 0
+    _simular_sin_cambios()
+
+
+def test_migrar_despues_de_simular(base_vacia):
+    migraciones.migrar(simular=True)
+    migraciones.migrar()
+    assert migraciones.version_actual() == migraciones.VERSION_ESQUEMA
+    assert migraciones.migrar(simular=True) == []
+
+
+def test_pasos_de_llenado_idempotentes(base):
+    datos.ejecutar("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria) "
+                   "VALUES (1, 'papas', '2024-01-10', '2024-06-10', '2024-11-10')")
+    tablas = ("busqueda", "pronostico_cosechas")
+    antes = {tabla: datos.consultar(f"SELECT * FROM {tabla} ORDER BY 1, 2") for tabla in tablas}
+    assert antes["pronostico_cosechas"]
+    for paso in (migraciones._indice_texto, migraciones._pronostico_cosechas):
+        with datos.transaccion():
+            paso()
+    assert {tabla: datos.consultar(f"SELECT * FROM {tabla} ORDER BY 1, 2") for tabla in tablas} == antes
+
+
+def test_inicializar_solo_poda_si_hubo_migraciones(base_vacia, monkeypatch):
+    podas = []
+    monkeypatch.setattr(cambios, "podar", lambda: podas.append(migraciones.version_actual()))
+    nucleo.inicializar_db()
+    nucleo.inicializar_db()
+    assert podas == [migraciones.VERSION_ESQUEMA]
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+import datos
+import numeracion
+from nucleo import Hectarea
+
+HILOS = 4
+POR_HILO = 25
+
+
+def _en_hilos(funcion):
+    errores = []
+
+    def correr():
+        try:
+            funcion()
+        except Exception as e:
+            errores.append(e)
+        finally:
+            datos.cerrar_conexion()
+
+    hilos = [threading.Thread(target=correr) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+
+
+def test_altas_concurrentes_sin_numeros_repetidos(base):
+    antes = numeracion.reservar_numeros(1)[0]
+    _en_hilos(lambda: [Hectarea(None, "papas", "2024-01-10").guardar_en_bd() for _ in range(POR_HILO)])
+    numeros = [fila[0] for fila in datos.consultar("SELECT numero FROM hectareas WHERE numero > ?", (antes,))]
+    assert sorted(numeros) == list(range(antes + 1, antes + 1 + HILOS * POR_HILO))
+
+
+def test_bloques_concurrentes_disjuntos(base):
+    bloques = []
+    _en_hilos(lambda: bloques.extend(numeracion.reservar_numeros(7) for _ in range(POR_HILO)))
+    numeros = [numero for bloque in bloques for numero in bloque]
+    assert len(numeros) == len(set(numeros)) == HILOS * POR_HILO * 7
+
+
+def test_reserva_se_deshace_con_la_transaccion(base):
+    siguiente = numeracion.siguiente_numero() + 1
+    with pytest.raises(ValueError):
+        with datos.transaccion():
+            numeracion.reservar_numeros(10)
+            raise ValueError("falla la inserción")
+    assert numeracion.siguiente_numero() == siguiente
+    with pytest.raises(ValueError):
+        numeracion.reservar_numeros(0)
@@ -0,0 +1,51 @@
+import pytest
+
+import datos
+import nucleo
+
+MUCHAS = 1200       # más ids que el límite clásico de 999 parámetros: viajan en un solo arreglo JSON
+
+
+def _hectareas(cantidad):
+    datos.ejecutar_muchos("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, primera_cosecha, cosecha_rutinaria, "
+                          "tipo_suelo) VALUES (?, 'papas', '2024-01-10', '2024-06-10', '2024-11-10', 'Franco')",
+                          [(numero,) for numero in range(1, cantidad + 1)])
+    return [fila[0] for fila in datos.consultar("SELECT id FROM hectareas ORDER BY numero")]
+
+
+def _contar(condicion, parametros=()):
+    return datos.consultar_uno(f"SELECT COUNT(*) FROM hectareas WHERE {condicion}", parametros)[0]
+
+
+def test_cambios_en_bloque_solo_tocan_los_ids_indicados(base):
+    ids = _hectareas(MUCHAS + 10)
+    elegidos = ids[:MUCHAS]
+    assert nucleo.Hectarea.cambiar_suelo(elegidos, "Arcilloso") == MUCHAS
+    assert _contar("tipo_suelo = 'Arcilloso'") == MUCHAS
+    assert nucleo.Hectarea.correr_siembra(ids[-3:], 10) == 3
+    assert _contar("siembra = '2024-01-20' AND primera_cosecha = '2024-06-20' AND cosecha_rutinaria = '2024-11-20'") == 3
+    assert nucleo.Hectarea.correr_siembra(ids[-3:], -10) == 3
+    assert _contar("siembra = '2024-01-10'") == MUCHAS + 10
+    assert nucleo.Hectarea.eliminar_varias(elegidos + [-1]) == MUCHAS
+    assert _contar("1") == 10 and _contar("tipo_suelo = 'Franco'") == 10
+
+
+def test_cambiar_cultivo_de_muchas(base):
+    ids = _hectareas(MUCHAS)
+    referencia = nucleo.Hectarea(None, "limones", "2024-01-10")
+    assert nucleo.Hectarea.cambiar_cultivo(ids, "Limones") == MUCHAS
+    assert _contar("tipo_de_cultivo = 'limones' AND primera_cosecha = ? AND cosecha_rutinaria = ?",
+                   (referencia.primeracosecha.strftime("%Y-%m-%d"), referencia.cosecha_rutinaria)) == MUCHAS
+
+
+def test_gestiones_en_bloque(base):
+    for _ in range(5):
+        nucleo.guardar_gestion(None, 1, 1, 1, 1, "", "obs")
+    codigos = [fila[0] for fila in datos.consultar("SELECT codigo FROM gestion_cultivo ORDER BY codigo")]
+    assert nucleo.cambiar_gestiones(codigos[:3], "id_clima", 2) == 3
+    assert [fila[0] for fila in datos.consultar("SELECT id_clima FROM gestion_cultivo ORDER BY codigo")] == [2, 2, 2, 1, 1]
+    with pytest.raises(ValueError):
+        nucleo.cambiar_gestiones(codigos, "observaciones", "x")
+    assert nucleo.eliminar_gestiones(codigos[1:4]) == 3
+    assert [fila[0] for fila in datos.consultar("SELECT codigo FROM gestion_cultivo ORDER BY codigo")] == \
+        [codigos[0], codigos[4]]
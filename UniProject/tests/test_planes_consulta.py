@@ -0,0 +1,22 @@
+import planes_consulta
+from conftest import BASE_INCLUIDA
+
+
+def test_sin_recorridos_no_previstos(base_vacia):
+    cantidad, fallos = planes_consulta.verificar()
+    assert cantidad > 100
+    assert fallos == []
+
+
+def test_sobre_una_copia_de_la_base_incluida(base_vacia):
+    assert planes_consulta.verificar(BASE_INCLUIDA)[1] == []
+
+
+def test_detecta_recorridos_y_permisos_sobrantes(base_vacia, monkeypatch):
+    permitidos = dict(planes_consulta.RECORRIDOS_PERMITIDOS)
+    del permitidos["nucleo.nombres_de_usuario"]
+    permitidos["nucleo.credenciales"] = {"usuarios"}
+    monkeypatch.setattr(planes_consulta, "RECORRIDOS_PERMITIDOS", permitidos)
+    fallos = dict(planes_consulta.verificar()[1])
+    assert fallos.keys() == {"nucleo.nombres_de_usuario", "nucleo.credenciales"}
+    assert fallos["nucleo.nombres_de_usuario"].startswith("recorre completa(s) usuarios")
@@ -0,0 +1,48 @@
+import datos
+import nucleo
+import pronostico
+
+
+def _hectarea(numero, cultivo="papas", siembra="2024-01-10", temperatura=None):
+    nucleo.Hectarea(numero, cultivo, siembra, temperatura=temperatura).guardar_en_bd()
+
+
+def _ids(*numeros):
+    marcas = ", ".join("?" * len(numeros))
+    return [fila[0] for fila in datos.consultar(f"SELECT id FROM hectareas WHERE numero IN ({marcas})", numeros)]
+
+
+def test_triggers_coinciden_con_el_recalculo(base):
+    for numero in range(1, 9):
+        _hectarea(numero, "papas" if numero % 2 else "limones", f"2024-0{numero}-15", 10.0 + numero if numero % 3 else None)
+    assert pronostico.diferencias() == []
+    datos.ejecutar("UPDATE hectareas SET temperatura = 30.5 WHERE numero IN (1, 2)")
+    datos.ejecutar("UPDATE hectareas SET temperatura = NULL WHERE numero = 4")
+    datos.ejecutar("UPDATE hectareas SET primera_cosecha = '2025-03-01', cosecha_rutinaria = 'sin fecha' WHERE numero = 5")
+    assert pronostico.diferencias() == []
+    nucleo.Hectarea.cambiar_cultivo(_ids(1, 2, 3), "limones")
+    nucleo.Hectarea.correr_siembra(_ids(6, 7), -40)
+    nucleo.Hectarea.eliminar(8)
+    nucleo.Hectarea.eliminar_varias(_ids(2))
+    assert pronostico.diferencias() == []
+
+
+def test_carga_masiva_suma_al_final(base):
+    _hectarea(1)
+    with pronostico.carga_masiva():
+        for numero in range(2, 12):
+            datos.ejecutar("INSERT INTO hectareas (numero, tipo_de_cultivo, primera_cosecha, cosecha_rutinaria, temperatura) "
+                           "VALUES (?, 'trigo', '2024-05-20', '2024-09-20', ?)", (numero, float(numero)))
+    assert pronostico.diferencias() == []
+    assert datos.consultar_uno("SELECT COUNT(*) FROM pronostico_pausa")[0] == 0
+    filas = pronostico.resumen("mes", "2024-05", "2024-06", cosecha="primera")
+    assert filas == [("2024-05", "trigo", 10, 6.5)]
+
+
+def test_reconstruir_corrige_un_resumen_desfasado(base):
+    _hectarea(1)
+    _hectarea(2, temperatura=20.0)
+    datos.ejecutar("UPDATE pronostico_cosechas SET hectareas = hectareas + 5")
+    assert pronostico.diferencias() != []
+    pronostico.reconstruir()
+    assert pronostico.diferencias() == []
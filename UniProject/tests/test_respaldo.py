@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+import datos
+import migraciones
+import respaldo
+
+
+def _hectareas(desde, hasta):
+    datos.ejecutar_muchos("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra) VALUES (?, 'papas', '2024-01-10')",
+                          [(numero,) for numero in range(desde, hasta)])
+
+
+def _cantidad(ruta=None):
+    if ruta is None:
+        return datos.consultar_uno("SELECT COUNT(*) FROM hectareas")[0]
+    conn = datos.conectar(ruta, solo_lectura=True)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM hectareas").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_respaldar_y_verificar(base, tmp_path):
+    _hectareas(1, 500)
+    ruta = respaldo.respaldar()
+    assert os.path.dirname(ruta) == str(tmp_path / respaldo.CARPETA)
+    assert respaldo.verificar(ruta) == migraciones.VERSION_ESQUEMA
+    assert _cantidad(ruta) == 499
+    assert [r[0] for r in respaldo.listar()] == [ruta]
+    assert not [nombre for nombre in os.listdir(os.path.dirname(ruta)) if not nombre.endswith(".db")]
+
+
+def test_copia_coherente_con_escrituras_en_el_medio(base):
+    _hectareas(1, 3000)
+    escrituras = []
+
+    def escribir(copiadas, total):
+        if copiadas < total and len(escrituras) < 3:
+            _hectareas(10000 + len(escrituras) * 10, 10010 + len(escrituras) * 10)
+            escrituras.append(copiadas)
+
+    ruta = respaldo.respaldar(paginas=1, pausa=0, progreso=escribir)
+    assert len(escrituras) == 3
+    assert _cantidad(ruta) == 2999 and _cantidad() == 2999 + 30
+
+
+def test_verificar_rechaza_archivos_invalidos(base, tmp_path):
+    with pytest.raises(respaldo.RespaldoInvalido):
+        respaldo.verificar(str(tmp_path / "no-existe.db"))
+    roto = tmp_path / "roto.db"
+    roto.write_bytes(b"esto no es una base SQLite" * 200)
+    with pytest.raises(respaldo.RespaldoInvalido):
+        respaldo.verificar(str(roto))
+
+
+def test_restaurar_guarda_la_base_actual(base):
+    _hectareas(1, 100)
+    ruta = respaldo.respaldar()
+    datos.ejecutar("DELETE FROM hectareas WHERE numero > 10")
+    _hectareas(500, 505)
+    previo = respaldo.restaurar(ruta)
+    assert _cantidad() == 99
+    assert _cantidad(previo) == 15
+    assert datos.consultar_uno("SELECT COUNT(*) FROM hectareas WHERE numero >= 500")[0] == 0
+
+
+def test_rotar_conserva_los_ultimos(base):
+    rutas = [respaldo.respaldar(conservar=0) for _ in range(4)]
+    assert [r[0] for r in respaldo.listar()] == rutas
+    assert respaldo.rotar(conservar=2) == rutas[:2]
+    assert [r[0] for r in respaldo.listar()] == rutas[2:]
+    assert respaldo.respaldar_si_vencido() is None
+    assert respaldo.respaldar_si_vencido(horas=0) is not None
+    assert len(respaldo.listar()) == 3
@@ -0,0 +1,73 @@
+import cambios
+import datos
+import nucleo
+import sensores
+
+HORA = sensores.ESCALAS["hora"]
+DIA = 1_700_006_400     # comienzo de un día UTC
+
+
+def _hectarea(numero, temperatura=None):
+    datos.ejecutar("INSERT INTO hectareas (numero, tipo_de_cultivo, siembra, temperatura) VALUES (?, 'papas', '2024-01-10', ?)",
+                   (numero, temperatura))
+
+
+def _temperatura(numero):
+    return datos.consultar_uno("SELECT temperatura FROM hectareas WHERE numero = ?", (numero,))[0]
+
+
+def _lecturas(numero):
+    return datos.consultar_uno("SELECT COUNT(*) FROM lecturas WHERE hectarea = ?", (numero,))[0]
+
+
+def test_ingesta_y_resumenes(base, tmp_path):
+    _hectarea(1)
+    _hectarea(2)
+    ruta = tmp_path / "lecturas.csv"
+    ruta.write_text("\n".join([f"1,{DIA},10", f"1,{DIA + 1800},20", f"1,{DIA + HORA},30", f"2,{DIA + 60},15",
+                               "x,1,2", f"1,{DIA},abc", "1,2"]) + "\n", encoding="utf-8")
+    ingesta = sensores.ingerir_archivo(str(ruta))
+    assert (ingesta.guardadas, ingesta.rechazadas) == (4, 3)
+    assert sensores.serie(1, "hora", DIA, DIA + HORA) == [(DIA, 10, 20, 15.0), (DIA + HORA, 30, 30, 30.0)]
+    assert sensores.serie(1, "dia", DIA, DIA) == [(DIA, 10, 30, 20.0)]
+    assert (_temperatura(1), _temperatura(2)) == (30.0, 15.0)
+    assert sensores.resumir() == 0
+    # Una lectura atrasada se suma al resumen de su hora
+    sensores.registrar([(1, DIA + 10, 40.0)])
+    assert sensores.resumir() == 1
+    assert sensores.serie(1, "hora", DIA, DIA)[0] == (DIA, 10, 40, 70 / 3)
+    assert sensores.serie(1, "dia", DIA, DIA)[0][1:3] == (10, 40)
+
+
+def test_promedio_movil_pondera_por_cantidad(base):
+    sensores.registrar([(1, DIA, 10.0), (1, DIA + 60, 20.0), (1, DIA + HORA, 30.0), (1, DIA + 2 * HORA, 40.0)])
+    sensores.resumir()
+    assert sensores.promedio_movil(1, horas=2, desde=DIA, hasta=DIA + 2 * HORA) == [
+        (DIA, 15.0, 15.0), (DIA + HORA, 30.0, 20.0), (DIA + 2 * HORA, 40.0, 35.0)]
+    assert sensores.promedio_movil(1, horas=1, desde=DIA + HORA, hasta=DIA + 2 * HORA) == [
+        (DIA + HORA, 30.0, 30.0), (DIA + 2 * HORA, 40.0, 40.0)]
+
+
+def test_listas_muestran_la_temperatura_del_sensor(base):
+    _hectarea(1, 5.0)
+    _hectarea(2, 12.5)
+    sensores.registrar([(1, DIA, 30.0)])
+    sensores.resumir()
+    datos.ejecutar("UPDATE hectareas SET temperatura = 5.0 WHERE numero = 1")
+    pagina = {fila[0]: fila[-1] for fila in nucleo.Hectarea.pagina()}
+    assert (pagina[1], pagina[2]) == (30.0, 12.5)
+    lista = {fila[1]: fila[-1] for fila in cambios.leer_todo("hectareas")[1]}
+    assert (lista[1], lista[2]) == (30.0, 12.5)
+
+
+def test_baja_de_hectarea_borra_sus_lecturas(base):
+    _hectarea(1)
+    _hectarea(2)
+    sensores.registrar([(1, DIA, 20.0), (2, DIA, 21.0)])
+    sensores.resumir()
+    sensores.registrar([(1, DIA + HORA, 22.0)])     # todavía sin resumir
+    nucleo.Hectarea.eliminar(1)
+    assert (_lecturas(1), _lecturas(2)) == (0, 1)
+    sensores.resumir()
+    assert sensores.ultima(1) is None
+    assert sensores.ultima(2) == (DIA, 21.0, 21.0, 21.0)
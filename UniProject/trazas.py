@@ -0,0 +1,283 @@
+import argparse
+import json
+import logging
+import logging.handlers
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# -----------------------------
+# Trazas de consultas y métricas de pantallas
+# -----------------------------
+# Con activar(), cada sentencia que pasa por datos.py queda registrada con su duración,
+# filas, hilo y origen (la pantalla y el método que la pidió, p. ej.
+# "InformeScreen.pedir_pagina"). El callback de traza de sqlite3 cuenta además las
+# sentencias internas que dispara cada una (disparadores, tablas FTS5) y registra las que
+# se ejecuten por fuera de datos.py.
+# La aplicación agrega los cambios de pantalla ("pantalla"), los botones ("boton") y
+# las tareas en segundo plano ("tarea") con medir().
+#
+# Cada registro es una línea JSON en un archivo rotativo (ARCHIVO), fácil de agregar:
+#   python trazas.py metricas.jsonl metricas.jsonl.1
+# Las sentencias que superan el umbral se registran con su plan (EXPLAIN QUERY PLAN) y
+# se avisan en el log de la aplicación. Este módulo no importa PyQt5 ni datos.py.
+#
+# capturar() junta en memoria, sin escribir métricas, cada sentencia de datos.py con la
+# función que la emitió (lo usa planes_consulta.py).
+
+ARCHIVO = "metricas.jsonl"
+UMBRAL_LENTA_MS = 100
+TAMANO_MAXIMO = 5 * 1024 * 1024   # bytes por archivo antes de rotar
+RESPALDOS = 3                     # archivos rotados que se conservan
+LARGO_SQL = 300                   # caracteres de SQL que se guardan por registro
+
+log = logging.getLogger(__name__)
+_metricas = logging.getLogger("metricas")
+_metricas.propagate = False
+_contexto = threading.local()     # origen, sentencias trazadas y pausa, por hilo
+_activo = False
+_captura = None                   # lista de capturar() en curso, o None
+_umbral_ms = UMBRAL_LENTA_MS
+# Módulos que no cuentan como origen: el origen es quien los llama
+_INTERNOS = {__name__, "datos", "tareas", "contextlib"}
+
+
+def activar(ruta=ARCHIVO, umbral_ms=UMBRAL_LENTA_MS, tamano_maximo=TAMANO_MAXIMO, respaldos=RESPALDOS):
+    """
+    Empieza a registrar métricas en 'ruta'. Debe llamarse antes de abrir las conexiones:
+    el callback de traza se instala al abrir cada una (datos._abrir_conexion).
+    """
+    global _activo, _umbral_ms
+    for manejador in list(_metricas.handlers):
+        _metricas.removeHandler(manejador)
+        manejador.close()
+    manejador = logging.handlers.RotatingFileHandler(ruta, maxBytes=tamano_maximo, backupCount=respaldos,
+                                                     encoding="utf-8", delay=True)
+    manejador.setFormatter(logging.Formatter("%(message)s"))
+    _metricas.addHandler(manejador)
+    _metricas.setLevel(logging.INFO)
+    _umbral_ms = umbral_ms
+    _activo = True
+
+
+def desactivar():
+    global _activo
+    _activo = False
+    for manejador in list(_metricas.handlers):
+        _metricas.removeHandler(manejador)
+        manejador.close()
+
+
+def activo():
+    """Si datos.py debe pasar las sentencias por aquí (métricas activas o una captura en curso)."""
+    return _activo or _captura is not None
+
+
+@contextmanager
+def capturar():
+    """
+    Junta en una lista (emisor, sql, parámetros) de cada sentencia de datos.py ejecutada
+    dentro del bloque, en cualquier hilo. El emisor es "módulo.función" de quien llamó a
+    datos.py. Las conexiones que ya estaban abiertas también se capturan.
+    """
+    global _captura
+    anterior, _captura = _captura, []
+    try:
+        yield _captura
+    finally:
+        _captura = anterior
+
+
+def registrar(tipo, origen, ms, **campos):
+    """Escribe un registro de métrica (una línea JSON)."""
+    if not _activo:
+        return
+    registro = {"fecha": datetime.now().isoformat(timespec="milliseconds"), "tipo": tipo, "origen": origen,
+                "ms": None if ms is None else round(ms, 3), "hilo": threading.current_thread().name}
+    registro.update(campos)
+    _metricas.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+# -----------------------------
+# Origen de las sentencias
+# -----------------------------
+def origen_llamador():
+    """
+    "Clase.método" del primer método (fuera de datos/tareas/trazas) en la pila del hilo;
+    si no hay ninguno, el origen fijado con origen() (tareas en segundo plano) o, por
+    último, "módulo.función" del primer llamador.
+    """
+    marco = sys._getframe(1)
+    externo = None
+    while marco is not None:
+        modulo = marco.f_globals.get("__name__")
+        if modulo not in _INTERNOS:
+            codigo = marco.f_code
+            if codigo.co_argcount and codigo.co_varnames[0] == "self" and "self" in marco.f_locals:
+                return f"{type(marco.f_locals['self']).__name__}.{codigo.co_name}"
+            if externo is None:
+                externo = f"{modulo}.{codigo.co_name}"
+        marco = marco.f_back
+    return getattr(_contexto, "origen", None) or externo
+
+
+def emisor_llamador():
+    """"módulo.función" (con la clase si es un método) del llamador más cercano fuera de datos/tareas/trazas."""
+    marco = sys._getframe(1)
+    while marco is not None and marco.f_globals.get("__name__") in _INTERNOS:
+        marco = marco.f_back
+    if marco is None:
+        return None
+    codigo = marco.f_code
+    return f"{marco.f_globals.get('__name__')}.{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+
+@contextmanager
+def origen(nombre):
+    """Fija el origen de las sentencias que se ejecuten en este hilo dentro del bloque."""
+    anterior = getattr(_contexto, "origen", None)
+    _contexto.origen = nombre
+    try:
+        yield
+    finally:
+        _contexto.origen = anterior
+
+
+@contextmanager
+def medir(tipo, nombre, **campos):
+    """Registra cuánto tarda el bloque; nombre también queda como origen de sus sentencias."""
+    if not _activo:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        with origen(nombre):
+            yield
+    finally:
+        registrar(tipo, nombre, (time.perf_counter() - inicio) * 1000, **campos)
+
+
+# -----------------------------
+# Sentencias SQL
+# -----------------------------
+def al_trazar(sentencia):
+    """Callback de sqlite3 (Connection.set_trace_callback) para cada sentencia que empieza."""
+    if getattr(_contexto, "pausado", False):
+        return
+    trazadas = getattr(_contexto, "trazadas", None)
+    if trazadas is not None:
+        trazadas.append(sentencia)
+    elif not sentencia.startswith("--"):
+        # Ejecutada sin pasar por datos.py: no hay duración, pero queda constancia
+        registrar("sql", origen_llamador(), None, sql=sentencia[:LARGO_SQL])
+
+
+class _Medicion:
+    __slots__ = ("filas",)
+
+    def __init__(self):
+        self.filas = None
+
+
+@contextmanager
+def sentencia(conn, sql, parametros=None):
+    """
+    Mide una sentencia de datos.py; quien la ejecuta completa medicion.filas. Si tarda
+    más que el umbral se agrega el plan (parametros=None omite el plan, p. ej. en
+    executemany).
+    """
+    medicion = _Medicion()
+    anteriores = getattr(_contexto, "trazadas", None)
+    _contexto.trazadas = []
+    error = None
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        trazadas, _contexto.trazadas = _contexto.trazadas, anteriores
+        registrar_sentencia(conn, sql, parametros, ms, medicion.filas,
+                            sum(1 for t in trazadas if t.startswith("--")), error)
+
+
+@contextmanager
+def sin_trazar():
+    """Las sentencias del bloque no pasan por el callback (quien las ejecuta las registra)."""
+    anterior = getattr(_contexto, "pausado", False)
+    _contexto.pausado = True
+    try:
+        yield
+    finally:
+        _contexto.pausado = anterior
+
+
+def registrar_sentencia(conn, sql, parametros, ms, filas=None, internas=None, error=None):
+    if _captura is not None:
+        _captura.append((emisor_llamador(), sql, parametros))
+    if not _activo:
+        return
+    campos = {"sql": " ".join(sql.split())[:LARGO_SQL], "filas": filas, "internas": internas}
+    if error is not None:
+        campos["error"] = str(error)
+    elif ms >= _umbral_ms:
+        campos["plan"] = _plan(conn, sql, parametros)
+        log.warning("Sentencia lenta (%.0f ms) desde %s: %s | plan: %s", ms, origen_llamador(),
+                    campos["sql"], "; ".join(campos["plan"] or []))
+    registrar("sql", origen_llamador(), ms, **campos)
+
+
+def _plan(conn, sql, parametros):
+    if parametros is None or sql.split(None, 1)[0].upper() not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+        return None
+    try:
+        with sin_trazar():
+            return [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+    except Exception as e:  # el plan es informativo, nunca debe romper la consulta
+        return [f"sin plan: {e}"]
+
+
+# -----------------------------
+# Agregación de los archivos de métricas
+# -----------------------------
+def leer(rutas):
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+def agregar(registros, por_sql=True):
+    """Agrupa por (tipo, origen[, sql]) y devuelve [(clave, n, total, mediana, p95, máximo)] por total descendente."""
+    grupos = {}
+    for registro in registros:
+        if registro.get("ms") is None:
+            continue
+        clave = (registro["tipo"], registro["origen"]) + ((registro.get("sql", ""),) if por_sql else ())
+        grupos.setdefault(clave, []).append(registro["ms"])
+    filas = []
+    for clave, tiempos in grupos.items():
+        tiempos.sort()
+        p95 = tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))]
+        filas.append((clave, len(tiempos), sum(tiempos), statistics.median(tiempos), p95, tiempos[-1]))
+    filas.sort(key=lambda fila: fila[2], reverse=True)
+    return filas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume archivos de métricas (líneas JSON)")
+    parser.add_argument("archivos", nargs="+")
+    parser.add_argument("--tipo", choices=("sql", "pantalla", "boton", "tarea"))
+    parser.add_argument("--sin-sql", action="store_true", help="agrupar solo por tipo y origen")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    registros = (r for r in leer(args.archivos) if args.tipo is None or r["tipo"] == args.tipo)
+    print(f"{'n':>7} {'total ms':>11} {'mediana':>9} {'p95':>9} {'máx':>9}  tipo/origen/sql")
+    for clave, n, total, mediana, p95, maximo in agregar(registros, not args.sin_sql)[:args.top]:
+        print(f"{n:7d} {total:11.1f} {mediana:9.2f} {p95:9.2f} {maximo:9.2f}  {' | '.join(clave)}")